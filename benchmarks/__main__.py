@@ -0,0 +1,133 @@
+import argparse
+import typing
+import datetime
+import platform
+import resource
+import subprocess
+import json
+import sys
+import benchmarks.crawl as crawl_bench
+import benchmarks.page as page_bench
+import benchmarks.utils as utils_bench
+import benchmarks.dates as dates_bench
+import benchmarks.warc as warc_bench
+from benchmarks.corpus import generate_corpus
+
+SUITES = ['extract', 'utils', 'dates', 'warc', 'crawl_threads', 'crawl_async', 'crawl_pipeline']
+
+# metrics compared against a baseline, by whether larger is better
+HIGHER_IS_BETTER = ('ops_per_sec', 'pages_per_sec', 'mb_per_sec')
+LOWER_IS_BETTER = ('p50_ms', 'p99_ms', 'peak_rss_mb')
+
+
+def peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    # ru_maxrss is in kilobytes on linux and in bytes on macos
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_suite(name: str, args: argparse.Namespace) -> typing.Dict[str, typing.Any]:
+    if name == 'extract':
+        result = page_bench.bench(generate_corpus(args.n), args.repeat)
+    elif name == 'utils':
+        result = utils_bench.run(args.n, args.repeat)
+    elif name == 'dates':
+        result = dates_bench.run(args.n * 50, args.repeat)
+    elif name == 'warc':
+        result = warc_bench.run(args.n, args.repeat * 10)
+    else:
+        result = crawl_bench.run(name.partition('_')[2], **crawl_bench.crawl_options(args))
+    result['peak_rss_mb'] = peak_rss_mb()
+    # parser processes of the pipeline mode
+    result['children_peak_rss_mb'] = peak_rss_mb(resource.RUSAGE_CHILDREN)
+    return result
+
+
+def spawn_suite(name: str, argv: typing.List[str]) -> typing.Dict[str, typing.Any]:
+    # every suite gets a fresh interpreter, so peak rss and the process wide
+    # metrics only cover that suite
+    proc = subprocess.run([sys.executable, '-m', 'benchmarks', '--suite', name, *argv], capture_output=True, text=True)
+    if proc.returncode != 0:
+        return dict(error=proc.stderr.strip().splitlines()[-1:] or [f'exit code {proc.returncode}'])
+    return json.loads(proc.stdout)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def flatten(values: typing.Dict[str, typing.Any], prefix: str = '') -> typing.Dict[str, float]:
+    flat = dict()
+    for key, value in values.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{prefix}{key}.'))
+        elif isinstance(value, (int, float)):
+            flat[f'{prefix}{key}'] = value
+    return flat
+
+
+def compare(report: typing.Dict[str, typing.Any], baseline: typing.Dict[str, typing.Any], tolerance: float) -> typing.List[typing.Dict[str, typing.Any]]:
+    regressions = []
+    current, previous = flatten(report['suites']), flatten(baseline['suites'])
+    for key, value in current.items():
+        old = previous.get(key)
+        metric = key.rpartition('.')[2]
+        if not old or metric not in HIGHER_IS_BETTER + LOWER_IS_BETTER:
+            continue
+        change = value / old - 1
+        worse = -change if metric in HIGHER_IS_BETTER else change
+        if worse > tolerance:
+            regressions.append(dict(metric=key, baseline=old, current=value, change=round(change, 3)))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the offline benchmarks and writes one JSON report")
+    parser.add_argument('--suites', type=str, default=','.join(SUITES), help="Comma separated, any of " + ', '.join(SUITES))
+    parser.add_argument('--output', type=str, default='benchmark.json')
+    parser.add_argument('--baseline', type=str, default=None, help="Earlier report to compare with")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="Relative change that counts as a regression")
+    parser.add_argument('-n', type=int, default=60, help="Pages of the generated corpus")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--suite', type=str, default=None, help=argparse.SUPPRESS)
+    crawl_bench.add_arguments(parser)
+    args, argv = parser.parse_args(), sys.argv[1:]
+
+    if args.suite:
+        print(json.dumps(run_suite(args.suite, args)))
+        return
+
+    suites = [name.strip() for name in args.suites.split(',') if name.strip()]
+    unknown = [name for name in suites if name not in SUITES]
+    if unknown:
+        parser.error(f'unknown suites {unknown}')
+
+    report = dict(
+        created_at=datetime.datetime.utcnow().isoformat(),
+        commit=git_commit(),
+        python=platform.python_version(),
+        platform=platform.platform(),
+        args={k: v for k, v in vars(args).items() if k not in ('suite', 'baseline', 'output')},
+        suites=dict()
+    )
+    for name in suites:
+        report['suites'][name] = spawn_suite(name, argv)
+        print(name, json.dumps(report['suites'][name]), file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['regressions'] = compare(report, json.load(f), args.tolerance)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(args.output)
+
+    if report.get('regressions') or any('error' in result for result in report['suites'].values()):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+import typing
+import random
+import html
+
+WORDS = (
+    'market government city council report election energy climate science '
+    'health school football season player research university company price '
+    'water storm police court minister budget festival music film museum '
+    'history railway airport harbour village river mountain forest winter summer'
+).split()
+
+KINDS = ['news', 'wiki', 'listing']
+
+
+def sentence(rng: random.Random, n: int = 12) -> str:
+    words = [rng.choice(WORDS) for _ in range(n)]
+    return ' '.join(words).capitalize() + '.'
+
+
+def paragraph(rng: random.Random, sentences: int = 4) -> str:
+    return ' '.join(sentence(rng, rng.randint(6, 18)) for _ in range(sentences))
+
+
+def title(rng: random.Random) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 8))).title()
+
+
+def head(rng: random.Random, page_title: str, host: str, kind: str) -> str:
+    keywords = ', '.join(rng.sample(WORDS, 5))
+    return f'''<head>
+<meta charset="utf-8">
+<title>{html.escape(page_title)} | {host}</title>
+<meta name="description" content="{html.escape(sentence(rng))}">
+<meta name="keywords" content="{keywords}">
+<meta property="og:title" content="{html.escape(page_title)}">
+<meta property="og:image" content="https://{host}/media/{kind}/cover-{rng.randint(1, 9999)}.jpg">
+<meta property="og:locale" content="en_US">
+<meta property="article:published_time" content="2024-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T0{rng.randint(0, 9)}:30:00Z">
+<link rel="icon" href="/favicon.ico">
+<link rel="stylesheet" href="/static/site.css">
+<script src="/static/app.js"></script>
+<script>window.__state = {{"page": "{kind}"}};</script>
+</head>'''
+
+
+def nav(rng: random.Random, host: str, links: typing.List[str]) -> str:
+    items = ''.join(f'<li><a href="{link}">{html.escape(title(rng))}</a></li>' for link in links)
+    return f'<nav><ul>{items}<li><a href="mailto:info@{host}">Contact</a></li><li><a href="javascript:void(0)">Menu</a></li></ul></nav>'
+
+
+def news_page(rng: random.Random, host: str, links: typing.List[str]) -> str:
+    page_title = title(rng)
+    articles = []
+    for i in range(rng.randint(3, 8)):
+        article_title = title(rng)
+        slug = '-'.join(article_title.lower().split())
+        body = ''.join(f'<p>{paragraph(rng)}</p>' for _ in range(rng.randint(1, 5)))
+        articles.append(f'''<article class="story">
+<h2 class="title"><a href="/news/{slug}">{html.escape(article_title)}</a></h2>
+<time datetime="2024-05-{10 + i:02d}T12:{i:02d}:00+02:00">{10 + i} May 2024</time>
+<img src="/media/news/{slug}.jpg" alt="{html.escape(article_title)}">
+{body}
+<a href="/news/{slug}">Read more</a>
+</article>''')
+    return f'''<!DOCTYPE html>
+<html lang="en">
+{head(rng, page_title, host, 'news')}
+<body>
+<header><img src="/logo.png" alt="{host} logo"></header>
+{nav(rng, host, links[:8])}
+<main>
+<h1>{html.escape(page_title)}</h1>
+{''.join(articles)}
+</main>
+<footer><a href="/files/report-{rng.randint(1, 99)}.pdf">Annual report</a><p>{sentence(rng)}</p></footer>
+</body>
+</html>'''
+
+
+def wiki_page(rng: random.Random, host: str, links: typing.List[str]) -> str:
+    page_title = title(rng)
+    sections = []
+    for _ in range(rng.randint(4, 10)):
+        inline = ' '.join(f'<a href="{link}">{rng.choice(WORDS)}</a>' for link in rng.sample(links, min(3, len(links))))
+        sections.append(f'<h2>{html.escape(title(rng))}</h2><p>{paragraph(rng, 6)} {inline}</p><p>{paragraph(rng, 3)}</p>')
+    table = ''.join(f'<tr><th>{rng.choice(WORDS)}</th><td>{rng.randint(1, 10000)}</td></tr>' for _ in range(12))
+    return f'''<!DOCTYPE html>
+<html lang="en">
+{head(rng, page_title, host, 'wiki')}
+<body>
+{nav(rng, host, links[:5])}
+<div id="content">
+<h1>{html.escape(page_title)}</h1>
+<table class="infobox">{table}</table>
+<img src="/media/wiki/{rng.randint(1, 9999)}.png" title="{html.escape(title(rng))}">
+{''.join(sections)}
+<ul class="references">{''.join(f'<li><a href="{link}">{html.escape(sentence(rng, 6))}</a></li>' for link in links)}</ul>
+</div>
+</body>
+</html>'''
+
+
+def listing_page(rng: random.Random, host: str, links: typing.List[str]) -> str:
+    page_title = title(rng)
+    items = []
+    for i in range(rng.randint(10, 30)):
+        item_title = title(rng)
+        items.append(f'''<div class="post">
+<a href="{links[i % len(links)]}"><img data-src="/media/thumbs/{i}.webp" src="/media/thumbs/{i}.jpg" alt="{html.escape(item_title)}"></a>
+<h3>{html.escape(item_title)}</h3>
+<ul><li>{sentence(rng, 8)}</li><li>{rng.randint(1, 999)} kr</li></ul>
+</div>''')
+    return f'''<!DOCTYPE html>
+<html>
+{head(rng, page_title, host, 'listing')}
+<body>
+{nav(rng, host, links[:10])}
+<section class="results">{''.join(items)}</section>
+<a href="/downloads/catalogue.zip">Catalogue</a>
+</body>
+</html>'''
+
+
+GENERATORS = {
+    'news': news_page,
+    'wiki': wiki_page,
+    'listing': listing_page
+}
+
+
+def generate_page(kind: str, host: str, links: typing.List[str], seed: int = 0) -> str:
+    return GENERATORS[kind](random.Random(f'{kind}:{host}:{seed}'), host, links or ['/'])
+
+
+def generate_corpus(n: int = 60, seed: int = 0) -> typing.List[typing.Tuple[str, str]]:
+    # (url, html) pairs, the same for a given n and seed
+    rng = random.Random(seed)
+    pages = []
+    for i in range(n):
+        kind = KINDS[i % len(KINDS)]
+        host = f'{kind}{i % 7}.example.com'
+        links = [f'https://{kind}{rng.randint(0, 6)}.example.com/{kind}/{rng.randint(0, 10000)}' for _ in range(20)]
+        pages.append((f'https://{host}/{kind}/{i}', generate_page(kind, host, links, seed + i)))
+    return pages
@@ -0,0 +1,150 @@
+import argparse
+import typing
+import threading
+import json
+import time
+from benchmarks.server import LocalWeb
+from benchmarks.sink import connect_sink, count_documents
+from benchmarks.stats import percentile
+from pycrawler.config import CrawlerConfig
+from pycrawler.crawler import Crawler, crawl
+import pycrawler.crawler as crawler_module
+import pycrawler.metrics as metrics
+
+
+class PageTimings(object):
+    # seconds from a url leaving the frontier until its page was written
+    # and the url acknowledged, for urls that produced a page
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = dict()
+        self.persisted = set()
+        self.latencies = []
+
+    def instrument(self):
+        create_frontier = crawler_module.create_frontier
+        persist = Crawler.persist
+        timings = self
+
+        def create_timed_frontier(config, scheduler):
+            frontier = create_frontier(config, scheduler)
+            pop, task_done = frontier.pop, frontier.task_done
+
+            def timed_pop(timeout=None):
+                url = pop(timeout)
+                if url is not None:
+                    with timings.lock:
+                        timings.started[url] = time.perf_counter()
+                return url
+
+            def timed_task_done(url=None):
+                with timings.lock:
+                    started = timings.started.pop(url, None)
+                    if started is not None and url in timings.persisted:
+                        timings.persisted.discard(url)
+                        timings.latencies.append(time.perf_counter() - started)
+                task_done(url)
+
+            frontier.pop, frontier.task_done = timed_pop, timed_task_done
+            return frontier
+
+        def timed_persist(crawler, page):
+            persist(crawler, page)
+            with timings.lock:
+                timings.persisted.add(page.url)
+
+        crawler_module.create_frontier = create_timed_frontier
+        Crawler.persist = timed_persist
+
+
+def stage_quantiles() -> typing.Dict[str, typing.Dict[str, float]]:
+    # histogram quantiles are bucket upper bounds
+    stages = dict(
+        response=metrics.RESPONSE_SECONDS,
+        download=metrics.DOWNLOAD_SECONDS,
+        parse=metrics.PARSE_SECONDS,
+        extract=metrics.EXTRACT_SECONDS,
+        mongo=metrics.MONGO_SECONDS
+    )
+    return {
+        name: dict(p50_ms=histogram.quantile(0.5) * 1000, p99_ms=histogram.quantile(0.99) * 1000)
+        for name, histogram in stages.items()
+    }
+
+
+def run(
+        mode: str = 'threads',
+        hosts: int = 100,
+        pages: int = 50,
+        seeds: int = 10,
+        threads: int = 16,
+        latency: float = 0.02,
+        error_rate: float = 0.02,
+        reset_rate: float = 0.01,
+        host_interval: float = 0.0,
+        mongo_url: str | None = None
+) -> typing.Dict[str, typing.Any]:
+    sink = connect_sink(mongo_url)
+    timings = PageTimings()
+    timings.instrument()
+
+    with LocalWeb(hosts, pages=pages, latency=latency, error_rate=error_rate, reset_rate=reset_rate) as web:
+        config = CrawlerConfig(
+            mode=mode,
+            num_threads=threads,
+            max_concurrency=threads * 8,
+            parse_workers=2,
+            host_min_interval=host_interval,
+            fetch_timeout=2,
+            stats_interval=3600
+        )
+        started = time.perf_counter()
+        crawl(web.seeds(seeds), config)
+        elapsed = time.perf_counter() - started
+
+    pages_written = metrics.PAGES.total()
+    return dict(
+        mode=mode,
+        sink=sink,
+        hosts=hosts,
+        threads=threads,
+        seconds=elapsed,
+        pages=pages_written,
+        pages_per_sec=pages_written / elapsed if elapsed > 0 else 0.0,
+        mb_per_sec=metrics.BYTES.total() / elapsed / 1e6 if elapsed > 0 else 0.0,
+        p50_ms=percentile(timings.latencies, 50) * 1000,
+        p99_ms=percentile(timings.latencies, 99) * 1000,
+        fetch_errors=dict((labels[0], n) for labels, n in metrics.FETCH_ERRORS.values.items()),
+        crawl_errors=metrics.CRAWL_ERRORS.total(),
+        stages=stage_quantiles(),
+        documents=count_documents()
+    )
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--hosts', type=int, default=100, help="Hosts in the link graph, each crawled at most MAX_DOMAIN_VISITS times")
+    parser.add_argument('--pages', type=int, default=50, help="Pages per host")
+    parser.add_argument('--seeds', type=int, default=10)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--latency', type=float, default=0.02, help="Mean seconds before the server answers")
+    parser.add_argument('--error_rate', type=float, default=0.02, help="Share of urls answered with a 503")
+    parser.add_argument('--reset_rate', type=float, default=0.01, help="Share of urls whose connection is reset")
+    parser.add_argument('--host_interval', type=float, default=0.0)
+    parser.add_argument('--mongo_url', type=str, default=None, help="Local mongod to write to instead of mongomock, it is emptied first")
+
+
+def crawl_options(args: argparse.Namespace) -> typing.Dict[str, typing.Any]:
+    names = ['hosts', 'pages', 'seeds', 'threads', 'latency', 'error_rate', 'reset_rate', 'host_interval', 'mongo_url']
+    return {name: getattr(args, name) for name in names}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mode', type=str, choices=['threads', 'async', 'pipeline'], default='threads')
+    add_arguments(parser)
+    args = parser.parse_args()
+    print(json.dumps(run(args.mode, **crawl_options(args)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+import argparse
+import typing
+import datetime
+import random
+import json
+import warnings
+import dateutil.parser
+from benchmarks.corpus import generate_corpus
+from benchmarks.stats import measure
+from pycrawler.scan import scan_document
+from pycrawler.page import DATE_KEYS
+from pycrawler.meta import Meta
+import pycrawler.dates as dates
+
+# the shapes found in <time> elements and date meta tags: wordpress and
+# og:article timestamps, rss style dates, the text of <time> and values
+# no parser understands
+FORMATS = [
+    lambda d: d.strftime('%Y-%m-%dT%H:%M:%S+00:00'),
+    lambda d: d.strftime('%Y-%m-%dT%H:%M:%SZ'),
+    lambda d: d.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z',
+    lambda d: d.strftime('%Y-%m-%dT%H:%M:%S+0200'),
+    lambda d: d.strftime('%Y-%m-%d %H:%M:%S'),
+    lambda d: d.strftime('%Y-%m-%d'),
+    lambda d: d.strftime('%a, %d %b %Y %H:%M:%S GMT'),
+    lambda d: d.strftime('%a, %d %b %Y %H:%M:%S -0500'),
+    lambda d: d.strftime('%d %b %Y %H:%M'),
+    lambda d: d.strftime('%B %d, %Y'),
+    lambda d: d.strftime('%d %B %Y'),
+    lambda d: d.strftime('%b %d, %Y %I:%M %p'),
+    lambda d: d.strftime('%d/%m/%Y'),
+    lambda d: d.strftime('%m/%d/%Y %H:%M'),
+    lambda d: d.strftime('%Y/%m/%d'),
+    lambda d: d.strftime('%A, %B %d, %Y'),
+    lambda d: str(int(d.timestamp())),
+    lambda d: str(int(d.timestamp() * 1000)),
+]
+UNPARSEABLE = ['2 hours ago', 'Yesterday', 'Updated', 'Published', '—', 'Read more', 'vor 3 Tagen', 'il y a 5 minutes']
+
+
+def date_samples(n: int, formats_per_site: int = 2, seed: int = 0) -> typing.List[str]:
+    """
+    n values as a crawl sees them: every site sticks to a couple of
+    formats, and pages of the generated corpus add their meta and <time>
+    dates.
+    """
+    rng = random.Random(seed)
+    values = []
+    start = datetime.datetime(2015, 1, 1, tzinfo=datetime.timezone.utc)
+    sites = [rng.sample(FORMATS, formats_per_site) for _ in range(max(1, n // 50))]
+    while len(values) < n:
+        formats = rng.choice(sites)
+        if rng.random() < 0.05:
+            values.append(rng.choice(UNPARSEABLE))
+            continue
+        date = start + datetime.timedelta(seconds=rng.randrange(10 * 365 * 24 * 3600))
+        values.append(rng.choice(formats)(date))
+    for url, html in generate_corpus(max(1, n // 100)):
+        scan = scan_document(html, 'bs4')
+        meta = Meta(scan.meta)
+        values.extend(value for value in map(meta.get, DATE_KEYS) if value)
+        values.extend(article.time.get('datetime') or article.time.text for article in scan.articles if article.time)
+    return values
+
+
+def dateutil_date(value: str) -> datetime.datetime | None:
+    try:
+        return dateutil.parser.parse(value)
+    except Exception:
+        return None
+
+
+def legacy(value: str) -> datetime.datetime | None:
+    # what page.py did before: validate with dateutil, then parse again
+    if dateutil_date(value) is None:
+        return None
+    return dateutil.parser.parse(value)
+
+
+def same(a: datetime.datetime | None, b: datetime.datetime | None) -> bool:
+    if a is None or b is None:
+        return a is b
+    if (a.tzinfo is None) != (b.tzinfo is None):
+        return False
+    return a == b
+
+
+def parity(values: typing.List[str]) -> typing.Dict[str, typing.Any]:
+    # unix timestamps are the only values expected to differ, dateutil reads them as years
+    mismatches, fast_only = [], 0
+    for value in dict.fromkeys(values):
+        expected, actual = dateutil_date(value), dates.parse_date.__wrapped__(value)
+        if same(expected, actual):
+            continue
+        if expected is None and (dates.UNIX_SECONDS.fullmatch(value) or dates.UNIX_MILLISECONDS.fullmatch(value)):
+            fast_only += 1
+            continue
+        mismatches.append(dict(value=value, dateutil=repr(expected), parse_date=repr(actual)))
+    return dict(mismatches=mismatches, fast_only=fast_only)
+
+
+def bench(values: typing.List[str], repeat: int = 3) -> typing.Dict[str, typing.Any]:
+    dates.parse_date.cache_clear()
+    functions = dict(
+        legacy=legacy,
+        dateutil=dateutil_date,
+        parse_date_uncached=dates.parse_date.__wrapped__,
+        parse_date=dates.parse_date
+    )
+    return {name: measure(fun, values, repeat) for name, fun in functions.items()}
+
+
+def run(n: int = 5000, repeat: int = 3) -> typing.Dict[str, typing.Any]:
+    values = date_samples(n)
+    with warnings.catch_warnings():
+        # dateutil warns about every zone name it does not know
+        warnings.simplefilter('ignore')
+        checked = parity(values)
+        result = bench(values, repeat)
+    result['values'] = len(values)
+    result['unique_values'] = len(set(values))
+    result['parity_mismatches'] = len(checked['mismatches'])
+    result['fast_only'] = checked['fast_only']
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=5000, help="Date values to parse")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    values = date_samples(args.n)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        checked = parity(values)
+        throughput = bench(values, args.repeat)
+    print(json.dumps(dict(parity=checked, throughput=throughput), indent=2))
+    if checked['mismatches']:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import typing
+import random
+import json
+import re
+from benchmarks.corpus import generate_corpus, WORDS
+from benchmarks.stats import measure
+from pycrawler.scan import scan_document
+import pycrawler.keywords as keywords
+
+# utils.keywordify as it was before pycrawler.keywords, kept to check parity
+
+LEGACY_STOP_WORDS = json.loads(open(keywords.STOPWORDS_FNAME).read())
+
+LEGACY_SEPARATORS = [' ', '|', ',', '&', '\n', '\r', '_', '-']
+
+
+def legacy_unique(items):
+    return list(set(items))
+
+
+def legacy_flatten(items):
+    if not type(items) == list:
+        return items
+    flat = []
+    for x in items:
+        if type(x) == list:
+            flat.extend(x)
+        else:
+            flat.append(x)
+    return flat
+
+
+def legacy_is_stopword(word: str) -> bool:
+    return word.lower() in LEGACY_STOP_WORDS
+
+
+def legacy_normalize_string(value: str) -> str:
+    return re.sub('”|·|\n|\r|\t|:|\\?|~|!|@|#|\\$|%|\\^|\\&|\\*|\\(|\\)|/|<|>|—|–|-|_|\\+|-|\\{|\\}|\\,|\\.|\\\'|\\"', '', value.lower())
+
+
+def legacy_keywordify(words: typing.List[str] | str) -> typing.List[str]:
+    if type(words) == str:
+        if words in ['', '.', ' ']:
+            return []
+        for sep in LEGACY_SEPARATORS:
+            if sep in words:
+                parts = legacy_unique(list(filter(lambda x: len(x) > 0 and x != '', words.split(sep))))
+                return legacy_flatten(legacy_keywordify(parts))
+        return [legacy_normalize_string(words)]
+    return legacy_unique(list(filter(lambda x: len(x) > 0 and x != '' and x != '.' and x != ' ' and not legacy_is_stopword(x), map(legacy_normalize_string, legacy_flatten(list(map(legacy_keywordify, words)))))))
+
+
+PUNCTUATION = ['', '', '.', ',', ' |', ' -', ':', '!', '?', "'s", '"', '(', ')', '—', ' & ', '_', '/', '\t', '\n']
+SAMPLE_WORDS = [*WORDS, 'the', 'and', 'of', 'The', 'A', 'Über', 'café', 'İstanbul', 'don\'t', 'x86_64', 'e-mail']
+
+
+def random_inputs(n: int, seed: int = 0) -> typing.List[str | typing.List[str]]:
+    rng = random.Random(seed)
+    inputs = ['', '.', ' ', '...', 'the', 'The', 'single', '-', ' | ', 'a,b,,c']
+    while len(inputs) < n:
+        words = [rng.choice(SAMPLE_WORDS) + rng.choice(PUNCTUATION) for _ in range(rng.randint(1, 12))]
+        text = rng.choice([' ', '', '|', ',']).join(words)
+        inputs.append(text if rng.random() < 0.7 else text.split(rng.choice([' ', ','])))
+    return inputs
+
+
+def corpus_inputs(n: int) -> typing.List[str | typing.List[str]]:
+    # what Page hands to keywordify: titles, image names and article titles
+    inputs = []
+    for _, html in generate_corpus(n):
+        scan = scan_document(html, 'bs4')
+        if scan.title:
+            inputs.append([scan.title])
+        inputs.extend(image.get('alt') or '' for image in scan.images)
+        inputs.extend((article.title or '').strip() for article in scan.articles)
+    return inputs
+
+
+def parity(inputs: typing.List[str | typing.List[str]]) -> typing.List[typing.Dict[str, typing.Any]]:
+    mismatches = []
+    for value in inputs:
+        expected = set(legacy_keywordify(value))
+        actual = keywords.keywordify(value)
+        if set(actual) != expected or len(actual) != len(expected):
+            mismatches.append(dict(input=value, expected=sorted(expected), actual=actual))
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=2000, help="Random inputs")
+    parser.add_argument('--pages', type=int, default=60, help="Pages of the generated corpus")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    inputs = [*random_inputs(args.n), *corpus_inputs(args.pages)]
+    mismatches = parity(inputs)
+    throughput = dict(
+        legacy=measure(legacy_keywordify, inputs, args.repeat),
+        keywords=measure(keywords.keywordify, inputs, args.repeat)
+    )
+    throughput['speedup'] = throughput['keywords']['ops_per_sec'] / throughput['legacy']['ops_per_sec']
+    print(json.dumps(dict(inputs=len(inputs), parity_mismatches=mismatches[:20], throughput=throughput), indent=2))
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import typing
+import json
+from benchmarks.corpus import generate_corpus
+from benchmarks.stats import measure
+from pycrawler.page import PageResult, extract_page
+
+BACKENDS = ['bs4', 'lxml']
+
+
+def summarize(result: PageResult) -> typing.Dict[str, typing.Any]:
+    return dict(
+        title=result.title,
+        language=result.language,
+        keywords=sorted(set(result.keywords)),
+        links=sorted(set(result.links)),
+        files=sorted(f.url for f in result.files),
+        images=sorted((i.url, i.name) for i in result.images),
+        articles=sorted((a.uid, a.name, a.text, a.link, tuple(sorted(a.links))) for a in result.articles)
+    )
+
+
+def parity(corpus: typing.List[typing.Tuple[str, str]], backend: str = 'lxml') -> typing.List[typing.Dict[str, typing.Any]]:
+    mismatches = []
+    for url, html in corpus:
+        expected = summarize(extract_page(url, html, 'bs4'))
+        actual = summarize(extract_page(url, html, backend))
+        fields = [key for key in expected if expected[key] != actual[key]]
+        if fields:
+            mismatches.append(dict(url=url, fields=fields))
+    return mismatches
+
+
+def bench(corpus: typing.List[typing.Tuple[str, str]], repeat: int = 3) -> typing.Dict[str, typing.Any]:
+    results = dict()
+    total_bytes = sum(len(html.encode('utf-8')) for _, html in corpus)
+    for backend in BACKENDS:
+        stats = measure(lambda page: extract_page(page[0], page[1], backend), corpus, repeat)
+        stats['mb_per_sec'] = total_bytes * repeat / stats['seconds'] / 1e6
+        results[backend] = stats
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=60, help="Pages in the generated corpus")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.n)
+    mismatches = parity(corpus)
+    print(json.dumps(dict(parity_mismatches=mismatches, throughput=bench(corpus, args.repeat)), indent=2))
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import tempfile
+import time
+import os
+from pycrawler.seen import BloomFilter
+
+
+def make_urls(n: int, offset: int = 0):
+    return [f'https://host{(i * 7919) % 50000}.example.com/articles/{i}?page={i % 13}' for i in range(offset, offset + n)]
+
+
+def bench(capacity: int, error_rate: float, n: int, path: str | None = None):
+    seen = BloomFilter(capacity=capacity, error_rate=error_rate, path=path)
+    urls = make_urls(n)
+    others = make_urls(n, offset=n)
+
+    start = time.perf_counter()
+    for url in urls:
+        seen.add(url)
+    add_ns = (time.perf_counter() - start) / n * 1e9
+
+    start = time.perf_counter()
+    for url in urls:
+        url in seen
+    hit_ns = (time.perf_counter() - start) / n * 1e9
+
+    start = time.perf_counter()
+    false_positives = sum(1 for url in others if url in seen)
+    miss_ns = (time.perf_counter() - start) / n * 1e9
+
+    result = dict(
+        backend='mmap' if path else 'memory',
+        capacity=capacity,
+        error_rate=error_rate,
+        inserted=n,
+        bytes=seen.size_bytes(),
+        bytes_per_url=seen.size_bytes() / capacity,
+        hashes=seen.num_hashes,
+        add_ns=round(add_ns),
+        hit_ns=round(hit_ns),
+        miss_ns=round(miss_ns),
+        false_positive_rate=false_positives / n
+    )
+    seen.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--capacity', type=int, default=10_000_000)
+    parser.add_argument('--error_rate', type=float, default=0.001)
+    parser.add_argument('-n', type=int, default=200_000, help="Urls to insert and look up")
+    args = parser.parse_args()
+
+    print(bench(args.capacity, args.error_rate, args.n))
+    with tempfile.TemporaryDirectory() as tmp:
+        print(bench(args.capacity, args.error_rate, args.n, path=os.path.join(tmp, 'seen.bloom')))
+    # filled to capacity, the measured false positive rate should match error_rate
+    print(bench(args.n, args.error_rate, args.n))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+import typing
+import argparse
+import functools
+import hashlib
+import multiprocessing
+import random
+import socket
+import struct
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from benchmarks.corpus import generate_page, KINDS
+
+ROBOTS = b'User-agent: *\nAllow: /\n'
+
+
+def stable_hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class LinkGraph(object):
+    """
+    Synthetic web of hosts * pages pages. Every path of a host resolves to
+    one of its pages, so links made up by the corpus generator work too.
+    Latency and failures are drawn per url from a seeded generator, the
+    same url always fails the same way.
+    """
+    hosts: typing.List[str]
+    pages: int
+    out_links: int
+    local_ratio: float
+    latency: float
+    jitter: float
+    error_rate: float
+    reset_rate: float
+
+    def __init__(
+            self,
+            hosts: typing.List[str],
+            pages: int = 50,
+            out_links: int = 20,
+            local_ratio: float = 0.7,
+            latency: float = 0.02,
+            jitter: float = 0.5,
+            error_rate: float = 0.02,
+            reset_rate: float = 0.01,
+            seed: int = 0
+    ):
+        self.hosts = hosts
+        self.pages = pages
+        self.out_links = out_links
+        self.local_ratio = local_ratio
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.reset_rate = reset_rate
+        self.seed = seed
+
+    def page_id(self, path: str) -> int:
+        if path.startswith('/p/') and path[3:].isdigit():
+            return int(path[3:]) % self.pages
+        return stable_hash(path) % self.pages
+
+    def links(self, host: int, page: int) -> typing.List[str]:
+        rng = random.Random(f'{self.seed}:links:{host}:{page}')
+        links = []
+        for _ in range(self.out_links):
+            target = host if rng.random() < self.local_ratio else rng.randrange(len(self.hosts))
+            links.append(f'http://{self.hosts[target]}/p/{rng.randrange(self.pages)}')
+        return links
+
+    @functools.lru_cache(maxsize=4096)
+    def html(self, host: int, page: int) -> bytes:
+        kind = KINDS[page % len(KINDS)]
+        return generate_page(kind, self.hosts[host], self.links(host, page), self.seed + page).encode('utf-8')
+
+    def outcome(self, url: str) -> typing.Tuple[str, float]:
+        # ('ok' | 'error' | 'reset', seconds to wait before answering)
+        rng = random.Random(f'{self.seed}:outcome:{url}')
+        delay = max(0.0, rng.gauss(self.latency, self.latency * self.jitter))
+        roll = rng.random()
+        if roll < self.reset_rate:
+            return 'reset', delay
+        if roll < self.reset_rate + self.error_rate:
+            return 'error', delay
+        return 'ok', delay
+
+
+class GraphHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server: 'GraphServer'
+
+    def do_GET(self):
+        graph = self.server.graph
+        path = self.path.split('?', 1)[0]
+        if path == '/robots.txt':
+            self.reply(200, 'text/plain', ROBOTS)
+            return
+
+        outcome, delay = graph.outcome(f'{self.server.host_index}:{path}')
+        time.sleep(delay)
+        if outcome == 'reset':
+            # RST instead of FIN, the client sees a connection reset
+            self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+            self.close_connection = True
+            return
+        if outcome == 'error':
+            self.reply(503, 'text/plain', b'unavailable')
+            return
+        self.reply(200, 'text/html; charset=utf-8', graph.html(self.server.host_index, graph.page_id(path)))
+
+    def reply(self, status: int, content_type: str, body: bytes):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class GraphServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # many crawler threads connect at once
+    request_queue_size = 128
+
+    def __init__(self, graph: LinkGraph, host_index: int):
+        self.graph = graph
+        self.host_index = host_index
+        super().__init__(('127.0.0.1', 0), GraphHandler)
+
+
+def bind_hosts(n: int) -> typing.List[GraphServer]:
+    # one listening port per host, hosts differ by port so politeness and
+    # the per-domain limits treat them as separate sites
+    return [GraphServer(None, i) for i in range(n)]
+
+
+def serve_graph(servers: typing.List[GraphServer], graph: LinkGraph, stopped: threading.Event | None = None):
+    for server in servers:
+        server.graph = graph
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    if stopped is not None:
+        stopped.wait()
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+
+def _run(conn, n: int, options: typing.Dict[str, typing.Any]):
+    servers = bind_hosts(n)
+    hosts = [f'127.0.0.1:{server.server_address[1]}' for server in servers]
+    graph = LinkGraph(hosts, **options)
+    serve_graph(servers, graph)
+    conn.send(hosts)
+    # serve until the parent closes its end
+    try:
+        conn.recv()
+    except EOFError:
+        pass
+
+
+class LocalWeb(object):
+    """
+    Serves a LinkGraph from a separate process, so generating and sending
+    pages does not compete with the crawler being measured for the GIL.
+    """
+    hosts: typing.List[str]
+
+    def __init__(self, n_hosts: int = 100, **options):
+        self.n_hosts = n_hosts
+        self.options = options
+        self.hosts = []
+        self.process = None
+
+    def start(self) -> 'LocalWeb':
+        parent, child = multiprocessing.Pipe()
+        self.conn = parent
+        self.process = multiprocessing.get_context('spawn').Process(target=_run, args=(child, self.n_hosts, self.options), daemon=True)
+        self.process.start()
+        child.close()
+        self.hosts = parent.recv()
+        return self
+
+    def seeds(self, n: int = 10) -> typing.List[str]:
+        return [f'http://{host}/p/0' for host in self.hosts[:n]]
+
+    def stop(self):
+        if self.process is not None:
+            self.conn.close()
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+
+    def __enter__(self) -> 'LocalWeb':
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hosts', type=int, default=100)
+    parser.add_argument('--pages', type=int, default=50, help="Pages per host")
+    parser.add_argument('--latency', type=float, default=0.02, help="Mean seconds before a response")
+    parser.add_argument('--error_rate', type=float, default=0.02)
+    parser.add_argument('--reset_rate', type=float, default=0.01)
+    args = parser.parse_args()
+
+    servers = bind_hosts(args.hosts)
+    hosts = [f'127.0.0.1:{server.server_address[1]}' for server in servers]
+    graph = LinkGraph(hosts, pages=args.pages, latency=args.latency, error_rate=args.error_rate, reset_rate=args.reset_rate)
+    print('\n'.join(f'http://{host}/p/0' for host in hosts))
+    serve_graph(servers, graph, threading.Event())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+import typing
+import bson
+import mongoengine
+import pycrawler.crawler as crawler_module
+from pymongo.errors import BulkWriteError, OperationFailure
+
+
+class BulkResult(object):
+    def __init__(self, upserted_ids: typing.Dict[int, typing.Any]):
+        self.upserted_ids = upserted_ids
+
+
+def mongomock_bulk_write(self, requests, ordered: bool = True, **kwargs) -> BulkResult:
+    # mongomock builds UpdateOne through pymongo's bulk builder, which
+    # passes arguments newer pymongo versions added and mongomock does not
+    # take. The crawler only sends UpdateOne, so they are applied one by one.
+    # Failed writes are reported the way pymongo does, in a BulkWriteError
+    # listing the upserts that did happen
+    upserted = dict()
+    errors = []
+    matched = modified = 0
+    for index, op in enumerate(requests):
+        try:
+            result = self.update_one(op._filter, op._doc, upsert=op._upsert)
+        except OperationFailure as e:
+            errors.append(dict(index=index, code=e.code, errmsg=str(e), op=dict(q=op._filter, u=op._doc, upsert=op._upsert)))
+            if ordered:
+                break
+            continue
+        matched += result.matched_count
+        modified += result.modified_count
+        if result.upserted_id is not None:
+            upserted[index] = result.upserted_id
+    if errors:
+        raise BulkWriteError(dict(
+            writeErrors=errors,
+            writeConcernErrors=[],
+            nInserted=0,
+            nUpserted=len(upserted),
+            nMatched=matched,
+            nModified=modified,
+            nRemoved=0,
+            upserted=[dict(index=index, _id=id) for index, id in upserted.items()]
+        ))
+    return BulkResult(upserted)
+
+
+def equality_filter(filter) -> typing.Tuple[str, typing.Any] | None:
+    # {'url': 'https://...'}, the shape of nearly every crawler query
+    if not isinstance(filter, dict) or len(filter) != 1:
+        return None
+    (key, value), = filter.items()
+    if key.startswith('$') or '.' in key or not isinstance(value, (str, int, bson.ObjectId)) or isinstance(value, bool):
+        return None
+    return key, value
+
+
+def patch_mongomock():
+    # mongomock runs every filter through its full matcher for every stored
+    # document, per write and again for each unique index, which made the
+    # sink and not the crawler dominate the benchmark. Plain equality on one
+    # field, the shape of the upserts, is matched directly.
+    import mongomock
+    collection = mongomock.collection.Collection
+    iter_documents = collection._iter_documents
+
+    def fast_iter_documents(self, filter):
+        equality = equality_filter(filter)
+        if equality is None:
+            return iter_documents(self, filter)
+        key, value = equality
+        return (
+            document for document in list(self._store.documents)
+            if (found := document.get(key)) == value or (isinstance(found, list) and value in found)
+        )
+
+    collection._iter_documents = fast_iter_documents
+    collection.bulk_write = mongomock_bulk_write
+
+
+def keep_sink(host: str | None = None):
+    # crawl() connects to config.mongo_url, the sink registered before is used instead
+    return mongoengine.get_connection()
+
+
+def connect_sink(mongo_url: str | None = None) -> str:
+    """
+    Registers the default connection crawl() writes to: an in-process
+    mongomock database, or a local mongod at mongo_url which is emptied
+    first. Returns the name of the sink for the report.
+    """
+    mongoengine.disconnect()
+    crawler_module.connect_db = keep_sink
+    if mongo_url:
+        connection = mongoengine.connect(host=mongo_url)
+        db = mongoengine.get_db()
+        connection.drop_database(db.name)
+        return 'mongod'
+
+    import mongomock
+    patch_mongomock()
+    mongoengine.connect('pycrawler_bench', host='mongodb://localhost', mongo_client_class=mongomock.MongoClient)
+    return 'mongomock'
+
+
+def count_documents() -> typing.Dict[str, int]:
+    db = mongoengine.get_db()
+    return {name: db[name].count_documents({}) for name in db.list_collection_names()}
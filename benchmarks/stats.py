@@ -0,0 +1,28 @@
+import typing
+import time
+
+
+def percentile(values: typing.List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(fun: typing.Callable[[typing.Any], typing.Any], items: typing.List[typing.Any], repeat: int = 1) -> typing.Dict[str, float]:
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            t = time.perf_counter()
+            fun(item)
+            latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    return dict(
+        ops=len(latencies),
+        seconds=elapsed,
+        ops_per_sec=len(latencies) / elapsed if elapsed > 0 else 0.0,
+        p50_ms=percentile(latencies, 50) * 1000,
+        p99_ms=percentile(latencies, 99) * 1000
+    )
@@ -0,0 +1,54 @@
+import argparse
+import typing
+import json
+from benchmarks.corpus import generate_corpus
+from benchmarks.stats import measure
+from pycrawler.scan import scan_document
+from pycrawler.urlfilter import UrlFilter, url_host
+import pycrawler.utils as utils
+
+
+def corpus_samples(n: int) -> typing.Dict[str, typing.List[str]]:
+    # urls and texts as the crawler sees them on generated pages
+    urls, texts = [], []
+    for url, html in generate_corpus(n):
+        scan = scan_document(html, 'bs4')
+        urls.append(url)
+        urls.extend(f'https://{url_host(url)}{href}' if href.startswith('/') else href for href in scan.links if href)
+        texts.append(scan.title or '')
+        texts.extend(image.get('alt') or '' for image in scan.images)
+        texts.extend((article.title or '').strip() for article in scan.articles)
+    return dict(urls=urls, texts=texts)
+
+
+def run(n: int = 60, repeat: int = 3) -> typing.Dict[str, typing.Any]:
+    samples = corpus_samples(n)
+    urls, texts = samples['urls'], samples['texts']
+    url_filter = UrlFilter([])
+    canonical = [x for x in map(url_filter.filter, urls) if x]
+    functions = dict(
+        url_filter=(url_filter.filter, urls),
+        url_host=(url_host, canonical),
+        url_get_domain=(utils.url_get_domain, urls),
+        url_get_extension=(utils.url_get_extension, urls),
+        url_get_language=(utils.url_get_language, urls),
+        is_file_url=(utils.is_file_url, urls),
+        create_uid=(utils.create_uid, urls),
+        keywordify=(utils.keywordify, texts),
+        normalize_string=(utils.normalize_string, texts),
+        find_sentence=(utils.find_sentence, texts),
+        base64_encode=(utils.base64_encode, urls)
+    )
+    return {name: measure(fun, items, repeat) for name, (fun, items) in functions.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=60, help="Pages of the generated corpus")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.n, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import argparse
+import typing
+import tempfile
+import random
+import shutil
+import time
+import json
+import os
+from benchmarks.corpus import generate_corpus
+from benchmarks.stats import measure
+from pycrawler.config import CrawlerConfig
+from pycrawler.fetch import FetchResult, create_result
+from pycrawler.warc import WarcWriter, EXTENSIONS, create_codec, read_index, read_response
+
+HEADERS = {
+    'Content-Type': 'text/html; charset=utf-8',
+    'Content-Encoding': 'gzip',
+    'Server': 'nginx',
+    'Cache-Control': 'max-age=600',
+    'Last-Modified': 'Tue, 14 Nov 2023 10:00:00 GMT'
+}
+
+
+def responses(n: int, repeat: int = 1) -> typing.List[FetchResult]:
+    # every page once per round, under a url of its own
+    corpus = generate_corpus(n)
+    return [
+        create_result(f'{url}?round={i}', 200, HEADERS, html.encode('utf-8'))
+        for i in range(repeat) for url, html in corpus
+    ]
+
+
+def available(compression: str) -> bool:
+    try:
+        create_codec(compression)
+        return True
+    except ValueError:
+        return False
+
+
+def bench_compression(items: typing.List[FetchResult], compression: str, max_bytes: int, reads: int) -> typing.Dict[str, typing.Any]:
+    directory = tempfile.mkdtemp(prefix='pycrawler-warc-')
+    try:
+        config = CrawlerConfig(warc_dir=directory, warc_compression=compression, warc_max_bytes=max_bytes, warc_queue_bytes=0)
+        writer = WarcWriter(config)
+        writer.start()
+        started = time.perf_counter()
+        # submit() is what the fetch path pays, the writer thread does the rest
+        submit = measure(writer.submit, items)
+        writer.stop()
+        seconds = time.perf_counter() - started
+
+        total = sum(item.size for item in items)
+        files = [name for name in os.listdir(directory) if name.endswith(EXTENSIONS[compression])]
+        stored = sum(os.path.getsize(os.path.join(directory, name)) for name in files)
+
+        entries = list(read_index(directory))
+        bodies = {item.url: item.body for item in items}
+        sample = random.Random(0).sample(entries, min(reads, len(entries)))
+        read = measure(lambda entry: read_response(directory, entry), sample)
+        mismatches = sum(read_response(directory, entry).body != bodies.get(entry.url) for entry in sample)
+        return dict(
+            submit=dict(p50_ms=submit['p50_ms'], p99_ms=submit['p99_ms']),
+            write=dict(
+                seconds=seconds,
+                ops_per_sec=len(items) / seconds,
+                mb_per_sec=total / seconds / 1e6
+            ),
+            read=read,
+            records=len(entries),
+            files=len(files),
+            ratio=stored / max(1, total),
+            read_mismatches=mismatches
+        )
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def run(n: int = 60, repeat: int = 20, max_bytes: int = 4 * 1024 * 1024, reads: int = 500) -> typing.Dict[str, typing.Any]:
+    items = responses(n, repeat)
+    result = {
+        compression: bench_compression(items, compression, max_bytes, reads)
+        for compression in EXTENSIONS if available(compression)
+    }
+    result['responses'] = len(items)
+    result['mb'] = sum(item.size for item in items) / 1e6
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=60, help="Pages of the generated corpus")
+    parser.add_argument('--repeat', type=int, default=20, help="Times every page is archived, under distinct urls")
+    parser.add_argument('--max_bytes', type=int, default=4 * 1024 * 1024, help="Size at which warc files are rotated")
+    args = parser.parse_args()
+    result = run(args.n, args.repeat, args.max_bytes)
+    print(json.dumps(result, indent=2))
+    if any(isinstance(x, dict) and x['read_mismatches'] for x in result.values()):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
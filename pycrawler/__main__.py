@@ -1,18 +1,54 @@
 from pycrawler.crawler import Crawler, crawl
 from pycrawler.config import CrawlerConfig
 import argparse
+import logging
 import json
 
 parser = argparse.ArgumentParser()
-parser.add_argument('seed', type=str, help="JSON file containing an array of URLS")
+parser.add_argument('seed', type=str, nargs='?', help="JSON file containing an array of URLS", default=None)
 parser.add_argument('--threads', type=int, help="Number of threads", default=12)
 parser.add_argument('--qdrant_enabled', type=bool, help="Enable qdrant", default=False)
 parser.add_argument('--qdrant_string', type=str, help="qdrant connection string", default="http://localhost:6333")
+parser.add_argument('--mode', type=str, help="Crawl mode", choices=['threads', 'async', 'pipeline'], default='threads')
+parser.add_argument('--concurrency', type=int, help="Max requests in flight in async mode", default=512)
+parser.add_argument('--timeout', type=float, help="HTTP request timeout in seconds", default=4)
+parser.add_argument('--max_page_bytes', type=int, help="Responses larger than this are dropped", default=5 * 1024 * 1024)
+parser.add_argument('--max_inflight_bytes', type=int, help="Bytes of fetched pages not yet written before fetching waits, 0 for no limit", default=256 * 1024 * 1024)
+parser.add_argument('--pool_maxsize', type=int, help="Keep-alive connections per host", default=4)
+parser.add_argument('--host_interval', type=float, help="Minimum seconds between requests to the same host", default=1.0)
+parser.add_argument('--seen_path', type=str, help="File backing the seen-url filter, kept across restarts", default=None)
+parser.add_argument('--checkpoint_dir', type=str, help="Directory for periodic crawl state checkpoints", default=None)
+parser.add_argument('--checkpoint_interval', type=float, help="Seconds between checkpoints", default=60)
+parser.add_argument('--resume', action='store_true', help="Continue from the checkpoint in --checkpoint_dir")
+parser.add_argument('--dedup', action='store_true', help="Link near-duplicate articles to the first one written instead of writing them")
+parser.add_argument('--dedup_distance', type=int, help="Max differing SimHash bits of near-duplicate articles", default=3)
+parser.add_argument('--warc_dir', type=str, help="Archive fetched responses as WARC files in this directory", default=None)
+parser.add_argument('--warc_compression', type=str, help="Compression of the WARC files", choices=['gzip', 'zstd', 'none'], default='gzip')
+parser.add_argument('--num_workers', type=int, help="Crawler processes sharing the crawl, hosts are split between them", default=1)
+parser.add_argument('--worker_index', type=int, help="Index of this process in [0, num_workers)", default=0)
+parser.add_argument('--parse_workers', type=int, help="Parser processes in pipeline mode, 0 for one per cpu", default=0)
+parser.add_argument('--write_workers', type=int, help="Writer threads in pipeline mode", default=2)
+parser.add_argument('--parser', type=str, help="Extraction backend", choices=['bs4', 'lxml'], default='bs4')
 parser.add_argument('--mongo_url', type=str, help="mongodb connection string", default='mongodb://127.0.0.1:27013/test')
+parser.add_argument('--metrics_port', type=int, help="Serve prometheus metrics on this port", default=None)
+parser.add_argument('--stats_interval', type=float, help="Seconds between logged stats lines, 0 turns them off", default=30)
+parser.add_argument('--log_level', type=str, help="Logging level", choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], default='INFO')
+parser.add_argument('--profile', type=str, help="Profiling modes, comma separated: cpu, memory, gc", default='')
+parser.add_argument('--profile_dir', type=str, help="Directory for profile dumps", default='profile')
+parser.add_argument('--profile_interval', type=float, help="Seconds between profile dumps", default=60)
+parser.add_argument('--gc_threshold', type=int, nargs=3, help="gc.set_threshold arguments", default=None)
 args = parser.parse_args()
 
 if __name__ == '__main__':
-    urls = json.loads(open(args.seed).read())
+    if args.resume and not args.checkpoint_dir:
+        parser.error('--resume needs --checkpoint_dir')
+    if not args.seed and not args.resume:
+        parser.error('a seed file is required unless resuming')
+    logging.basicConfig(
+        level=args.log_level,
+        format='%(asctime)s %(levelname)s %(name)s %(threadName)s %(message)s'
+    )
+    urls = json.loads(open(args.seed).read()) if args.seed else []
 
     config = CrawlerConfig(
         blacklist=[
@@ -22,6 +58,32 @@ if __name__ == '__main__':
         num_threads=args.threads,
         qdrant_enabled=args.qdrant_enabled,
         qdrant_string=args.qdrant_string,
-        mongo_url=args.mongo_url
+        mongo_url=args.mongo_url,
+        mode=args.mode,
+        max_concurrency=args.concurrency,
+        fetch_timeout=args.timeout,
+        max_page_bytes=args.max_page_bytes,
+        max_inflight_bytes=args.max_inflight_bytes,
+        pool_maxsize=args.pool_maxsize,
+        host_min_interval=args.host_interval,
+        seen_path=args.seen_path,
+        checkpoint_dir=args.checkpoint_dir,
+        checkpoint_interval=args.checkpoint_interval,
+        resume=args.resume,
+        dedup_enabled=args.dedup,
+        dedup_distance=args.dedup_distance,
+        warc_dir=args.warc_dir,
+        warc_compression=args.warc_compression,
+        num_workers=args.num_workers,
+        worker_index=args.worker_index,
+        parse_workers=args.parse_workers,
+        write_workers=args.write_workers,
+        parser_backend=args.parser,
+        metrics_port=args.metrics_port,
+        stats_interval=args.stats_interval,
+        profile=args.profile,
+        profile_dir=args.profile_dir,
+        profile_interval=args.profile_interval,
+        gc_threshold=tuple(args.gc_threshold) if args.gc_threshold else None
     )
     crawl(urls=urls, config=config)
@@ -0,0 +1,194 @@
+import typing
+import asyncio
+import logging
+import aiohttp
+import datetime
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from pycrawler.fetch import fetchResultAsync, create_async_session
+from pycrawler.crawler import Crawler
+from pycrawler.models import CrawlerWebsite
+from pycrawler.frontier import Frontier
+from pycrawler.politeness import PolitenessScheduler, MAX_ROBOTS_BYTES, robots_text
+from pycrawler.seen import BloomFilter
+from pycrawler.config import CrawlerConfig
+import pycrawler.revisit as revisit
+import pycrawler.metrics as metrics
+
+logger = logging.getLogger(__name__)
+
+# requests in flight per thread of the executor for short database calls
+REQUESTS_PER_IO_THREAD = 8
+# urls looked up in one get_records query
+RECORD_BATCH = 256
+
+
+class RecordLoader(object):
+    """
+    CrawlerWebsite records for the requests of the event loop. Lookups made
+    while a query is running are collected and sent as one query when it
+    returns, so a busy loop costs a round trip per batch and not per url.
+    """
+    executor: ThreadPoolExecutor
+    waiting: typing.Dict[str, typing.List[asyncio.Future]]
+    task: asyncio.Task | None
+
+    def __init__(self, executor: ThreadPoolExecutor):
+        self.executor = executor
+        self.waiting = dict()
+        self.task = None
+
+    async def get(self, url: str) -> typing.Dict[str, typing.Any] | None:
+        future = asyncio.get_running_loop().create_future()
+        self.waiting.setdefault(url, []).append(future)
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self.waiting:
+                waiting, self.waiting = self.waiting, dict()
+                urls = list(waiting)
+                batches = [urls[i:i + RECORD_BATCH] for i in range(0, len(urls), RECORD_BATCH)]
+                results = await asyncio.gather(
+                    *(loop.run_in_executor(self.executor, CrawlerWebsite.get_records, batch) for batch in batches),
+                    return_exceptions=True
+                )
+                for batch, records in zip(batches, results):
+                    for url in batch:
+                        for future in waiting[url]:
+                            if future.done():
+                                continue
+                            if isinstance(records, BaseException):
+                                future.set_exception(records)
+                            else:
+                                future.set_result(records.get(url))
+        finally:
+            self.task = None
+
+
+class AsyncCrawler(Crawler):
+    io_executor: ThreadPoolExecutor
+    records: RecordLoader
+    robots_pending: typing.Dict[str, asyncio.Task]
+
+    async def load_robots(self, session: aiohttp.ClientSession, url: str):
+        # robots.txt comes through the session like any page, requests for
+        # the same host wait for one download
+        robots = self.scheduler.robots
+        if robots is None or robots.fresh(url):
+            return
+        parts = urllib.parse.urlsplit(url)
+        task = self.robots_pending.get(parts.netloc)
+        if task is None:
+            task = self.robots_pending[parts.netloc] = asyncio.create_task(
+                self.fetch_robots(session, parts.scheme or 'https', parts.netloc)
+            )
+        await task
+
+    async def fetch_robots(self, session: aiohttp.ClientSession, scheme: str, host: str):
+        robots = self.scheduler.robots
+        url = f'{scheme}://{host}/robots.txt'
+        try:
+            try:
+                async with session.get(url, allow_redirects=True, timeout=aiohttp.ClientTimeout(total=robots.timeout)) as resp:
+                    status = resp.status
+                    body = bytearray()
+                    while status < 400 and len(body) < MAX_ROBOTS_BYTES:
+                        chunk = await resp.content.read(MAX_ROBOTS_BYTES - len(body))
+                        if not chunk:
+                            break
+                        body.extend(chunk)
+                    text = robots_text(bytes(body))
+            except Exception:
+                status, text = None, ''
+            robots.store(host, *robots.parse(url, status, text))
+        finally:
+            del self.robots_pending[host]
+
+    async def crawl_url_async(self, session: aiohttp.ClientSession, url: str):
+        await self.load_robots(session, url)
+        if not self.enter_url(url, fetch_robots=False):
+            return
+
+        logger.debug('fetch url=%s', url)
+        record = await self.records.get(url)
+        if not revisit.is_due(record, datetime.datetime.utcnow()):
+            return
+        loop = asyncio.get_running_loop()
+        result = await fetchResultAsync(session, url, self.config.max_page_bytes, record, self.config.fetch_deadline)
+        if record and await loop.run_in_executor(self.io_executor, self.unchanged, url, result, record):
+            return
+        if not result.ok:
+            await loop.run_in_executor(self.io_executor, self.failed, url, record)
+            return
+        if self.warc is not None:
+            self.warc.submit(result)
+
+        # parsing and database writes block, so they run on the executor
+        # while the event loop keeps the other requests moving
+        fields = self.changed_fields(result, record)
+        self.budget.charge(result.size)
+        try:
+            await asyncio.to_thread(self.process_text, url, result.text, fields)
+        finally:
+            self.budget.release(result.size)
+
+    async def crawl_guarded(self, session: aiohttp.ClientSession, url: str):
+        try:
+            await self.crawl_url_async(session, url)
+        except Exception as e:
+            metrics.CRAWL_ERRORS.inc()
+            logger.warning('crawl failed url=%s error=%r', url, e)
+        finally:
+            self.frontier.task_done(url)
+
+    async def crawl_async(self, urls: typing.List[str]):
+        self.seed(urls)
+
+        limit = max(1, self.config.max_concurrency)
+        loop = asyncio.get_running_loop()
+        # pages are parsed and written on num_threads threads, the short
+        # lookups and updates of the other requests must not queue behind them
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=max(1, self.config.num_threads)))
+        self.io_executor = ThreadPoolExecutor(max_workers=max(1, limit // REQUESTS_PER_IO_THREAD), thread_name_prefix='io')
+        self.records = RecordLoader(self.io_executor)
+        self.robots_pending = dict()
+
+        try:
+            async with create_async_session(self.config) as session:
+                tasks: typing.Set[asyncio.Task] = set()
+                while True:
+                    # no new requests while fetched pages hold the byte budget,
+                    # the loop comes back here as their tasks finish
+                    while len(tasks) < limit and self.budget.available():
+                        url = self.frontier.pop(timeout=0)
+                        if url is None:
+                            break
+                        tasks.add(asyncio.create_task(self.crawl_guarded(session, url)))
+
+                    if len(tasks) == 0:
+                        wait = self.frontier.wait_time()
+                        if wait is None:
+                            break
+                        await asyncio.sleep(wait)
+                        continue
+
+                    # wake up when a request finishes or when the next resting host becomes ready
+                    _, tasks = await asyncio.wait(tasks, timeout=self.frontier.wait_time(), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self.io_executor.shutdown(wait=True)
+
+
+def crawl_async(
+        urls: typing.List[str] = [],
+        config: CrawlerConfig = CrawlerConfig(),
+        frontier: Frontier | None = None,
+        scheduler: PolitenessScheduler | None = None,
+        seen: BloomFilter | None = None
+):
+    crawler = AsyncCrawler(config, frontier, scheduler, seen)
+    asyncio.run(crawler.crawl_async(urls))
+    logger.info('async crawl finished')
@@ -0,0 +1,55 @@
+import threading
+from pycrawler.config import CrawlerConfig
+
+
+class ByteBudget(object):
+    """
+    Bytes of fetched pages that are not written yet, shared by every
+    worker of the process. New fetches wait while the budget is spent;
+    charging never blocks, so a page that is already downloaded always
+    gets through and one page larger than the budget cannot stall the
+    crawl. The budget is exceeded by at most the pages fetched at once.
+    """
+    limit: int
+    used: int
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self.condition = threading.Condition()
+
+    def available(self) -> bool:
+        return self.limit <= 0 or self.used < self.limit
+
+    def wait(self, timeout: float | None = None) -> bool:
+        with self.condition:
+            return self.condition.wait_for(self.available, timeout)
+
+    def charge(self, n: int):
+        with self.condition:
+            self.used += n
+
+    def release(self, n: int):
+        with self.condition:
+            self.used = max(0, self.used - n)
+            self.condition.notify_all()
+
+
+_budget: ByteBudget | None = None
+_budget_lock = threading.Lock()
+
+def get_byte_budget(config: CrawlerConfig = CrawlerConfig()) -> ByteBudget:
+    global _budget
+    with _budget_lock:
+        if _budget is None:
+            _budget = ByteBudget(config.max_inflight_bytes)
+        return _budget
+
+def inflight_bytes() -> int:
+    budget = _budget
+    return budget.used if budget is not None else 0
+
+def close_byte_budget():
+    global _budget
+    with _budget_lock:
+        _budget = None
@@ -0,0 +1,161 @@
+import typing
+import threading
+import struct
+import zlib
+import json
+import time
+import logging
+import os
+from pycrawler.frontier import Frontier
+from pycrawler.seen import BloomFilter
+from pycrawler.dedup import NearDuplicateIndex
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'PYCCKPT2'
+# magic, crc32 of everything after the header, state length, seen length,
+# near-duplicate index length
+HEADER = struct.Struct('<8sIQQQ')
+FILENAME = 'crawl.ckpt'
+
+
+class CheckpointState(object):
+    urls: typing.List[str]
+    visited_domains: typing.Dict[str, int]
+    seen: bytes
+    dedup: bytes
+    created_at: float
+
+    def __init__(
+            self,
+            urls: typing.List[str],
+            visited_domains: typing.Dict[str, int],
+            seen: bytes,
+            created_at: float,
+            dedup: bytes = b''
+    ):
+        self.urls = urls
+        self.visited_domains = visited_domains
+        self.seen = seen
+        self.dedup = dedup
+        self.created_at = created_at
+
+
+class Checkpoint(object):
+    """
+    Snapshot of the frontier, the seen filter, the per-host counters and
+    the near-duplicate index in a single file. A new snapshot is written next to the old one and
+    renamed over it, so a crash leaves either generation intact.
+    """
+    directory: str
+    path: str
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, FILENAME)
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def save(
+            self,
+            frontier: Frontier,
+            seen: BloomFilter,
+            visited_domains: typing.Dict[str, int],
+            dedup: NearDuplicateIndex | None = None
+    ):
+        # seen is copied before the frontier: a url popped in between is in
+        # the snapshot, with the urls still being crawled
+        seen_bytes = seen.to_bytes()
+        dedup_bytes = dedup.to_bytes() if dedup is not None else b''
+        state = dict(
+            urls=frontier.snapshot(),
+            visited_domains=dict(visited_domains),
+            created_at=time.time()
+        )
+        state_bytes = zlib.compress(json.dumps(state).encode('utf-8'), 1)
+        crc = zlib.crc32(dedup_bytes, zlib.crc32(seen_bytes, zlib.crc32(state_bytes)))
+
+        with self.lock:
+            tmp = self.path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, crc, len(state_bytes), len(seen_bytes), len(dedup_bytes)))
+                f.write(state_bytes)
+                f.write(seen_bytes)
+                f.write(dedup_bytes)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+
+    def load(self) -> CheckpointState | None:
+        if not self.exists():
+            return None
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        # checked before the length, the header of older versions is shorter
+        magic = data[:len(MAGIC)]
+        if magic != MAGIC and magic.startswith(MAGIC[:-1]):
+            raise ValueError(f'{self.path} is checkpoint version {magic[-1:].decode("ascii", "replace")}, expected version {MAGIC[-1:].decode("ascii")}')
+        if magic != MAGIC:
+            raise ValueError(f'{self.path} is not a crawl checkpoint')
+        if len(data) < HEADER.size:
+            raise ValueError(f'{self.path} is truncated')
+        magic, crc, state_size, seen_size, dedup_size = HEADER.unpack_from(data, 0)
+        body = memoryview(data)[HEADER.size:]
+        if len(body) != state_size + seen_size + dedup_size or zlib.crc32(body) != crc:
+            raise ValueError(f'{self.path} is corrupt')
+
+        state = json.loads(zlib.decompress(body[:state_size]))
+        return CheckpointState(
+            urls=state['urls'],
+            visited_domains=state['visited_domains'],
+            seen=bytes(body[state_size:state_size + seen_size]),
+            dedup=bytes(body[state_size + seen_size:]),
+            created_at=state['created_at']
+        )
+
+
+class Checkpointer(threading.Thread):
+    checkpoint: Checkpoint
+    frontier: Frontier
+    seen: BloomFilter
+    host_counts: typing.Callable[[], typing.Dict[str, int]]
+    dedup: NearDuplicateIndex | None
+    interval: float
+
+    def __init__(
+            self,
+            checkpoint: Checkpoint,
+            frontier: Frontier,
+            seen: BloomFilter,
+            host_counts: typing.Callable[[], typing.Dict[str, int]],
+            interval: float = 60,
+            dedup: NearDuplicateIndex | None = None
+    ):
+        super().__init__(name='checkpoint', daemon=True)
+        self.checkpoint = checkpoint
+        self.frontier = frontier
+        self.seen = seen
+        self.host_counts = host_counts
+        self.dedup = dedup
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def save(self):
+        started = time.monotonic()
+        self.checkpoint.save(self.frontier, self.seen, self.host_counts(), self.dedup)
+        logger.info('checkpoint queued=%d seen=%d seconds=%.2f', len(self.frontier), len(self.seen), time.monotonic() - started)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.save()
+            except Exception as e:
+                logger.warning('checkpoint failed error=%r', e)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self.save()
@@ -7,6 +7,106 @@ class CrawlerConfig:
     qdrant_enabled: bool = False
     qdrant_string: str = "http://localhost:6333"
     mongo_url: str = 'mongodb://127.0.0.1:27013/test',
+    # pages are indexed in qdrant from a background thread, see db.qdrant.QdrantIndexer
+    qdrant_batch_size: int = 256
+    qdrant_flush_interval: float = 2.0
+    qdrant_queue_size: int = 10000
+    qdrant_retries: int = 5
+    # 'threads' runs num_threads blocking CrawlThreads, 'async' runs a single event loop,
+    # 'pipeline' runs num_threads fetch threads, parse_workers parser processes
+    # and write_workers writer threads
+    mode: str = 'threads'
+    parse_workers: int = 0  # 0 uses one process per cpu
+    parse_backlog: int = 4  # fetched pages queued per parser process
+    write_workers: int = 2
+    # 'bs4' selects with BeautifulSoup's html.parser, 'lxml' scans the tree once (needs lxml)
+    parser_backend: str = 'bs4'
+    # upper bound on requests in flight at once in async mode
+    max_concurrency: int = 512
+    # maximum number of urls waiting in the frontier
+    max_queue_size: int = 100000
+    # bytes of fetched pages not yet written, new fetches wait while they
+    # are spent, see budget.ByteBudget. 0 turns the budget off
+    max_inflight_bytes: int = 256 * 1024 * 1024
+    # politeness, see politeness.PolitenessScheduler
+    host_min_interval: float = 1.0
+    host_burst: int = 1
+    max_crawl_delay: float = 30
+    robots_enabled: bool = True
+    robots_ttl: float = 60 * 60 * 24
+    robots_error_ttl: float = 60 * 5
+    robots_user_agent: str = 'pycrawler'
+    # seen-url bloom filter, memory mapped from seen_path when set
+    seen_capacity: int = 10_000_000
+    seen_error_rate: float = 0.001
+    seen_path: str | None = None
+    # frontier, seen filter and host counters are snapshot to checkpoint_dir
+    # every checkpoint_interval seconds, resume restores the last snapshot
+    checkpoint_dir: str | None = None
+    checkpoint_interval: float = 60
+    resume: bool = False
+    # near-duplicate articles, see dedup.NearDuplicateIndex. An article whose
+    # SimHash is within dedup_distance bits of one already written is not
+    # written again, its page links to the first one instead. The index is
+    # part of the checkpoint. Off by default, it changes what is written
+    dedup_enabled: bool = False
+    dedup_distance: int = 3
+    dedup_capacity: int = 1_000_000
+    # http connection pooling, see fetch.Fetcher
+    fetch_timeout: float = 4
+    # responses are streamed and dropped once they pass either limit
+    fetch_deadline: float = 20
+    max_page_bytes: int = 5 * 1024 * 1024
+    pool_connections: int = 64
+    pool_maxsize: int = 4
+    keepalive_timeout: float = 30
+    # distributed crawl: with num_workers > 1 hosts are split by hash between
+    # the workers, which lease their urls from the shared CrawlerQueueItem
+    # collection, see distributed.DistributedFrontier
+    num_workers: int = 1
+    worker_index: int = 0
+    queue_batch: int = 500  # urls leased or handed over per round trip
+    queue_lease_time: float = 60 * 10
+    queue_idle_timeout: float = 60  # an idle worker waits this long for new links
+    # in-process dns cache, see dns.DnsCache. Hosts of newly queued links are
+    # resolved ahead of time by dns_workers threads
+    dns_cache: bool = True
+    dns_ttl: float = 60 * 5
+    dns_negative_ttl: float = 60
+    dns_cache_size: int = 100000
+    dns_workers: int = 16
+    dns_prefetch_backlog: int = 1024
+    # recrawl scheduling, see revisit.py. Intervals are in seconds and a page
+    # is due again once it changed with probability revisit_target
+    revisit_batch: int = 1000  # due urls loaded into the frontier at a time
+    revisit_refill_interval: float = 60 * 5  # 0 loads them only at start
+    revisit_target: float = 0.5
+    revisit_min_interval: float = 60 * 60
+    revisit_max_interval: float = 60 * 60 * 24 * 30
+    revisit_default_interval: float = 60 * 60 * 24
+    revisit_retry_interval: float = 60 * 60 * 6
+    # fetched responses are archived as WARC files in warc_dir when set, see
+    # warc.WarcWriter. warc_compression is 'gzip', 'zstd' (needs zstandard)
+    # or 'none'. Responses beyond warc_queue_bytes waiting to be written
+    # are dropped instead of holding up fetching
+    warc_dir: str | None = None
+    warc_compression: str = 'gzip'
+    warc_max_bytes: int = 1024 * 1024 * 1024
+    warc_queue_bytes: int = 64 * 1024 * 1024
+    # prometheus text format on http://127.0.0.1:<metrics_port>/metrics when set,
+    # and a summary line logged every stats_interval seconds, see metrics.py.
+    # stats_interval <= 0 turns the summary off
+    metrics_port: int | None = None
+    stats_interval: float = 30
+    # profiling, see profiling.Profiler. profile lists any of 'cpu', 'memory'
+    # and 'gc', comma separated; SIGUSR1 switches it on and off at runtime
+    profile: str = ''
+    profile_dir: str = 'profile'
+    profile_interval: float = 60
+    profile_sample_interval: float = 0.01
+    profile_memory_frames: int = 8
+    # gc.set_threshold arguments, None keeps the interpreter defaults
+    gc_threshold: typing.Tuple[int, int, int] | None = None
     
     def __init__(self, *args, **kwargs):
         for k, v in kwargs.items():
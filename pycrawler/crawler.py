@@ -1,189 +1,318 @@
 import typing
-from pycrawler.fetch import fetchDocument
-from pycrawler.models import CrawlerImage, CrawlerWebsite, CrawlerArticle, CrawlerFile
+from pycrawler.fetch import Fetcher, FetchResult
+from pycrawler.models import CrawlerImage, CrawlerWebsite, CrawlerArticle, CrawlerFile, CrawlerQueueItem
 from pycrawler.db import connect_db
-from pycrawler.db.qdrant import qdrant_connect
-import pycrawler.utils as utils
-import pycrawler.w2v as w2v
+from pycrawler.db.qdrant import QdrantIndexer, get_indexer, close_indexer, indexer_depth
+import pycrawler.revisit as revisit
+import pycrawler.metrics as metrics
 from pycrawler.config import CrawlerConfig
-from pycrawler.page import Page
-from bs4 import BeautifulSoup
-from qdrant_client import models
+from pycrawler.page import PageResult, extract_page
+from pycrawler.frontier import Frontier
+from pycrawler.politeness import PolitenessScheduler
+from pycrawler.seen import BloomFilter
+from pycrawler.checkpoint import Checkpoint, Checkpointer
+from pycrawler.dns import DnsCache, get_dns_cache, close_dns_cache
+from pycrawler.dedup import NearDuplicateIndex, get_dedup_index, restore_dedup_index, close_dedup_index
+from pycrawler.warc import WarcWriter, get_warc_writer, close_warc_writer, warc_queue_bytes
+from pycrawler.budget import ByteBudget, get_byte_budget, close_byte_budget, inflight_bytes
+from pycrawler.profiling import start_profiler, stop_profiler, install_signals
+from pycrawler.urlfilter import UrlFilter, url_host
 import threading
-import math
-import urllib
+import logging
 import random
-import re
 import gc
 import datetime
 
-SKIPPED_KEYWORDS = ['javascript:', 'mailto:', 'tel:']
-
-MAX_VISITED_SIZE = 1024
-MAX_QUEUE_SIZE = 320
 MAX_DOMAIN_VISITS = 10
 MAX_DOMAIN_VISITS_SIZE = 512
-GC_TIME_SECONDS = 60 * 5
+
+logger = logging.getLogger(__name__)
+
+STAGE_SECONDS = {
+    'parse': metrics.PARSE_SECONDS,
+    'extract': metrics.EXTRACT_SECONDS
+}
+
+def create_seen(config: CrawlerConfig) -> BloomFilter:
+    return BloomFilter(
+        capacity=config.seen_capacity,
+        error_rate=config.seen_error_rate,
+        path=config.seen_path
+    )
 
 class Crawler:
-    visited: typing.Set[str] = set()
     visited_domains: typing.Dict[str, int] = dict()
-    queue: typing.Set[str] = set()
+    # visited_domains is shared by every crawler in the process
+    lock: threading.Lock = threading.Lock()
+    seen: BloomFilter
+    url_filter: UrlFilter
     config: CrawlerConfig
-    time_started = datetime.datetime.utcnow()
-    time_gc = datetime.datetime.utcnow()
+    frontier: Frontier
+    scheduler: PolitenessScheduler
+    fetcher: Fetcher
+    indexer: QdrantIndexer | None
+    dns: DnsCache | None
+    budget: ByteBudget
+    dedup: NearDuplicateIndex | None
+    warc: WarcWriter | None
 
-    def __init__(self, config: CrawlerConfig):
+    def __init__(
+            self,
+            config: CrawlerConfig,
+            frontier: Frontier | None = None,
+            scheduler: PolitenessScheduler | None = None,
+            seen: BloomFilter | None = None
+    ):
         self.config = config
+        self.url_filter = UrlFilter(config.blacklist)
+        self.seen = seen if seen is not None else create_seen(config)
+        self.scheduler = scheduler or PolitenessScheduler(config)
+        if frontier is None:
+            frontier = Frontier(max_size=config.max_queue_size, delay=self.scheduler.delay)
+            self.scheduler.reschedule = frontier.reschedule
+        self.frontier = frontier
+        self.fetcher = Fetcher(config)
+        self.indexer = get_indexer(config) if config.qdrant_enabled else None
+        self.dns = get_dns_cache(config) if config.dns_cache else None
+        self.budget = get_byte_budget(config)
+        self.dedup = get_dedup_index(config) if config.dedup_enabled else None
+        self.warc = get_warc_writer(config) if config.warc_dir else None
 
-    def pop(self):
-        item = random.choice(list(self.queue) or [])
-        self.queue.discard(item)
-        return item
-
-    def should_gc(self):
-        now = datetime.datetime.utcnow()
-        diff = now - self.time_gc
-        if diff.seconds >= GC_TIME_SECONDS:
-            print('**** GARBAGE COLLECT ****')
-            gc.collect()
-            self.time_gc = datetime.datetime.utcnow()
-    
-    def _should_skip(self, url: str):
-        for black in self.config.blacklist:
-            if re.match(black, url):
-                return True
-        if url in self.visited:
-            return True
-        for k in SKIPPED_KEYWORDS:
-            if k in url:
-                return True
-        low = url.lower()
-        if utils.is_file_url(low) or\
-           low.endswith('.js') or\
-           low.endswith('.css') or\
-           low.endswith('.map') or\
-           low.endswith('.svg') or\
-           low.endswith('.ico') or\
-           low.endswith('.gif') or\
-           low.endswith('.bmp') or\
-           low.endswith('.png') or\
-           low.endswith('.jpg') or\
-           low.endswith('.jpeg'):
-            return True
-        if url == "http://" or url == "https://":
-            return True
-        if len(url) <= 8:
-            return True
-        if self.visited_domains.get(utils.url_get_domain(url), 0) >= MAX_DOMAIN_VISITS:
+    @classmethod
+    def host_counts(cls) -> typing.Dict[str, int]:
+        with cls.lock:
+            return dict(cls.visited_domains)
+
+    def pop(self, timeout: float | None = None) -> str | None:
+        return self.frontier.pop(timeout)
+
+    def _should_skip(self, url: str, fetch_robots: bool = True):
+        if self.visited_domains.get(url_host(url), 0) >= MAX_DOMAIN_VISITS:
             return True
-        return False
-    
-    def should_skip(self, url: str):
-        if self._should_skip(url) or self._should_skip(utils.url_remove_query(url)):
+        # links found on a page only consult robots.txt files we already have,
+        # the rules are fetched when the url comes out of the frontier
+        if not self.scheduler.allowed(url, fetch=fetch_robots):
             return True
         return False
 
+    def admit(self, url: str, fetch_robots: bool = True) -> str | None:
+        canonical = self.url_filter.filter(url)
+        # links to pages crawled before come back through the revisit query
+        # once they are due, see RevisitLoader
+        if canonical is None or canonical in self.seen or self._should_skip(canonical, fetch_robots):
+            return None
+        return canonical
+
+    def should_skip(self, url: str, fetch_robots: bool = True):
+        return self.admit(url, fetch_robots) is None
+
+    def seed(self, urls: typing.List[str]):
+        for url in urls:
+            canonical = self.url_filter.filter(url)
+            if canonical:
+                self.frontier.push(canonical)
+
+    def enter_url(self, url: str, fetch_robots: bool = True) -> bool:
+        # seen urls are not skipped here, they are revisits or were in flight
+        # when the checkpoint was written. fetch() crawls them only when due.
+        # The frontier never hands out a url that is still in flight, so
+        # two workers cannot fetch it at once
+        canonical = self.url_filter.filter(url)
+        if canonical is None or self._should_skip(canonical, fetch_robots):
+            return False
+        self.seen.add(url)
+
+        with self.lock:
+            if len(self.visited_domains) > MAX_DOMAIN_VISITS_SIZE:
+                logger.debug('clearing domain visits')
+                self.visited_domains.clear()
+
+            domain = url_host(url)
+            self.visited_domains[domain] = self.visited_domains.get(domain, 0) + 1
+        return True
+
     def crawl_url(self, url: str, thread_id: int, thread_name: str):
-        if self.should_skip(url):
+        if not self.enter_url(url):
+            return
+
+        logger.debug('fetch url=%s', url)
+        fetched = self.fetch(url)
+        if fetched is None:
             return
+        result, fields = fetched
+        try:
+            self.process_text(url, result.text, fields)
+        finally:
+            self.budget.release(result.size)
 
-        if len(self.visited) > MAX_VISITED_SIZE:
-            print('---- CLEARING ----')
-            self.visited.clear()
-            gc.collect()
+    def fetch(self, url: str) -> typing.Tuple[FetchResult, typing.Dict[str, typing.Any]] | None:
+        # None when the page is not due, did not change or could not be
+        # fetched, otherwise the result and the CrawlerWebsite fields to store.
+        # The result is charged to the byte budget, the caller releases it
+        # once the page is written
+        record = CrawlerWebsite.get_record(url)
+        if not revisit.is_due(record, datetime.datetime.utcnow()):
+            return None
+        self.budget.wait()
+        result = self.fetcher.fetch_result(url, record)
+        if self.unchanged(url, result, record):
+            return None
+        if not result.ok:
+            self.failed(url, record)
+            return None
+        if self.warc is not None:
+            self.warc.submit(result)
+        self.budget.charge(result.size)
+        return result, self.changed_fields(result, record)
 
-        if len(self.visited_domains) > MAX_DOMAIN_VISITS_SIZE:
-            print('--- CLEARING DOMAIN VISITS ---')
-            self.visited_domains.clear()
-            gc.collect()
+    def unchanged(self, url: str, result: FetchResult, record: typing.Dict[str, typing.Any] | None) -> bool:
+        if not record:
+            return False
+        if result.not_modified or (result.ok and result.content_hash == record.get('content_hash')):
+            # skips extraction and every write except the crawl history
+            history = revisit.observe(record, False, datetime.datetime.utcnow(), self.config)
+            CrawlerWebsite.touch(url, {**result.validators(), **history})
+            metrics.UNCHANGED.inc()
+            return True
+        return False
 
-        domain = utils.url_get_domain(url)
-        self.visited_domains[domain] = self.visited_domains.get(domain, 0) + 1
+    def failed(self, url: str, record: typing.Dict[str, typing.Any] | None):
+        if record:
+            CrawlerWebsite.touch(url, revisit.failed(datetime.datetime.utcnow(), self.config))
 
-        print(f'{utils.pad_right(thread_name, 10)} -> {url}')
-        doc: BeautifulSoup = fetchDocument(url)
-        if not doc:
-            return
-        self.visited.add(url)
-
-        page = Page(url, doc)
-        # meta = self.extract_meta(doc)
-        # lang = self.extract_language(doc, url, meta)
-        # name = self.extract_title(doc) 
-        # keywords = self.extract_keywords(doc, title=name)
-        # articles = self.extract_articles(doc, url, fallback_title=name, keywords=keywords, lang=lang)
-        # images = self.extract_images(doc, url, fallback_title=name, keywords=keywords, lang=lang)
-        # files = self.extract_files(doc, url, keywords=keywords, lang=lang)
-
-        website = CrawlerWebsite(
-            url=page.url,
-            domain=page.domain,
-            name=page.title,
-            articles=page.articles,
-            images=page.images,
-            files=page.files,
-            keywords=page.keywords,
-            language=page.language
-        ).upsert()
-
-        if self.config.qdrant_enabled:
-            try:
-                vec_id, vec = w2v.word2vec_with_id(' '.join(keywords) if len(keywords) > 0 else name)
-                print(vec_id)
-
-                qdrant.upsert(
-                    collection_name="crawler_website",
-                    points=[
-                        models.PointStruct(
-                            id=str(vec_id),
-                            payload={
-                                'name': name,
-                                'url': url,
-                                'domain': domain 
-                            },  # Add any additional payload if necessary
-                            vector=vec,
-                        )
-                    ],
-                )
-            except Exception as e:
-                print(e)
+    def changed_fields(self, result: FetchResult, record: typing.Dict[str, typing.Any] | None) -> typing.Dict[str, typing.Any]:
+        history = revisit.observe(record, True, datetime.datetime.utcnow(), self.config)
+        return {**result.validators(), **history}
+
+    def process_text(self, url: str, text: str, fields: typing.Dict[str, typing.Any] = {}):
+        page = extract_page(url, text, self.config.parser_backend, self.dedup is not None)
+        page.fields = fields
+        self.persist(page)
+
+    def persist(self, page: PageResult):
+        url = page.url
+        domain = page.domain
+
+        for stage, seconds in page.timings.items():
+            STAGE_SECONDS[stage].observe(seconds)
 
-        if len(self.queue) < MAX_QUEUE_SIZE:
-            links = list(doc.select('a[href]'))
+        with metrics.MONGO_SECONDS.time():
+            # all images, files and articles of the page go out in one bulk write per collection
+            articles = len(page.articles)
+            page.flush(self.dedup)
+
+            website = CrawlerWebsite(
+                url=page.url,
+                domain=page.domain,
+                name=page.title,
+                articles=list(page.article_ids),
+                images=list(page.image_ids),
+                files=list(page.file_ids),
+                keywords=list(page.keywords),
+                language=page.language,
+                **page.fields
+            ).upsert(reload=False)
+        metrics.PAGES.inc()
+        metrics.ARTICLES.inc(articles)
+        metrics.DUPLICATE_ARTICLES.inc(page.duplicates)
+
+        if self.indexer is not None:
+            text = ' '.join(page.keywords) if len(page.keywords) > 0 else page.title
+            if text:
+                self.indexer.add(text, {
+                    'name': page.title,
+                    'url': url,
+                    'domain': domain
+                })
+
+        if not self.frontier.full():
+            links = list(page.links)
             random.shuffle(links)
             for link in links:
-                if len(self.queue) > MAX_QUEUE_SIZE:
-                    break
-                href = link.get('href')
-                if not href:
+                joined = self.admit(link, fetch_robots=False)
+                if joined is None:
                     continue
-                joined = urllib.parse.urljoin(url, href)
-                if not self.should_skip(joined):
-                    self.queue.add(joined)
+                if not self.frontier.push(joined):
+                    break
+                metrics.LINKS.inc()
+                # resolved in the background while the url waits in the frontier
+                if self.dns is not None and self.frontier.owns(joined):
+                    self.dns.prefetch(url_host(joined))
 
     def crawl(self, urls: typing.List[str], thread_id: int, thread_name: str):
-        for url in urls:
-            self.queue.add(url)
+        self.seed(urls)
 
-        qdrant = qdrant_connect(self.config.qdrant_string) if self.config.qdrant_enabled else None
-
-        while len(self.queue) > 0:
+        while True:
             url = self.pop()
+            if url is None:
+                break
             try:
                 self.crawl_url(url, thread_id, thread_name)
             except Exception as e:
-                print(f'******** Error crawling {url} ********')
-                print(e)
+                metrics.CRAWL_ERRORS.inc()
+                logger.warning('crawl failed url=%s error=%r', url, e)
+            finally:
+                self.frontier.task_done(url)
+
+        self.fetcher.close()
 
-            if self.should_gc():
-                gc.collect()
-            
+
+def due_urls(config: CrawlerConfig) -> typing.List[str]:
+    # pages due for a revisit, the ones most likely to have changed first
+    return [x.get('url') for x in CrawlerWebsite.get_due(config.revisit_batch, datetime.datetime.utcnow())]
+
+
+class RevisitLoader(threading.Thread):
+    """
+    Pushes the pages due for a revisit into the frontier every interval
+    seconds, so pages crawled earlier in a long crawl are visited again
+    once they are likely to have changed.
+    """
+    config: CrawlerConfig
+    frontier: Frontier
+    url_filter: UrlFilter
+    interval: float
+
+    def __init__(self, config: CrawlerConfig, frontier: Frontier, url_filter: UrlFilter):
+        super().__init__(name='revisit', daemon=True)
+        self.config = config
+        self.frontier = frontier
+        self.url_filter = url_filter
+        self.interval = config.revisit_refill_interval
+        self.stopped = threading.Event()
+
+    def load(self) -> int:
+        # due urls already queued or in flight are skipped by the frontier
+        pushed = 0
+        for url in due_urls(self.config):
+            canonical = self.url_filter.filter(url)
+            if canonical is None:
+                continue
+            if not self.frontier.push(canonical):
+                break
+            pushed += 1
+        return pushed
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            if self.frontier.full():
+                continue
+            try:
+                logger.debug('revisit due=%d', self.load())
+            except Exception as e:
+                logger.warning('revisit failed error=%r', e)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
 
 
 class CrawlThread(threading.Thread):
     urls: typing.List[str] = []
     config: CrawlerConfig = CrawlerConfig()
+    frontier: Frontier | None = None
+    scheduler: PolitenessScheduler | None = None
+    seen: BloomFilter | None = None
     
     def __init__(self, *args, **kwargs):
         threading.Thread.__init__(self, *args, **kwargs)
@@ -191,15 +320,21 @@ class CrawlThread(threading.Thread):
     def create(
             self,
             urls: typing.List[str],
-            config: CrawlerConfig = CrawlerConfig
+            config: CrawlerConfig = CrawlerConfig,
+            frontier: Frontier | None = None,
+            scheduler: PolitenessScheduler | None = None,
+            seen: BloomFilter | None = None
     ):
         self.urls = urls
         self.config = config
+        self.frontier = frontier
+        self.scheduler = scheduler
+        self.seen = seen
         return self
     
     def run(self):
-        print(self.native_id, len(self.urls))
-        crawler = Crawler(self.config)
+        logger.debug('thread started native_id=%s urls=%d', self.native_id, len(self.urls))
+        crawler = Crawler(self.config, self.frontier, self.scheduler, self.seen)
         crawler.crawl(self.urls, self.ident, self.name)
 
 def crawl(
@@ -212,15 +347,111 @@ def crawl(
     CrawlerArticle.ensure_indexes()
     CrawlerImage.ensure_indexes()
     CrawlerFile.ensure_indexes()
+    if config.num_workers > 1:
+        CrawlerQueueItem.ensure_indexes()
 
-    rand = list(map(lambda x: x.get('url'), CrawlerWebsite.get_random(2 * (len(urls) + 1))))
-    urls = utils.unique([*urls, *rand])
-    random.shuffle(urls)
-    
-    urls_per_thread = math.ceil(len(urls) / config.num_threads)
+    checkpoint = Checkpoint(config.checkpoint_dir) if config.checkpoint_dir else None
+    state = checkpoint.load() if checkpoint and config.resume else None
+
+    if state:
+        seen = BloomFilter.from_bytes(state.seen, config.seen_path)
+        Crawler.visited_domains.update(state.visited_domains)
+        if config.dedup_enabled and state.dedup:
+            restore_dedup_index(state.dedup, config)
+        urls = list(dict.fromkeys([*urls, *state.urls]))
+        logger.info('resumed queued=%d seen=%d', len(state.urls), len(seen))
+    else:
+        seen = create_seen(config)
+    urls = list(dict.fromkeys([*urls, *due_urls(config)]))
+
+    # load is spread by host: the frontier only hands out urls whose host
+    # has a token left in its politeness bucket
+    scheduler = PolitenessScheduler(config)
+    frontier = create_frontier(config, scheduler)
+    url_filter = UrlFilter(config.blacklist)
+    for url in urls:
+        canonical = url_filter.filter(url)
+        if canonical:
+            frontier.push(canonical)
+
+    revisits = None
+    if config.revisit_refill_interval > 0:
+        revisits = RevisitLoader(config, frontier, url_filter)
+        revisits.start()
+
+    checkpointer = None
+    if checkpoint:
+        dedup = get_dedup_index(config) if config.dedup_enabled else None
+        checkpointer = Checkpointer(checkpoint, frontier, seen, Crawler.host_counts, config.checkpoint_interval, dedup)
+        checkpointer.start()
+
+    metrics.FRONTIER_SIZE.read = frontier.__len__
+    metrics.IN_FLIGHT.read = lambda: frontier.in_flight
+    metrics.QDRANT_QUEUE.read = indexer_depth
+    metrics.INFLIGHT_BYTES.read = inflight_bytes
+    metrics.WARC_QUEUE.read = warc_queue_bytes
+    server = metrics.serve(config.metrics_port) if config.metrics_port is not None else None
+    reporter = None
+    if config.stats_interval > 0:
+        reporter = metrics.Reporter(config.stats_interval)
+        reporter.start()
+    if config.gc_threshold:
+        gc.set_threshold(*config.gc_threshold)
+    install_signals(config)
+    start_profiler(config)
+
+    try:
+        crawl_mode(config, frontier, scheduler, seen)
+    finally:
+        # also reached on KeyboardInterrupt, so an interrupted crawl resumes
+        # from where it stopped
+        if revisits:
+            revisits.stop()
+        if checkpointer:
+            checkpointer.stop()
+        stop_profiler()
+        if reporter:
+            reporter.stop()
+        if server:
+            server.shutdown()
+            server.server_close()
+        frontier.close()
+        seen.close()
+        close_indexer()
+        close_dns_cache()
+        close_byte_budget()
+        close_dedup_index()
+        close_warc_writer()
+
+def create_frontier(config: CrawlerConfig, scheduler: PolitenessScheduler) -> Frontier:
+    if config.num_workers > 1:
+        from pycrawler.distributed import DistributedFrontier
+        frontier = DistributedFrontier(config, delay=scheduler.delay)
+    else:
+        frontier = Frontier(max_size=config.max_queue_size, delay=scheduler.delay)
+    # hosts handed out before their robots.txt was known rest until it is
+    scheduler.reschedule = frontier.reschedule
+    return frontier
+
+def crawl_mode(
+        config: CrawlerConfig,
+        frontier: Frontier,
+        scheduler: PolitenessScheduler,
+        seen: BloomFilter
+):
+    if config.mode == 'async':
+        from pycrawler.aio import crawl_async
+        crawl_async(config=config, frontier=frontier, scheduler=scheduler, seen=seen)
+        return
+
+    if config.mode == 'pipeline':
+        from pycrawler.pipeline import crawl_pipeline
+        crawl_pipeline(config=config, frontier=frontier, scheduler=scheduler, seen=seen)
+        return
 
-    chunks: typing.List[str] = utils.chunkify(urls, urls_per_thread)
-    threads = [CrawlThread().create(chunk, config) for chunk in chunks]
+    # seeds are pushed up front so no thread sees an empty frontier and
+    # exits before the others had a chance to add their share
+    threads = [CrawlThread().create([], config, frontier, scheduler, seen) for _ in range(config.num_threads)]
 
     for i, thread in enumerate(threads):
         thread.setDaemon(True)
@@ -229,4 +460,4 @@ def crawl(
 
     for thread in threads:
         thread.join()
-        print(f"::::::: thread {thread.name} finished. :::::::")
+        logger.info('thread %s finished', thread.name)
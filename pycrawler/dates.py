@@ -0,0 +1,62 @@
+import functools
+import datetime
+import email.utils
+import re
+import dateutil.parser
+
+# values sites actually repeat, the meta dates of a page are looked up once per article
+CACHE_SIZE = 16384
+# longer strings are sentences around a date, which dateutil rejects unless fuzzy
+MAX_LENGTH = 64
+
+# 2023-11-14, 2023-11-14T10:00, 2023-11-14 10:00:00.123+02:00, ...Z
+ISO_8601 = re.compile(
+    r'\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:[.,]\d{1,6})?)?(?:Z|[+-]\d{2}(?::?\d{2})?)?)?',
+    re.ASCII
+)
+# Tue, 14 Nov 2023 10:00:00 GMT. Zone names other than gmt and utc are left
+# to dateutil, which does not know them either and returns a naive date
+RFC_2822 = re.compile(
+    r'(?:[A-Za-z]{3},\s*)?\d{1,2}\s+[A-Za-z]{3}\s+\d{4}\s+\d{1,2}:\d{2}(?::\d{2})?\s*(?P<zone>[+-]\d{4}|GMT|UTC|UT|Z)?',
+    re.ASCII | re.IGNORECASE
+)
+# seconds, or milliseconds as javascript writes them, since 2001
+UNIX_SECONDS = re.compile(r'\d{10}(?:\.\d+)?', re.ASCII)
+UNIX_MILLISECONDS = re.compile(r'\d{13}', re.ASCII)
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def parse_date(value: str) -> datetime.datetime | None:
+    """
+    The date in value or None. ISO 8601, RFC 2822 and unix timestamps are
+    parsed directly, anything else by dateutil. Results, failures
+    included, are cached by the raw string.
+    """
+    value = value.strip()
+    if not value or len(value) > MAX_LENGTH:
+        return None
+    try:
+        if ISO_8601.fullmatch(value):
+            return datetime.datetime.fromisoformat(value)
+        if match := RFC_2822.fullmatch(value):
+            date = email.utils.parsedate_to_datetime(value)
+            # -0000 is utc with the source zone unknown, without a zone the date stays naive
+            if match['zone'] and date.tzinfo is None:
+                return date.replace(tzinfo=datetime.timezone.utc)
+            return date
+        if UNIX_SECONDS.fullmatch(value):
+            return datetime.datetime.fromtimestamp(float(value), datetime.timezone.utc)
+        if UNIX_MILLISECONDS.fullmatch(value):
+            return datetime.datetime.fromtimestamp(int(value) / 1000, datetime.timezone.utc)
+    except (ValueError, OverflowError):
+        # before python 3.11 fromisoformat rejects Z and +0200, dateutil
+        # reads those and rejects 2023-02-30 and the like on its own
+        pass
+    try:
+        return dateutil.parser.parse(value)
+    except Exception:
+        return None
+
+
+def is_date(value: str) -> bool:
+    return parse_date(value) is not None
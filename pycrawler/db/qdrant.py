@@ -1,15 +1,162 @@
+import typing
+import threading
+import queue
+import time
+import logging
 from qdrant_client import QdrantClient, models
+from pycrawler.config import CrawlerConfig
+import pycrawler.w2v as w2v
+import pycrawler.metrics as metrics
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = 'crawler_website'
+VECTOR_SIZE = 100
 
 def setup_qdrant(qdrant: QdrantClient) -> QdrantClient:
-    if not qdrant.collection_exists('crawler_website'):
+    if not qdrant.collection_exists(COLLECTION):
         qdrant.create_collection(
-            'crawler_website',
-            vectors_config=models.VectorParams(size=100, distance=models.Distance.COSINE)
+            COLLECTION,
+            vectors_config=models.VectorParams(size=VECTOR_SIZE, distance=models.Distance.COSINE)
         )
     return qdrant
 
 
+_clients: typing.Dict[str, QdrantClient] = dict()
+_clients_lock = threading.Lock()
+
 def qdrant_connect(connection_string: str = "http://localhost:6333"):
-    qdrant = QdrantClient(connection_string) # Connect to existing Qdrant instance
-    return setup_qdrant(qdrant)
+    # one client per process and connection string, ':memory:' runs qdrant locally
+    with _clients_lock:
+        qdrant = _clients.get(connection_string)
+        if qdrant is None:
+            qdrant = _clients[connection_string] = setup_qdrant(QdrantClient(connection_string))
+        return qdrant
+
+
+STOP = None
+
+
+class QdrantIndexer(object):
+    """
+    Buffers pages for the vector index and writes them from a background
+    thread, batch_size points at a time or whatever arrived within
+    flush_interval seconds. The crawl only pays for a queue put; pages are
+    dropped rather than blocking it when the buffer is full.
+    """
+    client: QdrantClient
+    buffer: queue.Queue
+    batch_size: int
+    flush_interval: float
+    retries: int
+    indexed: int
+    dropped: int
+    failed: int
+    skipped: int
+
+    def __init__(self, config: CrawlerConfig = CrawlerConfig(), client: QdrantClient | None = None):
+        self.client = client or qdrant_connect(config.qdrant_string)
+        self.buffer = queue.Queue(maxsize=max(1, config.qdrant_queue_size))
+        self.batch_size = max(1, config.qdrant_batch_size)
+        self.flush_interval = config.qdrant_flush_interval
+        self.retries = config.qdrant_retries
+        self.indexed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.skipped = 0
+        self.thread = threading.Thread(target=self.run, name='qdrant', daemon=True)
+        self.thread.start()
+
+    def depth(self) -> int:
+        return self.buffer.qsize()
+
+    def add(self, text: str, payload: typing.Dict[str, typing.Any]) -> bool:
+        try:
+            self.buffer.put_nowait((text, payload))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def create_point(self, text: str, payload: typing.Dict[str, typing.Any]) -> models.PointStruct | None:
+        vec_id, vec = w2v.word2vec_with_id(text)
+        if len(vec) != VECTOR_SIZE:
+            # no known words gives an empty vector, any other size means the
+            # vector store does not match the collection
+            if vec:
+                logger.warning('vector of size %d, expected %d url=%s', len(vec), VECTOR_SIZE, payload.get('url'))
+            else:
+                logger.debug('no vector url=%s', payload.get('url'))
+            self.skipped += 1
+            metrics.QDRANT_SKIPPED.inc()
+            return None
+        return models.PointStruct(id=str(vec_id), payload=payload, vector=vec)
+
+    def write(self, points: typing.List[models.PointStruct]):
+        for attempt in range(self.retries + 1):
+            try:
+                with metrics.QDRANT_SECONDS.time():
+                    self.client.upsert(collection_name=COLLECTION, points=points, wait=False)
+                self.indexed += len(points)
+                return
+            except Exception as e:
+                if attempt == self.retries:
+                    logger.warning('indexing failed points=%d error=%r', len(points), e)
+                    self.failed += len(points)
+                    return
+                time.sleep(min(30, 0.5 * 2 ** attempt))
+
+    def run(self):
+        points: typing.List[models.PointStruct] = []
+        started = None
+        stopped = False
+        while not stopped:
+            timeout = None if started is None else max(0.0, started + self.flush_interval - time.monotonic())
+            try:
+                item = self.buffer.get(timeout=timeout)
+                if item is STOP:
+                    stopped = True
+                else:
+                    try:
+                        point = self.create_point(*item)
+                    except Exception as e:
+                        logger.warning('no vector for url=%s error=%r', item[1].get('url'), e)
+                        point = None
+                    if point is not None:
+                        points.append(point)
+                        started = started or time.monotonic()
+            except queue.Empty:
+                pass
+
+            if points and (stopped or len(points) >= self.batch_size or time.monotonic() - started >= self.flush_interval):
+                self.write(points)
+                points = []
+                started = None
+
+    def close(self):
+        self.buffer.put(STOP)
+        self.thread.join()
+
+
+_indexer: QdrantIndexer | None = None
+_indexer_lock = threading.Lock()
+
+def get_indexer(config: CrawlerConfig = CrawlerConfig()) -> QdrantIndexer:
+    global _indexer
+    with _indexer_lock:
+        if _indexer is None:
+            _indexer = QdrantIndexer(config)
+        return _indexer
+
+def indexer_depth() -> int:
+    # never creates an indexer, so it is safe to read after close_indexer()
+    indexer = _indexer
+    return indexer.depth() if indexer is not None else 0
 
+def close_indexer():
+    global _indexer
+    with _indexer_lock:
+        indexer, _indexer = _indexer, None
+    if indexer is not None:
+        indexer.close()
+        logger.info('indexed %d pages, %d dropped, %d failed, %d skipped', indexer.indexed, indexer.dropped, indexer.failed, indexer.skipped)
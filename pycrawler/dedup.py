@@ -0,0 +1,167 @@
+import typing
+import threading
+import collections
+import hashlib
+import struct
+import re
+import numpy as np
+from bson import ObjectId
+from pycrawler.config import CrawlerConfig
+
+MAGIC = b'PYCSIMH2'
+# magic, distance, entries
+HEADER = struct.Struct('<8sQQ')
+# fingerprint, the id of the canonical article and the keys of its uid and link
+RECORD = np.dtype([('fingerprint', '<u8'), ('id', 'S12'), ('uid', '<u8'), ('link', '<u8')])
+
+WORDS = re.compile(r'\w+')
+SHINGLE_WORDS = 3
+# shorter texts, mostly teasers and captions, are never deduplicated
+MIN_SHINGLES = 16
+
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> typing.List[str]:
+    words = WORDS.findall(text.lower())
+    return [' '.join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def document_key(value: str | None) -> int:
+    # 64 bit key of a uid or link, 0 for none
+    if not value:
+        return 0
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8', 'surrogatepass'), digest_size=8).digest(), 'little')
+
+
+def fingerprint(text: str) -> int | None:
+    """
+    64 bit SimHash of the word shingles of text: every bit is the majority
+    vote of that bit over the shingle hashes, so texts that share most of
+    their shingles end up a few bits apart.
+    """
+    features = shingles(text)
+    if len(features) < MIN_SHINGLES:
+        return None
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(x.encode('utf-8'), digest_size=8).digest(), 'little') for x in features),
+        dtype='<u8', count=len(features)
+    )
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 > len(features)
+    return int(np.packbits(votes, bitorder='little').view('<u8')[0])
+
+
+class NearDuplicateIndex(object):
+    """
+    SimHash fingerprints of the articles written so far, mapped to the id
+    of the article that was written first. Fingerprints are split into
+    distance + 1 bands and indexed by each: two fingerprints at most
+    distance bits apart agree on at least one band, so a lookup only
+    compares the fingerprints sharing a band with it. Every fingerprint
+    also keeps the keys of the uid and link of its article, so a recrawled
+    article that was edited is not taken for a duplicate of itself. Holds
+    at most capacity fingerprints, the oldest are dropped first.
+    """
+    distance: int
+    capacity: int
+    entries: typing.OrderedDict[int, typing.Tuple[ObjectId, int, int]]
+    tables: typing.List[typing.Dict[int, typing.List[int]]]
+
+    def __init__(self, distance: int = 3, capacity: int = 1_000_000):
+        if not 0 <= distance < 32:
+            raise ValueError(f'distance must be between 0 and 31, got {distance}')
+        self.distance = distance
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()
+        width = 64 // (distance + 1)
+        # the last band takes the bits left over
+        self.bands = [
+            (i * width, (1 << (64 - i * width if i == distance else width)) - 1)
+            for i in range(distance + 1)
+        ]
+        self.tables = [dict() for _ in self.bands]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def keys(self, fingerprint: int) -> typing.Iterator[typing.Tuple[typing.Dict[int, typing.List[int]], int]]:
+        for table, (shift, mask) in zip(self.tables, self.bands):
+            yield table, (fingerprint >> shift) & mask
+
+    def find(self, fingerprint: int, uid: str | None = None, link: str | None = None) -> ObjectId | None:
+        # the id of a near duplicate written for another article than the
+        # one with this uid or link
+        own = {document_key(uid), document_key(link)} - {0}
+        with self.lock:
+            for table, key in self.keys(fingerprint):
+                for candidate in table.get(key, ()):
+                    if (candidate ^ fingerprint).bit_count() > self.distance:
+                        continue
+                    id, uid_key, link_key = self.entries[candidate]
+                    if uid_key not in own and link_key not in own:
+                        return id
+        return None
+
+    def add(self, fingerprint: int, id: ObjectId, uid: str | None = None, link: str | None = None):
+        self._add(fingerprint, id, document_key(uid), document_key(link))
+
+    def _add(self, fingerprint: int, id: ObjectId, uid_key: int, link_key: int):
+        with self.lock:
+            if fingerprint in self.entries:
+                return
+            self.entries[fingerprint] = (id, uid_key, link_key)
+            for table, key in self.keys(fingerprint):
+                table.setdefault(key, []).append(fingerprint)
+            if len(self.entries) > self.capacity:
+                self.remove(self.entries.popitem(last=False)[0])
+
+    def remove(self, fingerprint: int):
+        for table, key in self.keys(fingerprint):
+            bucket = table.get(key)
+            if bucket is None:
+                continue
+            bucket.remove(fingerprint)
+            if not bucket:
+                del table[key]
+
+    def to_bytes(self) -> bytes:
+        with self.lock:
+            records = np.array([(fp, id.binary, uid, link) for fp, (id, uid, link) in self.entries.items()], dtype=RECORD)
+        return HEADER.pack(MAGIC, self.distance, len(records)) + records.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, capacity: int = 1_000_000) -> 'NearDuplicateIndex':
+        magic, distance, count = HEADER.unpack_from(data, 0)
+        if magic[:7] == MAGIC[:7] and magic != MAGIC:
+            raise ValueError(f'near-duplicate index format {magic!r} is not supported, expected {MAGIC!r}')
+        if magic != MAGIC or len(data) != HEADER.size + count * RECORD.itemsize:
+            raise ValueError('not a near-duplicate index')
+        index = cls(distance, capacity)
+        records = np.frombuffer(data, dtype=RECORD, count=count, offset=HEADER.size)
+        for fp, id, uid, link in records[-capacity:].tolist():
+            # numpy strips trailing null bytes from 'S' fields
+            index._add(fp, ObjectId(id.ljust(12, b'\0')), uid, link)
+        return index
+
+
+_index: NearDuplicateIndex | None = None
+_index_lock = threading.Lock()
+
+def get_dedup_index(config: CrawlerConfig = CrawlerConfig()) -> NearDuplicateIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = NearDuplicateIndex(config.dedup_distance, config.dedup_capacity)
+        return _index
+
+def restore_dedup_index(data: bytes, config: CrawlerConfig = CrawlerConfig()) -> NearDuplicateIndex:
+    # the restored index keeps the distance it was built with
+    global _index
+    with _index_lock:
+        _index = NearDuplicateIndex.from_bytes(data, config.dedup_capacity)
+        return _index
+
+def close_dedup_index():
+    global _index
+    with _index_lock:
+        _index = None
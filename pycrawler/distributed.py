@@ -0,0 +1,220 @@
+import typing
+import threading
+import hashlib
+import socket
+import uuid
+import time
+import logging
+import os
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from pycrawler.frontier import Frontier
+from pycrawler.models import CrawlerQueueItem
+from pycrawler.config import CrawlerConfig
+import pycrawler.utils as utils
+
+logger = logging.getLogger(__name__)
+
+# seconds between two lease attempts while the local queue runs low
+POLL_INTERVAL = 1.0
+# seconds queued links may wait before they are handed to their owner
+FLUSH_INTERVAL = 1.0
+# seconds between two rounds of the sync thread
+SYNC_INTERVAL = 0.1
+
+
+def partition_of(host: str, num_workers: int) -> int:
+    # stable across processes and machines, unlike hash()
+    digest = hashlib.blake2b(host.encode('utf-8', 'surrogatepass'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') % max(1, num_workers)
+
+
+class DistributedFrontier(Frontier):
+    """
+    Frontier of one worker in a crawl split across num_workers processes.
+    Hosts are partitioned by hash, so every host belongs to exactly one
+    worker and its politeness delay holds for the whole cluster. Every
+    pushed url goes to the shared CrawlerQueueItem collection, tagged with
+    the partition of its host; a worker leases batches of its own partition
+    into the local frontier and deletes them once they were crawled. Leases
+    expire, so urls held by a worker that died are picked up again when it
+    restarts. All of this runs on a sync thread, started by the first pop(),
+    so neither crawl threads nor the event loop wait on mongo.
+    """
+    worker_index: int
+    num_workers: int
+    owner: str
+    batch_size: int
+    lease_time: float
+    idle_timeout: float
+    outbox: typing.List[str]
+    done: typing.List[str]
+
+    def __init__(self, config: CrawlerConfig, delay: typing.Callable[[str], float] | None = None):
+        super().__init__(max_size=config.max_queue_size, delay=delay)
+        if not 0 <= config.worker_index < config.num_workers:
+            raise ValueError(f'worker_index {config.worker_index} is not in [0, {config.num_workers})')
+        self.worker_index = config.worker_index
+        self.num_workers = config.num_workers
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.batch_size = max(1, config.queue_batch)
+        self.lease_time = config.queue_lease_time
+        self.idle_timeout = config.queue_idle_timeout
+        self.outbox = []
+        self.done = []
+        self.outbox_lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+        self.syncer = None
+        self.syncer_lock = threading.Lock()
+        self.stopped = threading.Event()
+        now = time.monotonic()
+        self.last_flush = now
+        self.last_lease = 0.0
+        self.last_renew = now
+        self.last_work = now
+        self.collection = CrawlerQueueItem._get_collection()
+
+    def owns(self, url: str) -> bool:
+        return partition_of(utils.url_get_domain(url), self.num_workers) == self.worker_index
+
+    def full(self) -> bool:
+        return len(self.outbox) >= self.max_size
+
+    def push(self, url: str) -> bool:
+        # owned urls take the same way, so they survive a crash of this worker
+        with self.outbox_lock:
+            self.outbox.append(url)
+        return True
+
+    def task_done(self, url: str | None = None):
+        if url is not None:
+            with self.outbox_lock:
+                self.done.append(url)
+        super().task_done(url)
+
+    def flush(self):
+        with self.outbox_lock:
+            urls, self.outbox = self.outbox, []
+        self.last_flush = time.monotonic()
+        if not urls:
+            return
+        now = datetime.utcnow()
+        ops = []
+        for url in dict.fromkeys(urls):
+            host = utils.url_get_domain(url)
+            item = dict(
+                url=url,
+                host=host,
+                partition=partition_of(host, self.num_workers),
+                created_at=now,
+                updated_at=now
+            )
+            # a url that is already queued keeps its place and its lease
+            ops.append(UpdateOne({'url': url}, {'$setOnInsert': item}, upsert=True))
+        CrawlerQueueItem._bulk_write(ops)
+
+    def ack(self):
+        with self.outbox_lock:
+            urls, self.done = self.done, []
+        if urls:
+            self.collection.delete_many({'url': {'$in': urls}, 'lease_owner': self.owner})
+
+    def renew(self):
+        self.last_renew = time.monotonic()
+        until = datetime.utcnow() + timedelta(seconds=self.lease_time)
+        self.collection.update_many({'lease_owner': self.owner}, {'$set': {'leased_until': until}})
+
+    def lease(self) -> int:
+        self.last_lease = time.monotonic()
+        n = min(self.batch_size, self.max_size - len(self))
+        if n <= 0:
+            return 0
+        now = datetime.utcnow()
+        free = {
+            'partition': self.worker_index,
+            '$or': [{'leased_until': None}, {'leased_until': {'$lt': now}}]
+        }
+        ids = [x['_id'] for x in self.collection.find(free, {'_id': 1}).sort('_id', 1).limit(n)]
+        if not ids:
+            return 0
+        # the filter is repeated so only one of two racing workers wins an item
+        self.collection.update_many(
+            {'_id': {'$in': ids}, **free},
+            {'$set': {'lease_owner': self.owner, 'leased_until': now + timedelta(seconds=self.lease_time)}}
+        )
+        leased = [x['url'] for x in self.collection.find({'_id': {'$in': ids}, 'lease_owner': self.owner}, {'url': 1})]
+        for url in leased:
+            super().push(url)
+        return len(leased)
+
+    def sync(self, force: bool = False):
+        # one thread talks to mongo at a time, the others keep crawling
+        if not self.sync_lock.acquire(blocking=force):
+            return
+        try:
+            now = time.monotonic()
+            if force or len(self.outbox) >= self.batch_size or now - self.last_flush >= FLUSH_INTERVAL:
+                self.flush()
+                self.ack()
+            if now - self.last_renew >= self.lease_time / 3:
+                self.renew()
+            if len(self) < self.batch_size and now - self.last_lease >= POLL_INTERVAL:
+                if self.lease() > 0:
+                    self.last_work = time.monotonic()
+        finally:
+            self.sync_lock.release()
+
+    def idle(self) -> bool:
+        # other workers may still hand over links, so an empty partition
+        # only ends the crawl after idle_timeout without any work
+        if len(self) > 0 or self.in_flight > 0 or self.outbox:
+            self.last_work = time.monotonic()
+            return False
+        return time.monotonic() - self.last_work >= self.idle_timeout
+
+    def run_sync(self):
+        while not self.stopped.wait(SYNC_INTERVAL):
+            try:
+                self.sync()
+            except Exception as e:
+                logger.warning('frontier sync failed error=%r', e)
+
+    def start_sync(self):
+        with self.syncer_lock:
+            if self.syncer is None and not self.stopped.is_set():
+                self.syncer = threading.Thread(target=self.run_sync, name='frontier-sync', daemon=True)
+                self.syncer.start()
+
+    def pop(self, timeout: float | None = None) -> str | None:
+        if self.syncer is None:
+            self.start_sync()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = POLL_INTERVAL if deadline is None else max(0.0, min(POLL_INTERVAL, deadline - time.monotonic()))
+            url = super().pop(wait)
+            if url is not None:
+                return url
+            if self.idle() or (deadline is not None and time.monotonic() >= deadline):
+                return None
+            with self.cond:
+                if not self.ready and self.in_flight <= 0:
+                    # the base frontier returns at once when drained, leased
+                    # urls pushed by the sync thread wake this up
+                    self.cond.wait(wait)
+
+    def wait_time(self) -> float | None:
+        wait = super().wait_time()
+        if wait is None and not self.idle():
+            return POLL_INTERVAL
+        return wait
+
+    def close(self):
+        self.stopped.set()
+        if self.syncer is not None:
+            self.syncer.join()
+        self.sync(force=True)
+        # whatever is still queued locally goes back to the partition
+        self.collection.update_many(
+            {'lease_owner': self.owner},
+            {'$set': {'lease_owner': None, 'leased_until': None}}
+        )
@@ -0,0 +1,213 @@
+import typing
+import threading
+import ipaddress
+import socket
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pycrawler.config import CrawlerConfig
+import pycrawler.metrics as metrics
+
+logger = logging.getLogger(__name__)
+
+# getaddrinfo before install() replaced it
+_getaddrinfo = socket.getaddrinfo
+
+AddrInfo = typing.Tuple[int, int, int, str, typing.Tuple]
+
+
+class DnsEntry(object):
+    infos: typing.List[AddrInfo] | None
+    error: socket.gaierror | None
+    expires_at: float
+
+    def __init__(self, infos: typing.List[AddrInfo] | None, error: socket.gaierror | None, expires_at: float):
+        self.infos = infos
+        self.error = error
+        self.expires_at = expires_at
+
+
+def is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host.strip('[]'))
+        return True
+    except ValueError:
+        return False
+
+
+def with_port(info: AddrInfo, port: int) -> AddrInfo:
+    family, type, proto, canonname, sockaddr = info
+    return (family, type, proto, canonname, (sockaddr[0], port, *sockaddr[2:]))
+
+
+class DnsCache(object):
+    """
+    In-process cache in front of socket.getaddrinfo. The system resolver
+    does not report record TTLs, so answers are kept for ttl seconds and
+    failures for negative_ttl seconds. Entries are stored per host for
+    TCP lookups; any other kind of lookup goes straight to the resolver.
+    """
+    ttl: float
+    negative_ttl: float
+    max_size: int
+    entries: typing.Dict[str, DnsEntry]
+    pending: typing.Dict[str, threading.Event]
+    hits: int
+    misses: int
+    negative_hits: int
+    prefetched: int
+
+    def __init__(self, config: CrawlerConfig = CrawlerConfig()):
+        self.ttl = config.dns_ttl
+        self.negative_ttl = config.dns_negative_ttl
+        self.max_size = max(1, config.dns_cache_size)
+        self.max_pending = max(1, config.dns_prefetch_backlog)
+        self.entries = dict()
+        self.pending = dict()
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max(1, config.dns_workers), thread_name_prefix='dns')
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.prefetched = 0
+
+    def cacheable(self, host, port, family: int, type: int, proto: int, flags: int) -> bool:
+        if not isinstance(host, str) or not host or is_ip(host):
+            return False
+        if port is not None and not isinstance(port, int) and not (isinstance(port, (str, bytes)) and port.isdigit()):
+            return False
+        return type == socket.SOCK_STREAM and proto in (0, socket.IPPROTO_TCP) and flags in (0, socket.AI_ADDRCONFIG)
+
+    def _lookup(self, host: str) -> DnsEntry:
+        try:
+            with metrics.DNS_SECONDS.time():
+                infos = _getaddrinfo(host, None, 0, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+            return DnsEntry(infos, None, time.monotonic() + self.ttl)
+        except socket.gaierror as e:
+            return DnsEntry(None, e, time.monotonic() + self.negative_ttl)
+
+    def _store(self, host: str, entry: DnsEntry):
+        with self.lock:
+            if len(self.entries) >= self.max_size:
+                now = time.monotonic()
+                expired = [h for h, e in self.entries.items() if e.expires_at <= now]
+                for h in expired or list(self.entries)[:max(1, self.max_size // 10)]:
+                    del self.entries[h]
+            self.entries[host] = entry
+
+    def entry(self, host: str) -> DnsEntry:
+        host = host.lower()
+        while True:
+            with self.lock:
+                entry = self.entries.get(host)
+                if entry is not None and entry.expires_at > time.monotonic():
+                    if entry.error is None:
+                        self.hits += 1
+                        metrics.DNS_LOOKUPS.inc(1, 'hit')
+                    else:
+                        self.negative_hits += 1
+                        metrics.DNS_LOOKUPS.inc(1, 'negative_hit')
+                    return entry
+                event = self.pending.get(host)
+                if event is None:
+                    # this thread resolves, others asking for the host wait for it
+                    event = self.pending[host] = threading.Event()
+                    self.misses += 1
+                    metrics.DNS_LOOKUPS.inc(1, 'miss')
+                    break
+            event.wait()
+        return self._resolve(host, event)
+
+    def _resolve(self, host: str, event: threading.Event) -> DnsEntry:
+        try:
+            entry = self._lookup(host)
+            self._store(host, entry)
+            return entry
+        finally:
+            with self.lock:
+                # close() may have released the host already
+                if self.pending.get(host) is event:
+                    del self.pending[host]
+            event.set()
+
+    def getaddrinfo(self, host, port, family: int = 0, type: int = 0, proto: int = 0, flags: int = 0):
+        if not self.cacheable(host, port, family, type, proto, flags):
+            return _getaddrinfo(host, port, family, type, proto, flags)
+        entry = self.entry(host)
+        if entry.error is not None:
+            raise socket.gaierror(*entry.error.args)
+        port = int(port or 0)
+        infos = [with_port(info, port) for info in entry.infos if family == 0 or info[0] == family]
+        if not infos:
+            raise socket.gaierror(socket.EAI_ADDRFAMILY if hasattr(socket, 'EAI_ADDRFAMILY') else socket.EAI_NONAME, 'No address for the requested family')
+        return infos
+
+    def prefetch(self, host: str):
+        # host may carry a port, as in a url's netloc
+        if not host or host.startswith('['):
+            return
+        host = host.partition(':')[0].lower()
+        if not host or is_ip(host):
+            return
+        with self.lock:
+            entry = self.entries.get(host)
+            if entry is not None and entry.expires_at > time.monotonic():
+                return
+            if host in self.pending or len(self.pending) >= self.max_pending:
+                return
+            event = self.pending[host] = threading.Event()
+            self.prefetched += 1
+        try:
+            self.executor.submit(self._resolve, host, event)
+        except RuntimeError:
+            # closed, whoever asks for the host resolves it
+            with self.lock:
+                del self.pending[host]
+            event.set()
+
+    def stats(self) -> typing.Dict[str, int]:
+        with self.lock:
+            return dict(
+                entries=len(self.entries),
+                pending=len(self.pending),
+                hits=self.hits,
+                misses=self.misses,
+                negative_hits=self.negative_hits,
+                prefetched=self.prefetched
+            )
+
+    def install(self):
+        # requests, aiohttp's threaded resolver and robots.txt fetches all end
+        # up in socket.getaddrinfo
+        socket.getaddrinfo = self.getaddrinfo
+
+    def close(self):
+        if socket.getaddrinfo == self.getaddrinfo:
+            socket.getaddrinfo = _getaddrinfo
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        # cancelled prefetches never set their events, threads waiting on
+        # them wake up and resolve the host themselves
+        with self.lock:
+            pending, self.pending = self.pending, dict()
+        for event in pending.values():
+            event.set()
+
+
+_cache: DnsCache | None = None
+_cache_lock = threading.Lock()
+
+def get_dns_cache(config: CrawlerConfig = CrawlerConfig()) -> DnsCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DnsCache(config)
+            _cache.install()
+        return _cache
+
+def close_dns_cache():
+    global _cache
+    with _cache_lock:
+        cache, _cache = _cache, None
+    if cache is not None:
+        cache.close()
+        logger.info('dns %s', ' '.join(f'{k}={v}' for k, v in cache.stats().items()))
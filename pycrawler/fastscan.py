@@ -0,0 +1,120 @@
+import typing
+import lxml.html
+from lxml import etree
+from pycrawler.scan import PageScan, ArticleScan, ElementData
+
+# text of every descendant except script and style bodies, like bs4's .text
+TEXT = etree.XPath('.//text()[not(parent::script) and not(parent::style)]', smart_strings=False)
+
+ARTICLE_TITLE_TAGS = frozenset(['h1', 'h2', 'h3', 'h4'])
+ARTICLE_TITLE_CLASSES = frozenset(['subject', 'title'])
+ARTICLE_CLASSES = frozenset(['news-article', 'article'])
+
+PARSER = lxml.html.HTMLParser(encoding='utf-8', remove_comments=True)
+
+
+def text_of(el) -> str:
+    return ''.join(TEXT(el))
+
+
+def classes_of(el) -> typing.FrozenSet[str]:
+    value = el.get('class')
+    return frozenset(value.split()) if value else frozenset()
+
+
+def is_image(tag: str, el) -> bool:
+    if tag == 'img':
+        return el.get('src') is not None
+    if tag == 'link':
+        rel = el.get('rel')
+        return rel is not None and ' '.join(rel.split()) == 'icon'
+    return False
+
+
+def is_article(tag: str, classes: typing.FrozenSet[str]) -> bool:
+    if tag == 'article':
+        return True
+    if tag == 'div' and 'post' in classes:
+        return True
+    return not ARTICLE_CLASSES.isdisjoint(classes)
+
+
+def scan_html(html: str | bytes) -> PageScan:
+    """
+    Single pass replacement for scan.scan_soup built on lxml. Elements
+    inside an article are handed to every open article around them, so
+    nested selects are not needed.
+    """
+    if isinstance(html, str):
+        # lxml refuses str input that carries an xml encoding declaration
+        html = html.encode('utf-8', 'surrogatepass')
+    try:
+        root = lxml.html.document_fromstring(html, parser=PARSER)
+    except etree.ParserError:
+        # empty document
+        return PageScan()
+
+    scan = PageScan()
+    scan.lang = root.get('lang')
+    open_articles: typing.List[typing.Tuple[typing.Any, ArticleScan]] = []
+    in_article = False
+
+    for event, el in etree.iterwalk(root, events=('start', 'end')):
+        if event == 'end':
+            if open_articles and open_articles[-1][0] is el:
+                open_articles.pop()
+                in_article = len(open_articles) > 0
+            continue
+
+        tag = el.tag
+        if not isinstance(tag, str):
+            continue
+
+        if tag == 'meta':
+            key = el.get('property') or el.get('name') or el.get('key')
+            value = el.get('content') or el.get('value')
+            if key and value:
+                scan.meta[key] = value
+        elif tag == 'title':
+            if scan.title is None:
+                scan.title = text_of(el)
+        elif tag == 'a' or tag == 'source':
+            scan.files.append(ElementData(dict(el.attrib)))
+
+        image = is_image(tag, el)
+        if image:
+            scan.images.append(ElementData(dict(el.attrib)))
+
+        href = el.get('href') if tag == 'a' else None
+        if href is not None:
+            scan.links.append(href)
+
+        classes = classes_of(el)
+
+        if in_article:
+            data = ElementData(dict(el.attrib)) if image else None
+            for _, article in open_articles:
+                if article.title is None and (tag in ARTICLE_TITLE_TAGS or not ARTICLE_TITLE_CLASSES.isdisjoint(classes)):
+                    article.title = text_of(el)
+                if tag == 'p':
+                    article.paragraphs.append(text_of(el))
+                elif tag == 'li':
+                    article.items.append(text_of(el))
+                elif tag == 'time' and article.time is None:
+                    article.time = ElementData(dict(el.attrib), text_of(el))
+                if data is not None:
+                    article.images.append(data)
+                if href is not None:
+                    article.hrefs.append(href)
+
+        if is_article(tag, classes):
+            article = ArticleScan()
+            scan.articles.append(article)
+            open_articles.append((el, article))
+            in_article = True
+
+    # scan_soup only looks at list items when an article has no paragraphs
+    for article in scan.articles:
+        if article.paragraphs:
+            article.items = []
+    return scan
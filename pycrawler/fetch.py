@@ -1,35 +1,295 @@
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from pycrawler.config import CrawlerConfig
+import typing
+import asyncio
+import types
+import codecs
+import hashlib
+import time
+import re
+import urllib.parse
+import aiohttp
 import requests
+import pycrawler.metrics as metrics
 
 
-class Headers(object):
-    data = dict()
-
-    def set(self, key: str, value: str):
-        self.data[key] = value
-        self.data[key.upper()] = value
-        self.data[key.title()] = value
-
-def fetchDocument(url: str) -> BeautifulSoup | None:
-    headers = Headers()
-    headers.set('user-agent', 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36')
-    headers.set('accept', 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7')
-    headers.set('sec-fetch-dest', 'document')
-    headers.set('sec-ch-ua', '"Google Chrome";v="135", "Not-A.Brand";v="8", "Chromium";v="135"')
-    headers.set('sec-ch-ua-mobile', '?0')
-    headers.set('sec-ch-ua-platform', '"Linux"')
-    headers.set('sec-fetch-mode', 'navigate')
-    headers.set('sec-fetch-site', 'none')
-    headers.set('sec-fetch-user', '?1')
-    headers.set('upgrade-insecure-requests', '1')
-    
+DEFAULT_HEADERS = types.MappingProxyType({
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Ch-Ua': '"Google Chrome";v="135", "Not-A.Brand";v="8", "Chromium";v="135"',
+    'Sec-Ch-Ua-Mobile': '?0',
+    'Sec-Ch-Ua-Platform': '"Linux"',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Sec-Fetch-User': '?1',
+    'Upgrade-Insecure-Requests': '1'
+})
+
+HTML_CONTENT_TYPES = frozenset([
+    'text/html',
+    'application/xhtml+xml'
+])
+
+CHUNK_SIZE = 64 * 1024
+SNIFF_SIZE = 4096
+
+CHARSET_PARAM = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.I)
+META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w.:-]+)', re.I)
+
+BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16')
+]
+
+# reasons a FetchResult carries no text
+ABORT_STATUS = 'status'
+ABORT_CONTENT_TYPE = 'content_type'
+ABORT_TOO_LARGE = 'too_large'
+ABORT_TOO_SLOW = 'too_slow'
+ABORT_TIMEOUT = 'timeout'
+ABORT_ERROR = 'error'
+
+
+class FetchResult(object):
+    url: str
+    status: int | None
+    headers: typing.Dict[str, str]
+    body: bytes | None
+    text: str | None
+    encoding: str | None
+    reason: str | None
+    content_hash: str | None
+
+    def __init__(
+            self,
+            url: str,
+            status: int | None = None,
+            headers: typing.Dict[str, str] | None = None,
+            body: bytes | None = None,
+            text: str | None = None,
+            encoding: str | None = None,
+            reason: str | None = None
+    ):
+        self.url = url
+        self.status = status
+        self.headers = headers or {}
+        self.body = body
+        self.text = text
+        self.encoding = encoding
+        self.reason = reason
+        self.content_hash = hashlib.blake2b(body, digest_size=16).hexdigest() if body is not None else None
+
+    @property
+    def ok(self) -> bool:
+        return self.text is not None
+
+    @property
+    def size(self) -> int:
+        return len(self.body) if self.body is not None else 0
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+    def validators(self) -> typing.Dict[str, str]:
+        headers = {k.lower(): v for k, v in self.headers.items()}
+        validators = dict(
+            etag=headers.get('etag'),
+            last_modified=headers.get('last-modified'),
+            content_hash=self.content_hash
+        )
+        return {k: v for k, v in validators.items() if v}
+
+
+def conditional_headers(validators: typing.Mapping[str, str] | None) -> typing.Dict[str, str]:
+    headers = {}
+    if not validators:
+        return headers
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    return headers
+
+
+def check_headers(status: int, headers: typing.Mapping[str, str], max_bytes: int) -> str | None:
+    if status < 200 or status >= 400:
+        return ABORT_STATUS
+    content_type = headers.get('Content-Type', '').split(';', 1)[0].strip().lower()
+    if content_type and content_type not in HTML_CONTENT_TYPES:
+        return ABORT_CONTENT_TYPE
+    length = headers.get('Content-Length')
+    if length and length.isdigit() and int(length) > max_bytes:
+        return ABORT_TOO_LARGE
+    return None
+
+
+def sniff_encoding(body: bytes, content_type: str) -> str:
+    match = CHARSET_PARAM.search(content_type)
+    if match:
+        return match.group(1)
+    for bom, encoding in BOMS:
+        if body.startswith(bom):
+            return encoding
+    match = META_CHARSET.search(body[:SNIFF_SIZE])
+    if match:
+        return match.group(1).decode('ascii', 'replace')
+    return 'utf-8'
+
+
+def decode_body(body: bytes, content_type: str) -> typing.Tuple[str, str]:
+    encoding = sniff_encoding(body, content_type)
+    try:
+        return body.decode(encoding, errors='replace'), encoding
+    except LookupError:
+        return body.decode('utf-8', errors='replace'), 'utf-8'
+
+
+def create_result(url: str, status: int, headers: typing.Mapping[str, str], body: bytes) -> FetchResult:
+    text, encoding = decode_body(body, headers.get('Content-Type', ''))
+    return FetchResult(url, status, dict(headers), body, text, encoding)
+
+
+def observe_result(url: str, result: FetchResult):
+    # failures are charged to the host that was asked for, not a redirect target
+    metrics.HOST_ERRORS.observe(urllib.parse.urlsplit(url).netloc, result.reason is not None)
+    if result.reason:
+        metrics.FETCH_ERRORS.inc(1, result.reason)
+    elif result.body is not None:
+        metrics.BYTES.inc(len(result.body))
+
+
+class Fetcher(object):
+    session: requests.Session
+    timeout: float
+    deadline: float
+    max_bytes: int
+
+    def __init__(self, config: CrawlerConfig = CrawlerConfig()):
+        self.timeout = config.fetch_timeout
+        self.deadline = config.fetch_deadline
+        self.max_bytes = config.max_page_bytes
+        # pool_connections is the number of per-host pools kept alive,
+        # pool_maxsize the number of keep-alive connections in each of them
+        adapter = HTTPAdapter(
+            pool_connections=config.pool_connections,
+            pool_maxsize=config.pool_maxsize
+        )
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.clear()
+        self.session.headers.update(DEFAULT_HEADERS)
+
+    def abort(self, url: str, reason: str, status: int | None = None, headers: typing.Mapping[str, str] | None = None) -> FetchResult:
+        return FetchResult(url, status, dict(headers or {}), reason=reason)
+
+    def fetch_result(self, url: str, validators: typing.Mapping[str, str] | None = None) -> FetchResult:
+        result = self._fetch_result(url, validators)
+        observe_result(url, result)
+        return result
+
+    def _fetch_result(self, url: str, validators: typing.Mapping[str, str] | None = None) -> FetchResult:
+        started = time.monotonic()
+        try:
+            with self.session.get(url, allow_redirects=True, timeout=self.timeout, stream=True, headers=conditional_headers(validators)) as resp:
+                metrics.RESPONSE_SECONDS.observe(resp.elapsed.total_seconds())
+                if resp.status_code == 304:
+                    return FetchResult(resp.url, resp.status_code, dict(resp.headers))
+                reason = check_headers(resp.status_code, resp.headers, self.max_bytes)
+                if reason:
+                    return self.abort(resp.url, reason, resp.status_code, resp.headers)
+
+                body = bytearray()
+                with metrics.DOWNLOAD_SECONDS.time():
+                    # decoded chunks, so the cap also holds for compressed bodies
+                    for chunk in resp.iter_content(CHUNK_SIZE):
+                        body.extend(chunk)
+                        if len(body) > self.max_bytes:
+                            return self.abort(resp.url, ABORT_TOO_LARGE, resp.status_code, resp.headers)
+                        if time.monotonic() - started > self.deadline:
+                            return self.abort(resp.url, ABORT_TOO_SLOW, resp.status_code, resp.headers)
+
+                return create_result(resp.url, resp.status_code, resp.headers, bytes(body))
+        except requests.Timeout:
+            return self.abort(url, ABORT_TIMEOUT)
+        except Exception:
+            return self.abort(url, ABORT_ERROR)
+
+    def close(self):
+        self.session.close()
+
+
+async def on_connection_create_start(session, context, params):
+    context.connect_started = time.perf_counter()
+
+async def on_connection_create_end(session, context, params):
+    metrics.CONNECT_SECONDS.observe(time.perf_counter() - context.connect_started)
+
+def create_async_session(config: CrawlerConfig = CrawlerConfig()) -> aiohttp.ClientSession:
+    trace = aiohttp.TraceConfig()
+    trace.on_connection_create_start.append(on_connection_create_start)
+    trace.on_connection_create_end.append(on_connection_create_end)
+    connector = aiohttp.TCPConnector(
+        limit=max(1, config.max_concurrency),
+        limit_per_host=config.pool_maxsize,
+        keepalive_timeout=config.keepalive_timeout,
+        # dns.DnsCache answers instead, with its own ttl and negative caching
+        use_dns_cache=not config.dns_cache
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers=dict(DEFAULT_HEADERS),
+        # like Fetcher, fetch_deadline is checked between chunks and reported as
+        # ABORT_TOO_SLOW, the socket timeouts as ABORT_TIMEOUT
+        timeout=aiohttp.ClientTimeout(total=None, sock_read=config.fetch_timeout, sock_connect=config.fetch_timeout),
+        trace_configs=[trace]
+    )
+
+async def fetchResultAsync(
+        session: aiohttp.ClientSession,
+        url: str,
+        max_bytes: int = CrawlerConfig.max_page_bytes,
+        validators: typing.Mapping[str, str] | None = None,
+        deadline: float = CrawlerConfig.fetch_deadline
+) -> FetchResult:
+    result = await _fetchResultAsync(session, url, max_bytes, validators, deadline)
+    observe_result(url, result)
+    return result
+
+async def _fetchResultAsync(
+        session: aiohttp.ClientSession,
+        url: str,
+        max_bytes: int,
+        validators: typing.Mapping[str, str] | None,
+        deadline: float
+) -> FetchResult:
+    started = time.perf_counter()
     try:
-        resp = requests.get(url, allow_redirects=True, timeout=4, headers=headers.data)
-        if not resp.ok:
-            return None
-        
-        text = resp.text
-        
-        return BeautifulSoup(text, 'html.parser')
-    except:
-        return None 
+        async with session.get(url, allow_redirects=True, headers=conditional_headers(validators)) as resp:
+            metrics.RESPONSE_SECONDS.observe(time.perf_counter() - started)
+            final_url = str(resp.url)
+            if resp.status == 304:
+                return FetchResult(final_url, resp.status, dict(resp.headers))
+            reason = check_headers(resp.status, resp.headers, max_bytes)
+            if reason:
+                return FetchResult(final_url, resp.status, dict(resp.headers), reason=reason)
+
+            body = bytearray()
+            with metrics.DOWNLOAD_SECONDS.time():
+                async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                    body.extend(chunk)
+                    if len(body) > max_bytes:
+                        return FetchResult(final_url, resp.status, dict(resp.headers), reason=ABORT_TOO_LARGE)
+                    if time.perf_counter() - started > deadline:
+                        return FetchResult(final_url, resp.status, dict(resp.headers), reason=ABORT_TOO_SLOW)
+
+            return create_result(final_url, resp.status, resp.headers, bytes(body))
+    except (TimeoutError, asyncio.TimeoutError):
+        # aiohttp's timeouts derive from asyncio.TimeoutError, which is
+        # only the builtin TimeoutError from python 3.11 on
+        return FetchResult(url, reason=ABORT_TIMEOUT)
+    except Exception:
+        return FetchResult(url, reason=ABORT_ERROR)
@@ -0,0 +1,161 @@
+import typing
+import collections
+import threading
+import heapq
+import time
+import pycrawler.utils as utils
+
+DEFAULT_MAX_SIZE = 100000
+
+
+class Frontier(object):
+    max_size: int
+    delay: typing.Callable[[str], float]
+    hosts: typing.Dict[str, typing.Deque[str]]
+    queued: typing.Set[str]
+    ready: typing.List[typing.Tuple[float, str]]
+    next_ready: typing.Dict[str, float]
+    in_flight: int
+    in_flight_urls: typing.Counter[str]
+
+    def __init__(
+            self,
+            max_size: int = DEFAULT_MAX_SIZE,
+            delay: typing.Callable[[str], float] | None = None
+    ):
+        self.max_size = max_size
+        # seconds a host has to rest after one of its urls was handed out
+        self.delay = delay or (lambda host: 0.0)
+        self.hosts = dict()
+        self.queued = set()
+        # heap of (ready_at, host), one entry per host with queued urls
+        self.ready = []
+        self.next_ready = dict()
+        self.in_flight = 0
+        # handed out and not acknowledged yet, part of every snapshot
+        self.in_flight_urls = collections.Counter()
+        self.cond = threading.Condition()
+
+    def __len__(self) -> int:
+        return len(self.queued)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.queued
+
+    def owns(self, url: str) -> bool:
+        # whether this frontier hands out the url, see DistributedFrontier
+        return True
+
+    def full(self) -> bool:
+        return len(self.queued) >= self.max_size
+
+    def push(self, url: str) -> bool:
+        with self.cond:
+            if url in self.queued or url in self.in_flight_urls:
+                return True
+            if len(self.queued) >= self.max_size:
+                return False
+            host = utils.url_get_domain(url)
+            queue = self.hosts.get(host)
+            if queue is None:
+                queue = self.hosts[host] = collections.deque()
+                heapq.heappush(self.ready, (self.next_ready.get(host, 0.0), host))
+            queue.append(url)
+            self.queued.add(url)
+            self.cond.notify()
+            return True
+
+    def _pop_ready(self, now: float) -> str:
+        _, host = heapq.heappop(self.ready)
+        queue = self.hosts[host]
+        url = queue.popleft()
+        self.queued.discard(url)
+        ready_at = now + self.delay(host)
+        self.next_ready[host] = ready_at
+        if queue:
+            heapq.heappush(self.ready, (ready_at, host))
+        else:
+            del self.hosts[host]
+            self._prune(now)
+        self.in_flight += 1
+        self.in_flight_urls[url] += 1
+        return url
+
+    def _discard_stale(self):
+        # reschedule() leaves the entry it replaced in the heap
+        while self.ready:
+            ready_at, host = self.ready[0]
+            if host in self.hosts and self.next_ready.get(host, 0.0) == ready_at:
+                return
+            heapq.heappop(self.ready)
+
+    def _prune(self, now: float):
+        if len(self.next_ready) <= 4 * max(self.max_size, 1):
+            return
+        for host in [h for h, t in self.next_ready.items() if t <= now and h not in self.hosts]:
+            del self.next_ready[host]
+
+    def pop(self, timeout: float | None = None) -> str | None:
+        """
+        Returns the next url whose host may be fetched now. Blocks while
+        hosts are resting or other workers may still push urls; returns
+        None once the frontier is drained or the timeout passes.
+        Every returned url must be acknowledged with task_done(url).
+        """
+        with self.cond:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while True:
+                now = time.monotonic()
+                wait = None
+                self._discard_stale()
+                if self.ready:
+                    ready_at = self.ready[0][0]
+                    if ready_at <= now:
+                        return self._pop_ready(now)
+                    wait = ready_at - now
+                elif self.in_flight <= 0:
+                    return None
+
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        return None
+                    wait = remaining if wait is None else min(wait, remaining)
+                self.cond.wait(wait)
+
+    def task_done(self, url: str | None = None):
+        with self.cond:
+            self.in_flight -= 1
+            if url is not None:
+                count = self.in_flight_urls[url] - 1
+                if count > 0:
+                    self.in_flight_urls[url] = count
+                else:
+                    self.in_flight_urls.pop(url, None)
+            self.cond.notify_all()
+
+    def reschedule(self, host: str, ready_at: float):
+        # moves the time the host may be handed out next, in either direction
+        with self.cond:
+            if self.next_ready.get(host) == ready_at:
+                return
+            self.next_ready[host] = ready_at
+            if host in self.hosts:
+                heapq.heappush(self.ready, (ready_at, host))
+            self.cond.notify_all()
+
+    def snapshot(self) -> typing.List[str]:
+        # urls still being crawled, then the queued ones grouped by host in
+        # the order they will be handed out
+        with self.cond:
+            return list(dict.fromkeys([*self.in_flight_urls, *(url for queue in self.hosts.values() for url in queue)]))
+
+    def wait_time(self) -> float | None:
+        with self.cond:
+            self._discard_stale()
+            if not self.ready:
+                return None
+            return max(0.0, self.ready[0][0] - time.monotonic())
+
+    def close(self):
+        pass
@@ -0,0 +1,77 @@
+import typing
+import functools
+import json
+import os
+import re
+
+DATA_DIR = os.path.join(os.path.realpath(os.path.dirname(__file__)), './data')
+# used for every language without a stopwords.<language>.json of its own
+STOPWORDS_FNAME = os.path.join(DATA_DIR, 'stopwords.json')
+
+# utils.KEYWORD_SEPARATORS as one character class
+SEPARATORS = re.compile(r'[ |,&\n\r_-]+')
+# the characters utils.cleanup_string removes
+DELETED = '”·\n\r\t:?~!@#$%^&*()/<>—–-_+{},.\'"'
+DELETE_TABLE = str.maketrans('', '', DELETED)
+# keywordify returns nothing for these strings
+EMPTY = frozenset(['', '.', ' '])
+
+
+def normalize(value: str) -> str:
+    return value.lower().translate(DELETE_TABLE)
+
+
+def language_code(language: str | None) -> str | None:
+    # 'en_US', 'en-us' and 'EN' all map to 'en'
+    if not language:
+        return None
+    return re.split(r'[_-]', language.strip().lower(), 1)[0] or None
+
+
+@functools.lru_cache(maxsize=None)
+def _load_stopwords(language: str | None) -> typing.FrozenSet[str]:
+    path = os.path.join(DATA_DIR, f'stopwords.{language}.json') if language else None
+    if path is None or not os.path.exists(path):
+        path = STOPWORDS_FNAME
+    with open(path, encoding='utf-8') as f:
+        return frozenset(word.lower() for word in json.load(f))
+
+
+def stopwords(language: str | None = None) -> typing.FrozenSet[str]:
+    # every list is read once per process
+    return _load_stopwords(language_code(language))
+
+
+def tokenize(texts: typing.Iterable[str], language: str | None = None) -> typing.List[str]:
+    """
+    Normalized keywords of texts in order of first appearance: split on
+    the keyword separators, lower cased, punctuation removed, empty tokens
+    and stopwords dropped.
+    """
+    stop = stopwords(language)
+    keywords = dict()
+    for text in texts:
+        for part in SEPARATORS.split(text):
+            token = part.lower().translate(DELETE_TABLE)
+            if token and token not in stop:
+                keywords[token] = None
+    return list(keywords)
+
+
+def keywordify(words: typing.List[str] | str, language: str | None = None) -> typing.List[str]:
+    if type(words) == str:
+        if words in EMPTY:
+            return []
+        if SEPARATORS.search(words) is None:
+            # a single word is kept as it is, stopword or not
+            return [normalize(words)]
+        return tokenize([words], language)
+    return tokenize(flatten_strings(words), language)
+
+
+def flatten_strings(items: typing.Iterable[typing.Any]) -> typing.Iterator[str]:
+    for item in items:
+        if type(item) == str:
+            yield item
+        else:
+            yield from flatten_strings(item)
@@ -0,0 +1,316 @@
+import typing
+import threading
+import bisect
+import logging
+import collections
+import contextlib
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+logger = logging.getLogger(__name__)
+
+# seconds, from a cached dns answer to a slow download
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20)
+
+Labels = typing.Tuple[str, ...]
+
+
+def format_labels(names: typing.Tuple[str, ...], values: Labels) -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class Metric(object):
+    name: str
+    help: str
+    type: str
+    label_names: typing.Tuple[str, ...]
+
+    def __init__(self, name: str, help: str, label_names: typing.Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.lock = threading.Lock()
+
+    def render(self) -> typing.List[str]:
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}', *self.samples()]
+
+    def samples(self) -> typing.List[str]:
+        return []
+
+
+class Counter(Metric):
+    type = 'counter'
+    values: typing.Dict[Labels, float]
+
+    def __init__(self, name: str, help: str, label_names: typing.Tuple[str, ...] = ()):
+        super().__init__(name, help, label_names)
+        self.values = collections.defaultdict(float)
+
+    def inc(self, amount: float = 1, *labels: str):
+        with self.lock:
+            self.values[labels] += amount
+
+    def get(self, *labels: str) -> float:
+        with self.lock:
+            return self.values.get(labels, 0.0)
+
+    def total(self) -> float:
+        with self.lock:
+            return sum(self.values.values())
+
+    def samples(self) -> typing.List[str]:
+        with self.lock:
+            items = list(self.values.items())
+        if not items and not self.label_names:
+            items = [((), 0.0)]
+        return [f'{self.name}{format_labels(self.label_names, labels)} {value:g}' for labels, value in items]
+
+
+class Gauge(Metric):
+    type = 'gauge'
+    read: typing.Callable[[], float]
+
+    def __init__(self, name: str, help: str, read: typing.Callable[[], float] | None = None):
+        super().__init__(name, help)
+        self.value = 0.0
+        self.read = read
+
+    def set(self, value: float):
+        self.value = value
+
+    def get(self) -> float:
+        if self.read is not None:
+            try:
+                return float(self.read())
+            except Exception:
+                return 0.0
+        return self.value
+
+    def samples(self) -> typing.List[str]:
+        return [f'{self.name} {self.get():g}']
+
+
+class Histogram(Metric):
+    type = 'histogram'
+    buckets: typing.Tuple[float, ...]
+    counts: typing.List[int]
+    sum: float
+    count: int
+
+    def __init__(self, name: str, help: str, buckets: typing.Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextlib.contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def quantile(self, q: float) -> float:
+        # upper bound of the bucket holding the q-quantile
+        with self.lock:
+            counts = list(self.counts)
+            count = self.count
+        if count == 0:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for i, n in enumerate(counts):
+            seen += n
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else float('inf')
+        return float('inf')
+
+    def samples(self) -> typing.List[str]:
+        with self.lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        lines = []
+        cumulative = 0
+        for bound, n in zip((*self.buckets, float('inf')), counts):
+            cumulative += n
+            le = '+Inf' if bound == float('inf') else f'{bound:g}'
+            lines.append(f'{self.name}_bucket{{le="{le}"}} {cumulative}')
+        lines.append(f'{self.name}_sum {total:g}')
+        lines.append(f'{self.name}_count {count}')
+        return lines
+
+
+class HostErrors(Metric):
+    """
+    Requests and errors per host. Only max_hosts hosts are tracked, the
+    ones seen least recently are dropped, and the export is limited to the
+    top hosts by error count so label cardinality stays bounded.
+    """
+    type = 'gauge'
+    hosts: typing.OrderedDict[str, typing.List[int]]
+
+    def __init__(self, name: str, help: str, max_hosts: int = 10000, top: int = 20):
+        super().__init__(name, help, ('host',))
+        self.hosts = collections.OrderedDict()
+        self.max_hosts = max_hosts
+        self.top = top
+
+    def observe(self, host: str, error: bool):
+        with self.lock:
+            entry = self.hosts.get(host)
+            if entry is None:
+                entry = self.hosts[host] = [0, 0]
+                if len(self.hosts) > self.max_hosts:
+                    self.hosts.popitem(last=False)
+            else:
+                self.hosts.move_to_end(host)
+            entry[0] += 1
+            if error:
+                entry[1] += 1
+
+    def worst(self) -> typing.List[typing.Tuple[str, int, int]]:
+        with self.lock:
+            items = [(host, requests, errors) for host, (requests, errors) in self.hosts.items() if errors]
+        return sorted(items, key=lambda x: x[2], reverse=True)[:self.top]
+
+    def samples(self) -> typing.List[str]:
+        return [
+            f'{self.name}{format_labels(self.label_names, (host,))} {errors / requests:g}'
+            for host, requests, errors in self.worst()
+        ]
+
+
+class Registry(object):
+    metrics: typing.List[Metric]
+
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+PAGES = REGISTRY.add(Counter('pycrawler_pages_total', 'Pages fetched and written'))
+UNCHANGED = REGISTRY.add(Counter('pycrawler_unchanged_total', 'Pages found unchanged on recrawl'))
+BYTES = REGISTRY.add(Counter('pycrawler_bytes_total', 'Response body bytes downloaded'))
+FETCH_ERRORS = REGISTRY.add(Counter('pycrawler_fetch_errors_total', 'Fetches that returned no page', ('reason',)))
+CRAWL_ERRORS = REGISTRY.add(Counter('pycrawler_crawl_errors_total', 'Urls that raised while being crawled'))
+LINKS = REGISTRY.add(Counter('pycrawler_links_queued_total', 'Links pushed to the frontier'))
+ARTICLES = REGISTRY.add(Counter('pycrawler_articles_total', 'Articles extracted from written pages'))
+DUPLICATE_ARTICLES = REGISTRY.add(Counter('pycrawler_duplicate_articles_total', 'Articles not written as near duplicates of a written one'))
+
+DNS_SECONDS = REGISTRY.add(Histogram('pycrawler_dns_seconds', 'Resolver lookups on dns cache misses'))
+CONNECT_SECONDS = REGISTRY.add(Histogram('pycrawler_connect_seconds', 'New connections, async mode only'))
+RESPONSE_SECONDS = REGISTRY.add(Histogram('pycrawler_response_seconds', 'Request sent to response headers, including connect'))
+DOWNLOAD_SECONDS = REGISTRY.add(Histogram('pycrawler_download_seconds', 'Response headers to the end of the body'))
+PARSE_SECONDS = REGISTRY.add(Histogram('pycrawler_parse_seconds', 'Parsing a page into a PageScan'))
+EXTRACT_SECONDS = REGISTRY.add(Histogram('pycrawler_extract_seconds', 'Building documents from a PageScan'))
+MONGO_SECONDS = REGISTRY.add(Histogram('pycrawler_mongo_write_seconds', 'Writing one page and its documents'))
+QDRANT_SECONDS = REGISTRY.add(Histogram('pycrawler_qdrant_write_seconds', 'Writing one batch of points'))
+QDRANT_SKIPPED = REGISTRY.add(Counter('pycrawler_qdrant_skipped_total', 'Pages not indexed for lack of a vector of the collection size'))
+
+GC_SECONDS = REGISTRY.add(Histogram('pycrawler_gc_seconds', 'Garbage collector pauses, with gc profiling on'))
+GC_COLLECTED = REGISTRY.add(Counter('pycrawler_gc_collected_total', 'Objects freed by the garbage collector', ('generation',)))
+
+WARC_RECORDS = REGISTRY.add(Counter('pycrawler_warc_records_total', 'Responses written to the warc archive'))
+WARC_BYTES = REGISTRY.add(Counter('pycrawler_warc_bytes_total', 'Compressed bytes written to the warc archive'))
+WARC_DROPPED = REGISTRY.add(Counter('pycrawler_warc_dropped_total', 'Responses not archived because the warc queue was full'))
+WARC_SECONDS = REGISTRY.add(Histogram('pycrawler_warc_write_seconds', 'Building, compressing and writing one warc record'))
+
+DNS_LOOKUPS = REGISTRY.add(Counter('pycrawler_dns_lookups_total', 'Dns cache lookups', ('result',)))
+HOST_ERRORS = REGISTRY.add(HostErrors('pycrawler_host_error_ratio', 'Share of failed fetches of the hosts with most errors'))
+
+# read callbacks are set by the crawl that owns the frontier and indexer
+FRONTIER_SIZE = REGISTRY.add(Gauge('pycrawler_frontier_size', 'Urls waiting in the frontier'))
+IN_FLIGHT = REGISTRY.add(Gauge('pycrawler_in_flight', 'Urls handed out and not yet done'))
+QDRANT_QUEUE = REGISTRY.add(Gauge('pycrawler_qdrant_queue_depth', 'Pages waiting to be indexed'))
+INFLIGHT_BYTES = REGISTRY.add(Gauge('pycrawler_inflight_bytes', 'Bytes of fetched pages not yet written'))
+WARC_QUEUE = REGISTRY.add(Gauge('pycrawler_warc_queue_bytes', 'Bytes of responses waiting to be archived'))
+DUPLICATE_RATE = REGISTRY.add(Gauge(
+    'pycrawler_duplicate_article_ratio', 'Share of articles found to be near duplicates',
+    lambda: DUPLICATE_ARTICLES.total() / max(1, ARTICLES.total())
+))
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+def serve(port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    logger.info('metrics on http://%s:%d/metrics', host, server.server_address[1])
+    return server
+
+
+class Reporter(threading.Thread):
+    # logs a summary line every interval seconds
+    interval: float
+
+    def __init__(self, interval: float = 30):
+        super().__init__(name='reporter', daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.last = (time.monotonic(), PAGES.total(), BYTES.total())
+
+    def summary(self) -> str:
+        now, pages, bytes = time.monotonic(), PAGES.total(), BYTES.total()
+        last_time, last_pages, last_bytes = self.last
+        self.last = (now, pages, bytes)
+        elapsed = max(1e-9, now - last_time)
+        frontier = FRONTIER_SIZE.get()
+        return (
+            f'pages={pages:.0f} pages_per_sec={(pages - last_pages) / elapsed:.1f} '
+            f'mb_per_sec={(bytes - last_bytes) / elapsed / 1e6:.2f} frontier={frontier:.0f} '
+            f'inflight_mb={INFLIGHT_BYTES.get() / 1e6:.1f} '
+            f'errors={FETCH_ERRORS.total() + CRAWL_ERRORS.total():.0f} unchanged={UNCHANGED.total():.0f} '
+            f'duplicate_rate={DUPLICATE_RATE.get():.3f} '
+            f'response_p50={RESPONSE_SECONDS.quantile(0.5):g}s response_p99={RESPONSE_SECONDS.quantile(0.99):g}s '
+            f'download_p99={DOWNLOAD_SECONDS.quantile(0.99):g}s parse_p99={PARSE_SECONDS.quantile(0.99):g}s '
+            f'mongo_p99={MONGO_SECONDS.quantile(0.99):g}s'
+        )
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            logger.info('stats %s', self.summary())
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        logger.info('stats %s', self.summary())
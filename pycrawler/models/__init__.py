@@ -1,5 +1,14 @@
+import typing
 import mongoengine
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from datetime import datetime
+import pycrawler.revisit as revisit
+
+DUPLICATE_KEY_ERROR = 11000
+# what mongoengine's __getstate__ keeps besides _data
+PICKLED_STATE = ('_changed_fields', '_initialised', '_created', '_dynamic_fields', '_fields_ordered')
+
 class BaseDocument(mongoengine.Document):
     meta = {
         'abstract': True
@@ -14,7 +23,16 @@ class BaseDocument(mongoengine.Document):
         self.updated_at = datetime.now()
         return super(BaseDocument, self).save(*args, **kwargs)
 
-    def upsert(self, *args, **kwargs):
+    def __getstate__(self):
+        # mongoengine pickles documents through to_mongo, which refuses
+        # references to unsaved documents. The field values are pickled as
+        # they are instead, so pages extracted in a parser process keep the
+        # images their articles point at
+        state = {k: getattr(self, k) for k in PICKLED_STATE if hasattr(self, k)}
+        state['_data'] = dict(self._data)
+        return state
+
+    def upsert(self, *args, reload: bool = True, **kwargs):
         cls = self.__class__
         unique_fields = [
             f for f, field in self._fields.items()
@@ -34,7 +52,100 @@ class BaseDocument(mongoengine.Document):
 
         cls.objects(**query).update_one(upsert=True, **update_fields)
 
+        if not reload:
+            return self
         return cls.objects.get(**query)
+
+    @classmethod
+    def unique_fields(cls) -> typing.List[str]:
+        return [
+            field.db_field for field in cls._fields.values()
+            if getattr(field, 'unique', False)
+        ]
+
+    def upsert_key(self) -> typing.Tuple:
+        return tuple(getattr(self, name) for name, field in self._fields.items() if getattr(field, 'unique', False))
+
+    @classmethod
+    def _bulk_write(cls, ops: typing.List[UpdateOne]) -> typing.Dict[int, typing.Any]:
+        collection = cls._get_collection()
+        try:
+            return collection.bulk_write(ops, ordered=False).upserted_ids
+        except BulkWriteError as e:
+            # two writers upserting the same new key race on the unique index,
+            # the loser simply has to run its update again
+            upserted = {x['index']: x['_id'] for x in e.details.get('upserted', [])}
+            retry = [x['index'] for x in e.details.get('writeErrors', []) if x.get('code') == DUPLICATE_KEY_ERROR]
+            if len(retry) < len(e.details.get('writeErrors', [])):
+                raise
+            if retry:
+                collection.bulk_write([ops[i] for i in retry], ordered=False)
+            return upserted
+
+    @classmethod
+    def bulk_upsert(cls, groups: typing.Dict[typing.Tuple, typing.List['BaseDocument']]):
+        if not groups:
+            return
+        keys = list(groups.keys())
+        fields = cls.unique_fields()
+        ops = []
+        for key in keys:
+            # the last document added for a key wins, like consecutive upserts
+            raw = groups[key][-1].to_mongo().to_dict()
+            raw.pop('_id', None)
+            ops.append(UpdateOne(dict(zip(fields, key)), {'$set': raw}, upsert=True))
+
+        ids = {keys[index]: _id for index, _id in cls._bulk_write(ops).items()}
+
+        missing = [key for key in keys if key not in ids]
+        if missing:
+            if len(fields) == 1:
+                query = {fields[0]: {'$in': [key[0] for key in missing]}}
+            else:
+                query = {'$or': [dict(zip(fields, key)) for key in missing]}
+            for raw in cls._get_collection().find(query, {field: 1 for field in fields}):
+                ids[tuple(raw.get(field) for field in fields)] = raw['_id']
+
+        # a key written but not found again, such as a document deleted in
+        # between, fails the batch rather than leaving documents without ids
+        lost = [key for key in keys if key not in ids]
+        if lost:
+            raise mongoengine.OperationError(f'{cls.__name__} upserts not found after writing keys={lost[:10]}')
+
+        for key, docs in groups.items():
+            for doc in docs:
+                doc.id = ids[key]
+
+
+class UpsertBatch(object):
+    pending: typing.Dict[type, typing.Dict[typing.Tuple, typing.List[BaseDocument]]]
+
+    def __init__(self):
+        self.pending = dict()
+
+    def __len__(self) -> int:
+        return sum(len(groups) for groups in self.pending.values())
+
+    def add(self, doc: BaseDocument) -> BaseDocument:
+        groups = self.pending.setdefault(type(doc), dict())
+        groups.setdefault(doc.upsert_key(), []).append(doc)
+        return doc
+
+    def discard(self, doc: BaseDocument):
+        groups = self.pending.get(type(doc), dict())
+        key = doc.upsert_key()
+        docs = [x for x in groups.get(key, []) if x is not doc]
+        if docs:
+            groups[key] = docs
+        else:
+            groups.pop(key, None)
+
+    def flush(self):
+        # referenced documents need their ids before the documents pointing at them are written
+        order = [cls for cls in FLUSH_ORDER if cls in self.pending]
+        order.extend(cls for cls in self.pending if cls not in order)
+        for cls in order:
+            cls.bulk_upsert(self.pending.pop(cls))
     
 class CrawlerImage(BaseDocument):
     category = mongoengine.StringField(required=True, default='IMAGE') 
@@ -86,6 +197,18 @@ class CrawlerWebsite(BaseDocument):
     images = mongoengine.ListField(mongoengine.ReferenceField(CrawlerImage), required=False, default=[])
     files = mongoengine.ListField(mongoengine.ReferenceField(CrawlerFile), required=False, default=[])
     keywords = mongoengine.ListField(mongoengine.StringField(), required=False, default=[])
+    # validators of the last full fetch, sent back to make recrawls conditional
+    etag = mongoengine.StringField(required=False)
+    last_modified = mongoengine.StringField(required=False)
+    content_hash = mongoengine.StringField(required=False)
+    # crawl history, see revisit.observe
+    crawl_count = mongoengine.IntField(required=False)
+    change_count = mongoengine.IntField(required=False)
+    observed_time = mongoengine.FloatField(required=False)
+    last_crawled_at = mongoengine.DateTimeField(required=False)
+    last_changed_at = mongoengine.DateTimeField(required=False)
+    change_rate = mongoengine.FloatField(required=False)
+    next_crawl_at = mongoengine.DateTimeField(required=False)
 
     # https://docs.mongoengine.org/guide/defining-documents.html#indexes
     meta = {
@@ -95,7 +218,8 @@ class CrawlerWebsite(BaseDocument):
         'indexes': [
             '$name',
             'language',
-            'keywords'
+            'keywords',
+            'next_crawl_at'
         ]
     }
 
@@ -105,6 +229,35 @@ class CrawlerWebsite(BaseDocument):
         ]
         return list(CrawlerWebsite.objects.aggregate(*pipeline))
 
+    @staticmethod
+    def get_due(n: int, now: datetime, candidates: int = 4) -> typing.List[typing.Dict[str, typing.Any]]:
+        # pages never scheduled sort first, the earliest due ones are then
+        # ranked by how likely they changed since their last crawl
+        due = mongoengine.Q(next_crawl_at__lte=now) | mongoengine.Q(next_crawl_at=None)
+        records = CrawlerWebsite.objects(due) \
+            .only('url', 'change_rate', 'last_crawled_at') \
+            .order_by('next_crawl_at') \
+            .limit(n * candidates) \
+            .as_pymongo()
+        return revisit.rank(list(records), now)[:n]
+
+    @staticmethod
+    def get_record(url: str) -> typing.Dict[str, typing.Any] | None:
+        fields = ['etag', 'last_modified', 'content_hash', *revisit.HISTORY_FIELDS]
+        return CrawlerWebsite.objects(url=url).only(*fields).as_pymongo().first()
+
+    @staticmethod
+    def get_records(urls: typing.List[str]) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+        # get_record of many urls in one query, urls never crawled are missing
+        fields = ['url', 'etag', 'last_modified', 'content_hash', *revisit.HISTORY_FIELDS]
+        return {x['url']: x for x in CrawlerWebsite.objects(url__in=urls).only(*fields).as_pymongo()}
+
+    @staticmethod
+    def touch(url: str, fields: typing.Dict[str, typing.Any] = {}):
+        # the page did not change, only record that it was checked
+        update = {f'set__{k}': v for k, v in fields.items()}
+        CrawlerWebsite.objects(url=url).update_one(set__updated_at=datetime.utcnow(), **update)
+
 class CrawlerArticle(BaseDocument):
     category = mongoengine.StringField(required=True, default='ARTICLE') 
     uid = mongoengine.StringField(required=True, unique=True)
@@ -133,3 +286,20 @@ class CrawlerArticle(BaseDocument):
             'source_date'
         ]
     }
+
+class CrawlerQueueItem(BaseDocument):
+    # shared frontier of a distributed crawl, see distributed.DistributedFrontier
+    url = mongoengine.StringField(required=True, unique=True)
+    host = mongoengine.StringField(required=True)
+    partition = mongoengine.IntField(required=True)
+    lease_owner = mongoengine.StringField(required=False)
+    leased_until = mongoengine.DateTimeField(required=False)
+
+    meta = {
+        'indexes': [
+            ('partition', 'leased_until'),
+            'lease_owner'
+        ]
+    }
+
+FLUSH_ORDER = [CrawlerImage, CrawlerFile, CrawlerArticle, CrawlerWebsite]
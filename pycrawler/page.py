@@ -1,56 +1,69 @@
 import typing
 from bs4 import BeautifulSoup
 from pycrawler.meta import Meta
+from pycrawler.scan import PageScan, ArticleScan, ElementData, scan_document
 import pycrawler.utils as utils
+import pycrawler.dates as dates
 import pycrawler.models as crawler_models
+from pycrawler.dedup import NearDuplicateIndex, fingerprint
 import urllib
-import dateutil
 import datetime
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# meta keys holding the date of the page, the first one set is used
+DATE_KEYS = (
+    'date', 'time',
+    'date_published', 'time_published', 'date-published', 'time-published',
+    'date_modified', 'time_modified', 'date-modified', 'time-modified',
+    'timestamp'
+)
 
 class Page(object):
-    doc: BeautifulSoup
+    scan: PageScan
     meta: Meta
     url: str
     domain: str
     title: str
     language: str
     keywords: typing.List[str]
+    date: str | None
     files: typing.List[crawler_models.CrawlerFile]
     images: typing.List[crawler_models.CrawlerImage]
     articles: typing.List[crawler_models.CrawlerArticle]
+    batch: crawler_models.UpsertBatch
 
-    def __init__(self, url: str, doc: BeautifulSoup):
+    def __init__(
+            self,
+            url: str,
+            doc: BeautifulSoup | PageScan,
+            batch: crawler_models.UpsertBatch | None = None
+    ):
+        # documents are only collected here, they are written when the batch is flushed
+        self.batch = batch if batch is not None else crawler_models.UpsertBatch()
         self.url = url
         self.domain = utils.url_get_domain(url)
-        self.doc = doc
+        self.scan = scan_document(doc)
         self.meta = self._extract_meta()
         self.title = self._extract_title()
         self.language = self._extract_language()
         self.keywords = self._extract_keywords()
-        self.files = self._extract_files(self.doc)
-        self.images = self._extract_images(doc, url, fallback_title=self.title, keywords=self.keywords, lang=self.language)
-        self.articles = self._extract_articles(doc, url, fallback_title=self.title, keywords=self.keywords, lang=self.language)
+        self.date = self._extract_date()
+        self.files = self._extract_files(self.scan.files)
+        self.images = self._extract_images(self.scan.images, url, fallback_title=self.title, keywords=self.keywords, lang=self.language)
+        self.articles = self._extract_articles(self.scan.articles, url, fallback_title=self.title, keywords=self.keywords, lang=self.language)
 
     def _extract_meta(self):
-        meta_tags = list(self.doc.select('meta'))
-        meta_dict = {}
-        for tag in meta_tags:
-            key = tag.get('property') or tag.get('name') or tag.get('key')
-            value = tag.get('content') or tag.get('value')
-            if key and value:
-                meta_dict[key] = value
-        return Meta(meta_dict)
+        return Meta(self.scan.meta)
 
     def _extract_title(self):
-        name_el = self.doc.select_one('title')
-        return name_el.text.strip() if name_el else None
+        return self.scan.title.strip() if self.scan.title is not None else None
 
     def _extract_language(self):
-        html = self.doc.select_one('html')
-        if html:
-            lang = html.get('lang')
-            if lang:
-                return lang
+        if self.scan.lang:
+            return self.scan.lang
         meta_locale = self.meta.get('locale') or\
             self.meta.get('lang') or\
             self.meta.get('language')
@@ -63,10 +76,14 @@ class Page(object):
         kws = list(map(lambda x: utils.normalize_string(x.strip().lower()), keywords.strip().split(','))) if keywords else []
         if self.title:
             kws.append(self.title)
-        return utils.keywordify(kws)
+        return utils.keywordify(kws, self.language)
+
+    def _extract_date(self) -> str | None:
+        # looked up once per page, the articles share it
+        return next((value for value in map(self.meta.get, DATE_KEYS) if value), None)
 
-    def _extract_files(self, doc: BeautifulSoup):
-        def extract_file(el: BeautifulSoup):
+    def _extract_files(self, elements: typing.List[ElementData]):
+        def extract_file(el: ElementData):
             src = el.get('src') or\
                 el.get('data-src') or\
                 el.get('href') or\
@@ -82,19 +99,18 @@ class Page(object):
                 return None
             filename = utils.url_get_filename(joined)
             domain = utils.url_get_domain(joined)
-            return crawler_models.CrawlerFile(
+            return self.batch.add(crawler_models.CrawlerFile(
                 url=joined,
                 domain=domain,
                 name=filename,
                 extension=extension,
                 keywords=self.keywords,
                 language=self.language
-            ).upsert()
-        elements = list(doc.select('a,source'))
-        return filter(lambda x: x is not None, map(extract_file, elements))
+            ))
+        return list(filter(lambda x: x is not None, map(extract_file, elements)))
 
-    def _extract_images(self, doc: BeautifulSoup, url: str, fallback_title: str | None = None, keywords: typing.List[str] = [], lang: str | None = None):
-        def extract_image(el: BeautifulSoup):
+    def _extract_images(self, images: typing.List[ElementData], url: str, fallback_title: str | None = None, keywords: typing.List[str] = [], lang: str | None = None):
+        def extract_image(el: ElementData):
             src = el.get('src') or el.get('href')
             if not src:
                 return None
@@ -104,9 +120,9 @@ class Page(object):
             name = utils.strip(name)
             joined = urllib.parse.urljoin(url, src)
             img_keywords = keywords.copy()
-            img_keywords.extend(utils.keywordify(name))
+            img_keywords.extend(utils.keywordify(name, lang))
             img_keywords = utils.unique(img_keywords)
-            return crawler_models.CrawlerImage(url=joined, name=name, domain=utils.url_get_domain(joined), keywords=img_keywords, language=lang).upsert()
+            return self.batch.add(crawler_models.CrawlerImage(url=joined, name=name, domain=utils.url_get_domain(joined), keywords=img_keywords, language=lang))
 
         def image_from_meta():
             src = self.meta.get('og:image')
@@ -119,28 +135,26 @@ class Page(object):
                 return None
             name = utils.strip(name)
             img_keywords = keywords.copy()
-            img_keywords.extend(utils.keywordify(name))
+            img_keywords.extend(utils.keywordify(name, lang))
             img_keywords = utils.unique(img_keywords)
-            return crawler_models.CrawlerImage(url=joined, name=name, domain=utils.url_get_domain(joined), keywords=img_keywords, language=lang).upsert()
+            return self.batch.add(crawler_models.CrawlerImage(url=joined, name=name, domain=utils.url_get_domain(joined), keywords=img_keywords, language=lang))
             
             # width = meta.get('og:image:width')
             # height = meta.get('og:image:height')
             # mime = meta.get('og:image:type')
             
-        images = list(doc.select('img[src],link[rel="icon"]'))
         imgs = [*list(map(extract_image, images)), image_from_meta()]
         return list(filter(lambda x: x is not None, imgs))
 
-    def _extract_articles(self, doc: BeautifulSoup, url: str, fallback_title: str | None = None, keywords: typing.List[str] = [], lang: str | None = None):
+    def _extract_articles(self, articles: typing.List[ArticleScan], url: str, fallback_title: str | None = None, keywords: typing.List[str] = [], lang: str | None = None):
         # json_scripts = doc.select('script[type="application/ld+json"]')
 
-        def extract_article(el: BeautifulSoup):
-            title_tag = el.select_one('h1,h2,h3,h4,.subject,.title')
-            title = (title_tag.text or '').strip() if title_tag else None
+        def extract_article(el: ArticleScan):
+            title = (el.title or '').strip() if el.title is not None else None
 
             text = utils.strip('\n'.join(
                 list(map(
-                    lambda p: (p.text or '').strip(), list(el.select('p')) or list(el.select('li'))
+                    lambda p: (p or '').strip(), el.paragraphs or el.items
                 ))
             ))
             
@@ -154,11 +168,11 @@ class Page(object):
 
             title = utils.strip(title)
             article_keywords = keywords.copy()
-            article_keywords.extend(utils.keywordify(title))
+            article_keywords.extend(utils.keywordify(title, lang))
             article_keywords = utils.unique(article_keywords)
-            images = self._extract_images(el, url, fallback_title=title, keywords=article_keywords, lang=lang)
+            images = self._extract_images(el.images, url, fallback_title=title, keywords=article_keywords, lang=lang)
             links = utils.unique(list(map(lambda x: urllib.parse.urljoin(url, x),
-                             filter(lambda x: x is not None, map(lambda x: x.get('href'), list(el.select('a[href]')))))))
+                             filter(lambda x: x is not None, el.hrefs))))
             
             links = list(filter(lambda x: utils.url_get_extension(x) not in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webm'], links))
 
@@ -172,37 +186,25 @@ class Page(object):
                 link = (utils.find(links, lambda x: slug1 in x or slug2 in x or slug3 in x) or utils.max_string(links) or url) if links else url
 
             uid = str(utils.create_uid(''.join(utils.unique([title, url, *article_keywords]))))
-            source_date = datetime.datetime.utcnow()
-            
-            source_date_str = self.meta.get('date') or\
-                self.meta.get('time') or\
-                self.meta.get('date_published') or\
-                self.meta.get('time_published') or\
-                self.meta.get('date-published') or\
-                self.meta.get('time-published') or\
-                self.meta.get('date_modified') or\
-                self.meta.get('time_modified') or\
-                self.meta.get('date-modified') or\
-                self.meta.get('time-modified') or\
-                self.meta.get('timestamp')
-            source_date_el = el.select_one('time')
+            # the article's own <time> wins over the dates of the page, every
+            # candidate is parsed once and the result reused
+            source_date = None
+            source_date_el = el.time
             if source_date_el:
                 val = source_date_el.get('datetime') or source_date_el.get('unixtime')
-                if val and utils.is_valid_date_string(val):
-                    source_date_str = val
-                else:
-                    val = source_date_el.text
-                    if val and utils.is_valid_date_string(val):
-                        source_date_str = val
-
-            if source_date_str:
-                try:
-                    source_date = dateutil.parser.parse(source_date_str)
-                except Exception as e:
-                    print(f'Failed to parse date: {source_date_str} url={self.url}')
-                    print(e)
-                
-            return crawler_models.CrawlerArticle(
+                source_date = dates.parse_date(val) if val else None
+                if source_date is None and source_date_el.text:
+                    source_date = dates.parse_date(source_date_el.text)
+
+            if source_date is None and self.date:
+                source_date = dates.parse_date(self.date)
+                if source_date is None:
+                    logger.debug('unparsed date %r url=%s', self.date, self.url)
+
+            if source_date is None:
+                source_date = datetime.datetime.utcnow()
+
+            return self.batch.add(crawler_models.CrawlerArticle(
                 uid=uid,
                 name=title,
                 text=text,
@@ -214,8 +216,101 @@ class Page(object):
                 links=links,
                 link=link,
                 source_date = source_date
-            ).upsert()
+            ))
             
 
-        article_elements = list(doc.select('article,div.post,.news-article,.article'))
-        return list(filter(lambda x: x is not None, map(extract_article, article_elements)))
+        return list(filter(lambda x: x is not None, map(extract_article, articles)))
+
+
+class PageResult(object):
+    """
+    What the crawler keeps of a page once it is extracted. The unsaved
+    files, images and articles are only held until flush() writes them,
+    after that the result is down to plain values and the ids of the
+    written documents. fingerprints holds the SimHash of each article,
+    see dedup.fingerprint, when the page was extracted with them.
+    """
+    __slots__ = (
+        'url', 'domain', 'title', 'language', 'keywords', 'links',
+        'files', 'images', 'articles', 'batch',
+        'file_ids', 'image_ids', 'article_ids',
+        'fingerprints', 'duplicates', 'fields', 'timings'
+    )
+    url: str
+    domain: str
+    title: str
+    language: str
+    keywords: typing.Tuple[str, ...]
+    links: typing.List[str]
+    files: typing.List[crawler_models.CrawlerFile]
+    images: typing.List[crawler_models.CrawlerImage]
+    articles: typing.List[crawler_models.CrawlerArticle]
+    batch: crawler_models.UpsertBatch | None
+    file_ids: typing.Tuple[typing.Any, ...]
+    image_ids: typing.Tuple[typing.Any, ...]
+    article_ids: typing.Tuple[typing.Any, ...]
+    fingerprints: typing.Tuple[int | None, ...]
+    duplicates: int
+    fields: typing.Dict[str, typing.Any]
+    timings: typing.Dict[str, float]
+
+    def __init__(self, page: Page, links: typing.List[str]):
+        self.url = page.url
+        self.domain = page.domain
+        self.title = page.title
+        self.language = page.language
+        self.keywords = tuple(page.keywords)
+        self.links = links
+        self.files = page.files
+        self.images = page.images
+        self.articles = page.articles
+        self.batch = page.batch
+        self.file_ids = ()
+        self.image_ids = ()
+        self.article_ids = ()
+        self.fingerprints = ()
+        self.duplicates = 0
+        # validators and crawl history, filled in by the crawler
+        self.fields = {}
+        # seconds spent in each stage, measured where the page was extracted
+        self.timings = {}
+
+    def flush(self, index: NearDuplicateIndex | None = None):
+        # the documents are let go once written
+        if self.batch is None:
+            return
+        # near duplicates of other articles already written are left out of
+        # the batch and the page points at the written article instead. An
+        # article near its own earlier version is an edit and written again
+        canonical = dict()
+        if index is not None:
+            for i, (article, fp) in enumerate(zip(self.articles, self.fingerprints)):
+                id = index.find(fp, article.uid, article.link) if fp is not None else None
+                if id is not None:
+                    canonical[i] = id
+                    self.batch.discard(article)
+        self.batch.flush()
+        self.file_ids = tuple(doc.id for doc in self.files)
+        self.image_ids = tuple(doc.id for doc in self.images)
+        self.article_ids = tuple(dict.fromkeys(canonical.get(i, doc.id) for i, doc in enumerate(self.articles)))
+        if index is not None:
+            for i, (article, fp) in enumerate(zip(self.articles, self.fingerprints)):
+                if fp is not None and i not in canonical and article.id is not None:
+                    index.add(fp, article.id, article.uid, article.link)
+        self.duplicates = len(canonical)
+        self.files, self.images, self.articles, self.batch = [], [], [], None
+
+
+def extract_page(url: str, doc: BeautifulSoup | str | bytes, backend: str = 'bs4', fingerprints: bool = False) -> PageResult:
+    # module level and free of database access so it can run in a worker process,
+    # the result only holds plain values and unsaved documents and pickles cheaply
+    started = time.perf_counter()
+    scan = scan_document(doc, backend)
+    parsed = time.perf_counter()
+    page = Page(url, scan)
+    links = [urllib.parse.urljoin(url, href) for href in scan.links if href]
+    result = PageResult(page, links)
+    if fingerprints:
+        result.fingerprints = tuple(fingerprint(article.text) for article in result.articles)
+    result.timings = dict(parse=parsed - started, extract=time.perf_counter() - parsed)
+    return result
@@ -0,0 +1,141 @@
+import typing
+import threading
+import queue
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, Future
+from pycrawler.crawler import Crawler
+from pycrawler.page import extract_page
+from pycrawler.frontier import Frontier
+from pycrawler.politeness import PolitenessScheduler
+from pycrawler.seen import BloomFilter
+from pycrawler.config import CrawlerConfig
+import pycrawler.metrics as metrics
+
+logger = logging.getLogger(__name__)
+
+STOP = None
+
+
+class Pipeline(object):
+    config: CrawlerConfig
+    frontier: Frontier
+    scheduler: PolitenessScheduler
+    seen: BloomFilter
+    parse_workers: int
+    executor: ProcessPoolExecutor | None
+    results: queue.Queue
+    slots: threading.BoundedSemaphore
+
+    def __init__(
+            self,
+            config: CrawlerConfig,
+            frontier: Frontier,
+            scheduler: PolitenessScheduler,
+            seen: BloomFilter
+    ):
+        self.config = config
+        self.frontier = frontier
+        self.scheduler = scheduler
+        self.seen = seen
+        self.parse_workers = max(1, config.parse_workers or os.cpu_count() or 1)
+        # bounds the pages that are fetched but not yet written
+        self.slots = threading.BoundedSemaphore(self.parse_workers * max(1, config.parse_backlog))
+        self.results = queue.Queue()
+        self.executor = None
+
+    def create_crawler(self) -> Crawler:
+        return Crawler(self.config, self.frontier, self.scheduler, self.seen)
+
+    def submit(self, url: str, text: str, fields: typing.Dict[str, typing.Any], size: int = 0):
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(extract_page, url, text, self.config.parser_backend, self.config.dedup_enabled)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda f: self.results.put((url, f, fields, size)))
+
+    def fetch_worker(self, name: str):
+        crawler = self.create_crawler()
+        while True:
+            url = crawler.pop()
+            if url is None:
+                break
+            submitted = False
+            try:
+                if not crawler.enter_url(url):
+                    continue
+                logger.debug('fetch url=%s', url)
+                fetched = crawler.fetch(url)
+                if fetched is None:
+                    continue
+                result, fields = fetched
+                try:
+                    self.submit(url, result.text, fields, result.size)
+                    submitted = True
+                finally:
+                    if not submitted:
+                        crawler.budget.release(result.size)
+            except Exception as e:
+                metrics.CRAWL_ERRORS.inc()
+                logger.warning('crawl failed url=%s error=%r', url, e)
+            finally:
+                # submitted urls are acknowledged by the writer once persisted
+                if not submitted:
+                    self.frontier.task_done(url)
+        crawler.fetcher.close()
+
+    def write_worker(self):
+        crawler = self.create_crawler()
+        while True:
+            item: typing.Tuple[str, Future, typing.Dict[str, typing.Any], int] | None = self.results.get()
+            if item is STOP:
+                break
+            url, future, fields, size = item
+            try:
+                page = future.result()
+                page.fields = fields
+                crawler.persist(page)
+            except Exception as e:
+                metrics.CRAWL_ERRORS.inc()
+                logger.warning('write failed url=%s error=%r', url, e)
+            finally:
+                self.slots.release()
+                crawler.budget.release(size)
+                self.frontier.task_done(url)
+        crawler.fetcher.close()
+
+    def run(self):
+        writers = [
+            threading.Thread(target=self.write_worker, name=f'writer_{i}', daemon=True)
+            for i in range(max(1, self.config.write_workers))
+        ]
+        fetchers = [
+            threading.Thread(target=self.fetch_worker, args=(f'fetch_{i}',), name=f'fetch_{i}', daemon=True)
+            for i in range(max(1, self.config.num_threads))
+        ]
+
+        with ProcessPoolExecutor(max_workers=self.parse_workers) as executor:
+            self.executor = executor
+            for thread in [*writers, *fetchers]:
+                thread.start()
+            # the frontier only drains once every fetched page went through the writers
+            for thread in fetchers:
+                thread.join()
+        self.executor = None
+
+        for _ in writers:
+            self.results.put(STOP)
+        for thread in writers:
+            thread.join()
+
+
+def crawl_pipeline(
+        config: CrawlerConfig,
+        frontier: Frontier,
+        scheduler: PolitenessScheduler,
+        seen: BloomFilter
+):
+    Pipeline(config, frontier, scheduler, seen).run()
+    logger.info('pipeline crawl finished')
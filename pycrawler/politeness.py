@@ -0,0 +1,265 @@
+import typing
+import threading
+import time
+import urllib.parse
+import urllib.robotparser
+import requests
+from pycrawler.config import CrawlerConfig
+from pycrawler.fetch import DEFAULT_HEADERS, CHUNK_SIZE
+
+MAX_BUCKETS = 65536
+MAX_ROBOTS_ENTRIES = 65536
+# robots.txt is read up to this size, like Google does, the rest is ignored
+MAX_ROBOTS_BYTES = 500 * 1024
+
+
+def robots_text(body: bytes) -> str:
+    # a file cut at the limit loses its last, partial line
+    if len(body) >= MAX_ROBOTS_BYTES:
+        body = body[:MAX_ROBOTS_BYTES]
+        body = body[:body.rfind(b'\n') + 1]
+    return body.decode('utf-8', errors='replace')
+
+
+class TokenBucket(object):
+    rate: float
+    capacity: float
+    tokens: float
+    updated_at: float
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def take(self) -> float:
+        # takes a token, going into debt if there is none, and returns the
+        # number of seconds until the next one is available
+        self.refill(time.monotonic())
+        self.tokens -= 1
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def full(self) -> bool:
+        self.refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+
+class RobotsCache(object):
+    ttl: float
+    error_ttl: float
+    timeout: float
+    user_agent: str
+    entries: typing.Dict[str, typing.Tuple[float, urllib.robotparser.RobotFileParser]]
+    pending: typing.Dict[str, threading.Event]
+    on_load: typing.Callable[[str], None] | None
+
+    def __init__(self, config: CrawlerConfig = CrawlerConfig()):
+        self.ttl = config.robots_ttl
+        self.error_ttl = min(config.robots_ttl, config.robots_error_ttl)
+        self.timeout = config.fetch_timeout
+        self.user_agent = config.robots_user_agent
+        self.entries = dict()
+        self.pending = dict()
+        # called with the host every time its robots.txt was loaded
+        self.on_load = None
+        self.lock = threading.Lock()
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+
+    def parse(self, url: str, status: int | None, text: str) -> typing.Tuple[urllib.robotparser.RobotFileParser, float]:
+        # the rules and their ttl from a robots.txt response, status is None
+        # when it could not be fetched at all
+        parser = urllib.robotparser.RobotFileParser(url)
+        if status is None or status >= 500:
+            # unreachable robots.txt means the whole host is off limits for now
+            parser.disallow_all = True
+            return parser, self.error_ttl
+        if status >= 400:
+            parser.allow_all = True
+            return parser, self.ttl
+
+        parser.parse(text.splitlines())
+        return parser, self.ttl
+
+    def _load(self, scheme: str, host: str) -> typing.Tuple[urllib.robotparser.RobotFileParser, float]:
+        url = f'{scheme}://{host}/robots.txt'
+        body = bytearray()
+        try:
+            with self.session.get(url, timeout=self.timeout, allow_redirects=True, stream=True) as resp:
+                status = resp.status_code
+                if status < 400:
+                    for chunk in resp.iter_content(CHUNK_SIZE):
+                        body.extend(chunk)
+                        if len(body) >= MAX_ROBOTS_BYTES:
+                            break
+        except Exception:
+            return self.parse(url, None, '')
+        return self.parse(url, status, robots_text(bytes(body)))
+
+    def store(self, host: str, parser: urllib.robotparser.RobotFileParser, ttl: float):
+        # get() stores what it loaded here, the async crawler what it fetched itself
+        now = time.monotonic()
+        with self.lock:
+            self.entries[host] = (now + ttl, parser)
+            self._prune(now)
+        if self.on_load is not None:
+            self.on_load(host)
+
+    def fresh(self, url: str) -> bool:
+        entry = self.entries.get(urllib.parse.urlsplit(url).netloc)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def _prune(self, now: float):
+        if len(self.entries) <= MAX_ROBOTS_ENTRIES:
+            return
+        for host in [h for h, (expires, _) in self.entries.items() if expires <= now]:
+            del self.entries[host]
+
+    def get(self, url: str, fetch: bool = True) -> urllib.robotparser.RobotFileParser | None:
+        parts = urllib.parse.urlsplit(url)
+        host = parts.netloc
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(host)
+            if entry and entry[0] > now:
+                return entry[1]
+            if not fetch:
+                return entry[1] if entry else None
+            event = self.pending.get(host)
+            owner = event is None
+            if owner:
+                event = self.pending[host] = threading.Event()
+
+        if not owner:
+            # another worker is already downloading this robots.txt
+            event.wait(self.timeout * 2)
+            with self.lock:
+                entry = self.entries.get(host)
+            return entry[1] if entry else None
+
+        try:
+            parser, ttl = self._load(parts.scheme or 'https', host)
+            self.store(host, parser, ttl)
+            return parser
+        finally:
+            with self.lock:
+                del self.pending[host]
+            event.set()
+
+    def allowed(self, url: str, fetch: bool = True) -> bool:
+        parser = self.get(url, fetch)
+        if parser is None:
+            return True
+        return parser.can_fetch(self.user_agent, url)
+
+    def known(self, host: str) -> bool:
+        # expired entries still tell the crawl delay until they are reloaded
+        return host in self.entries
+
+    def crawl_delay(self, host: str) -> float | None:
+        entry = self.entries.get(host)
+        if not entry:
+            return None
+        parser = entry[1]
+        delay = parser.crawl_delay(self.user_agent)
+        if delay is not None:
+            return float(delay)
+        rate = parser.request_rate(self.user_agent)
+        if rate and rate.requests > 0:
+            return rate.seconds / rate.requests
+        return None
+
+
+class PolitenessScheduler(object):
+    min_interval: float
+    max_interval: float
+    burst: int
+    robots: RobotsCache | None
+    buckets: typing.Dict[str, TokenBucket]
+    provisional: typing.Dict[str, float]
+    reschedule: typing.Callable[[str, float], None]
+
+    def __init__(self, config: CrawlerConfig = CrawlerConfig()):
+        self.min_interval = config.host_min_interval
+        self.max_interval = config.max_crawl_delay
+        self.burst = max(1, config.host_burst)
+        self.robots = RobotsCache(config) if config.robots_enabled else None
+        self.buckets = dict()
+        # hosts handed out before their robots.txt was known, and when
+        self.provisional = dict()
+        # set to Frontier.reschedule of the frontier that calls delay()
+        self.reschedule = lambda host, ready_at: None
+        self.lock = threading.Lock()
+        if self.robots:
+            self.robots.on_load = self.robots_loaded
+
+    def interval(self, host: str) -> float:
+        delay = self.robots.crawl_delay(host) if self.robots else None
+        return max(self.min_interval, min(delay or 0.0, self.max_interval))
+
+    def bucket(self, host: str) -> TokenBucket | None:
+        with self.lock:
+            return self.buckets.get(host)
+
+    def _prune(self):
+        if len(self.buckets) > MAX_BUCKETS:
+            for host in [h for h, b in self.buckets.items() if b.full()]:
+                del self.buckets[host]
+        if len(self.provisional) > MAX_BUCKETS:
+            # hosts whose first url was skipped before robots.txt was loaded
+            now = time.monotonic()
+            for host in [h for h, t in self.provisional.items() if now - t > self.max_interval]:
+                del self.provisional[host]
+
+    def delay(self, host: str) -> float:
+        # called by the Frontier every time it hands out a url of this host
+        if self.robots and not self.robots.known(host):
+            # the Crawl-delay is unknown until robots.txt is loaded, which
+            # happens after this url was handed out. The host rests for the
+            # longest delay honoured, robots_loaded shortens that once the
+            # actual one is known
+            with self.lock:
+                self._prune()
+                self.provisional[host] = time.monotonic()
+            return max(self.min_interval, self.max_interval)
+        interval = self.interval(host)
+        if interval <= 0:
+            return 0.0
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                self._prune()
+                bucket = self.buckets[host] = TokenBucket(1 / interval, self.burst)
+            else:
+                bucket.rate = 1 / interval
+            return bucket.take()
+
+    def robots_loaded(self, host: str):
+        with self.lock:
+            handed_out_at = self.provisional.pop(host, None)
+        if handed_out_at is None:
+            return
+        interval = self.interval(host)
+        rest = 0.0
+        if interval > 0:
+            # the bucket starts out with the token of that url taken, as
+            # take() would have at the time
+            with self.lock:
+                bucket = self.buckets[host] = TokenBucket(1 / interval, self.burst)
+                bucket.tokens -= 1
+                bucket.updated_at = handed_out_at
+                if bucket.tokens < 1:
+                    rest = (1 - bucket.tokens) / bucket.rate
+        self.reschedule(host, handed_out_at + rest)
+
+    def allowed(self, url: str, fetch: bool = True) -> bool:
+        if not self.robots:
+            return True
+        return self.robots.allowed(url, fetch)
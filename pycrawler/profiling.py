@@ -0,0 +1,268 @@
+import typing
+import threading
+import collections
+import tracemalloc
+import logging
+import signal
+import time
+import sys
+import gc
+import os
+from pycrawler.config import CrawlerConfig
+import pycrawler.metrics as metrics
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('cpu', 'memory', 'gc')
+# gc pauses longer than this are logged one by one
+SLOW_GC_SECONDS = 0.1
+
+
+def frame_name(code) -> str:
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+def collapse(root: str, frames: typing.Iterable[str]) -> str:
+    # the folded format of flamegraph.pl, speedscope and friends, ';' separates frames
+    return ';'.join([root, *frames])
+
+
+class StackSampler(object):
+    """
+    Counts the stacks of every thread, sampled by the profiler thread at
+    a fixed interval. The samples are rooted at the thread name, so each
+    worker shows up as its own tower in the flame graph.
+    """
+    counts: typing.Counter[str]
+
+    def __init__(self):
+        self.counts = collections.Counter()
+        self.samples = 0
+
+    def sample(self, skip: int | None = None):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == skip:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame_name(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.counts[collapse(names.get(ident, str(ident)), stack)] += 1
+        self.samples += 1
+
+    def dump(self, path: str) -> int:
+        counts, self.counts = self.counts, collections.Counter()
+        with open(path, 'w') as f:
+            for stack, n in counts.most_common():
+                f.write(f'{stack} {n}\n')
+        return len(counts)
+
+
+class MemoryTracer(object):
+    """
+    tracemalloc snapshots, each written as the allocations alive by
+    traceback in the folded format and as the lines that grew the most
+    since the previous snapshot.
+    """
+    previous: tracemalloc.Snapshot | None
+
+    def __init__(self, frames: int = 8, top: int = 40):
+        self.frames = frames
+        self.top = top
+        self.previous = None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def stop(self):
+        tracemalloc.stop()
+        self.previous = None
+
+    def snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>')
+        ])
+
+    def dump(self, folded_path: str, diff_path: str):
+        snapshot = self.snapshot()
+        with open(folded_path, 'w') as f:
+            for stat in snapshot.statistics('traceback'):
+                # frames run from the oldest to the most recent call
+                frames = [f'{os.path.basename(frame.filename)}:{frame.lineno}' for frame in stat.traceback]
+                f.write(f'{collapse("memory", frames)} {stat.size}\n')
+
+        with open(diff_path, 'w') as f:
+            current, peak = tracemalloc.get_traced_memory()
+            f.write(f'traced {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB\n')
+            if self.previous is not None:
+                for stat in snapshot.compare_to(self.previous, 'lineno')[:self.top]:
+                    f.write(f'{stat}\n')
+        self.previous = snapshot
+
+
+class GcTimer(object):
+    # times every collection through gc.callbacks
+    pauses: typing.Dict[int, typing.List[float]]
+
+    def __init__(self):
+        self.started = None
+        self.lock = threading.Lock()
+        # generation -> [collections, seconds, longest pause]
+        self.pauses = collections.defaultdict(lambda: [0, 0.0, 0.0])
+
+    def callback(self, phase: str, info: typing.Dict[str, int]):
+        # runs in whichever thread triggered the collection, which holds the gil throughout
+        if phase == 'start':
+            self.started = time.perf_counter()
+            return
+        if self.started is None:
+            return
+        seconds, self.started = time.perf_counter() - self.started, None
+        generation = info.get('generation', 0)
+        metrics.GC_SECONDS.observe(seconds)
+        metrics.GC_COLLECTED.inc(info.get('collected', 0), str(generation))
+        with self.lock:
+            entry = self.pauses[generation]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+        if seconds >= SLOW_GC_SECONDS:
+            logger.info('gc pause generation=%d seconds=%.3f collected=%d', generation, seconds, info.get('collected', 0))
+
+    def start(self):
+        if self.callback not in gc.callbacks:
+            gc.callbacks.append(self.callback)
+
+    def stop(self):
+        if self.callback in gc.callbacks:
+            gc.callbacks.remove(self.callback)
+
+    def summary(self) -> str:
+        with self.lock:
+            pauses, self.pauses = self.pauses, collections.defaultdict(lambda: [0, 0.0, 0.0])
+        return ' '.join(
+            f'gen{generation}=count:{n},total:{total:.3f}s,max:{longest:.3f}s'
+            for generation, (n, total, longest) in sorted(pauses.items())
+        ) or 'no collections'
+
+
+class Profiler(threading.Thread):
+    """
+    Runs the profiling modes named in config.profile and writes what they
+    gathered to config.profile_dir every profile_interval seconds:
+    cpu-<time>.folded, memory-<time>.folded and memory-<time>.txt. gc
+    pauses go to the metrics and to the log. The profiler can be switched
+    on and off while the crawl runs, see install_signals.
+    """
+    kinds: typing.Tuple[str, ...]
+
+    def __init__(self, config: CrawlerConfig = CrawlerConfig(), kinds: typing.Iterable[str] | None = None):
+        super().__init__(name='profiler', daemon=True)
+        self.kinds = parse_kinds(config.profile if kinds is None else kinds)
+        self.directory = config.profile_dir
+        self.interval = config.profile_interval
+        self.sample_interval = config.profile_sample_interval
+        self.stopped = threading.Event()
+        self.stacks = StackSampler() if 'cpu' in self.kinds else None
+        self.memory = MemoryTracer(config.profile_memory_frames) if 'memory' in self.kinds else None
+        self.gc = GcTimer() if 'gc' in self.kinds else None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if self.memory:
+            self.memory.start()
+        if self.gc:
+            self.gc.start()
+        logger.info('profiling %s to %s', ','.join(self.kinds), self.directory)
+        super().start()
+
+    def run(self):
+        next_dump = time.monotonic() + self.interval
+        # without cpu sampling the thread only wakes up to dump
+        wait = self.sample_interval if self.stacks else self.interval
+        while not self.stopped.wait(wait):
+            if self.stacks:
+                self.stacks.sample(skip=self.ident)
+            if time.monotonic() >= next_dump:
+                self.dump()
+                next_dump = time.monotonic() + self.interval
+
+    def dump(self):
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        try:
+            if self.stacks:
+                samples = self.stacks.samples
+                stacks = self.stacks.dump(os.path.join(self.directory, f'cpu-{stamp}.folded'))
+                logger.info('profile cpu samples=%d stacks=%d', samples, stacks)
+                self.stacks.samples = 0
+            if self.memory:
+                self.memory.dump(
+                    os.path.join(self.directory, f'memory-{stamp}.folded'),
+                    os.path.join(self.directory, f'memory-{stamp}.txt')
+                )
+            if self.gc:
+                logger.info('profile gc %s', self.gc.summary())
+        except Exception as e:
+            logger.warning('profile dump failed error=%r', e)
+
+    def stop(self):
+        self.stopped.set()
+        if self.is_alive():
+            self.join()
+        self.dump()
+        if self.gc:
+            self.gc.stop()
+        if self.memory:
+            self.memory.stop()
+
+
+def parse_kinds(kinds: str | typing.Iterable[str]) -> typing.Tuple[str, ...]:
+    if isinstance(kinds, str):
+        kinds = kinds.split(',')
+    kinds = tuple(kind.strip() for kind in kinds if kind.strip())
+    unknown = [kind for kind in kinds if kind not in KINDS]
+    if unknown:
+        raise ValueError(f'unknown profiling modes {unknown}, expected any of {KINDS}')
+    return kinds
+
+
+_profiler: Profiler | None = None
+_profiler_lock = threading.Lock()
+
+def start_profiler(config: CrawlerConfig = CrawlerConfig(), kinds: typing.Iterable[str] | None = None) -> Profiler | None:
+    global _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            profiler = Profiler(config, kinds)
+            if not profiler.kinds:
+                return None
+            _profiler = profiler
+            _profiler.start()
+        return _profiler
+
+def stop_profiler():
+    global _profiler
+    with _profiler_lock:
+        profiler, _profiler = _profiler, None
+    if profiler is not None:
+        profiler.stop()
+
+def toggle_profiler(config: CrawlerConfig = CrawlerConfig()):
+    # off when running, otherwise on with config.profile or every mode
+    if _profiler is not None:
+        stop_profiler()
+    else:
+        start_profiler(config, config.profile or KINDS)
+
+def install_signals(config: CrawlerConfig = CrawlerConfig()):
+    # SIGUSR1 switches profiling on and off, SIGUSR2 dumps right away.
+    # Signal handlers can only be set from the main thread
+    if not hasattr(signal, 'SIGUSR1') or threading.current_thread() is not threading.main_thread():
+        return
+    signal.signal(signal.SIGUSR1, lambda signum, frame: threading.Thread(target=toggle_profiler, args=(config,), daemon=True).start())
+    signal.signal(signal.SIGUSR2, lambda signum, frame: _profiler and threading.Thread(target=_profiler.dump, daemon=True).start())
@@ -0,0 +1,110 @@
+import typing
+import math
+from datetime import datetime, timedelta
+from pycrawler.config import CrawlerConfig
+
+# fields of CrawlerWebsite that make up the crawl history of a url
+HISTORY_FIELDS = [
+    'crawl_count',
+    'change_count',
+    'observed_time',
+    'last_crawled_at',
+    'last_changed_at',
+    'change_rate',
+    'next_crawl_at'
+]
+
+
+def estimate_rate(intervals: int, changes: int, observed_time: float) -> float | None:
+    """
+    Changes per second, assuming a page changes as a Poisson process and
+    we only learn whether it changed at least once between two visits
+    (Cho & Garcia-Molina, "Estimating frequency of change"). The 0.5
+    terms keep the estimate finite when every visit saw a change.
+    """
+    if intervals <= 0 or observed_time <= 0:
+        return None
+    changes = min(changes, intervals)
+    interval = observed_time / intervals
+    return -math.log((intervals - changes + 0.5) / (intervals + 0.5)) / interval
+
+
+def rate_of(record: typing.Dict[str, typing.Any] | None, config: CrawlerConfig = CrawlerConfig()) -> float:
+    rate = record.get('change_rate') if record else None
+    # pages that never changed still get a small rate, otherwise they
+    # would drift to max_interval after a couple of visits and stay there
+    floor = 1 / config.revisit_max_interval
+    if rate is None:
+        return 1 / config.revisit_default_interval
+    return max(rate, floor)
+
+
+def freshness_gain(record: typing.Dict[str, typing.Any] | None, now: datetime, config: CrawlerConfig = CrawlerConfig()) -> float:
+    # probability the page changed since it was last crawled, which is
+    # what a crawl right now is expected to bring in
+    last = record.get('last_crawled_at') if record else None
+    if last is None:
+        return 1.0
+    elapsed = max(0.0, (now - last).total_seconds())
+    return 1 - math.exp(-rate_of(record, config) * elapsed)
+
+
+def revisit_interval(rate: float, config: CrawlerConfig = CrawlerConfig()) -> float:
+    # time until the page has changed with probability revisit_target
+    interval = -math.log(1 - config.revisit_target) / rate
+    return min(max(interval, config.revisit_min_interval), config.revisit_max_interval)
+
+
+def is_due(record: typing.Dict[str, typing.Any] | None, now: datetime) -> bool:
+    next_crawl_at = record.get('next_crawl_at') if record else None
+    return next_crawl_at is None or next_crawl_at <= now
+
+
+def observe(
+        record: typing.Dict[str, typing.Any] | None,
+        changed: bool,
+        now: datetime,
+        config: CrawlerConfig = CrawlerConfig()
+) -> typing.Dict[str, typing.Any]:
+    """
+    History fields to store after a successful crawl of a url whose
+    previous history is record (None for a first visit).
+    """
+    record = record or {}
+    last_crawled_at = record.get('last_crawled_at')
+    crawls = record.get('crawl_count') or 0
+    changes = record.get('change_count') or 0
+    observed_time = record.get('observed_time') or 0.0
+    last_changed_at = record.get('last_changed_at')
+
+    if last_crawled_at is None:
+        # first visit, nothing to compare with yet
+        crawls = 0
+        last_changed_at = now
+    else:
+        observed_time += max(0.0, (now - last_crawled_at).total_seconds())
+        if changed:
+            changes += 1
+            last_changed_at = now
+    crawls += 1
+
+    # every crawl after the first one closes an interval
+    rate = estimate_rate(crawls - 1, changes, observed_time)
+    return dict(
+        crawl_count=crawls,
+        change_count=changes,
+        observed_time=observed_time,
+        last_crawled_at=now,
+        last_changed_at=last_changed_at,
+        change_rate=rate,
+        next_crawl_at=now + timedelta(seconds=revisit_interval(rate_of(dict(change_rate=rate), config), config))
+    )
+
+
+def failed(now: datetime, config: CrawlerConfig = CrawlerConfig()) -> typing.Dict[str, typing.Any]:
+    # failed fetches say nothing about change, only push the url back
+    return dict(next_crawl_at=now + timedelta(seconds=config.revisit_retry_interval))
+
+
+def rank(records: typing.List[typing.Dict[str, typing.Any]], now: datetime, config: CrawlerConfig = CrawlerConfig()) -> typing.List[typing.Dict[str, typing.Any]]:
+    return sorted(records, key=lambda record: freshness_gain(record, now, config), reverse=True)
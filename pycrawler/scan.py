@@ -0,0 +1,112 @@
+import typing
+from bs4 import BeautifulSoup
+
+IMAGE_SELECTOR = 'img[src],link[rel="icon"]'
+FILE_SELECTOR = 'a,source'
+ARTICLE_SELECTOR = 'article,div.post,.news-article,.article'
+ARTICLE_TITLE_SELECTOR = 'h1,h2,h3,h4,.subject,.title'
+
+
+class ElementData(object):
+    attrs: typing.Dict[str, typing.Any]
+    text: str | None
+
+    def __init__(self, attrs: typing.Dict[str, typing.Any], text: str | None = None):
+        self.attrs = attrs
+        self.text = text
+
+    def get(self, key: str):
+        return self.attrs.get(key)
+
+
+class ArticleScan(object):
+    title: str | None
+    paragraphs: typing.List[str]
+    items: typing.List[str]
+    images: typing.List[ElementData]
+    hrefs: typing.List[str]
+    time: ElementData | None
+
+    def __init__(self):
+        self.title = None
+        self.paragraphs = []
+        self.items = []
+        self.images = []
+        self.hrefs = []
+        self.time = None
+
+
+class PageScan(object):
+    """
+    Everything Page needs from a parsed document, so the parse tree can be
+    dropped once the scan is done.
+    """
+    meta: typing.Dict[str, str]
+    title: str | None
+    lang: str | None
+    files: typing.List[ElementData]
+    images: typing.List[ElementData]
+    articles: typing.List[ArticleScan]
+    links: typing.List[str]
+
+    def __init__(self):
+        self.meta = dict()
+        self.title = None
+        self.lang = None
+        self.files = []
+        self.images = []
+        self.articles = []
+        self.links = []
+
+
+def scan_soup_article(el: BeautifulSoup) -> ArticleScan:
+    article = ArticleScan()
+    title_tag = el.select_one(ARTICLE_TITLE_SELECTOR)
+    article.title = title_tag.text if title_tag else None
+    article.paragraphs = [p.text for p in el.select('p')]
+    if not article.paragraphs:
+        article.items = [li.text for li in el.select('li')]
+    article.images = [ElementData(img.attrs) for img in el.select(IMAGE_SELECTOR)]
+    article.hrefs = [a.get('href') for a in el.select('a[href]')]
+    time_el = el.select_one('time')
+    if time_el:
+        article.time = ElementData(time_el.attrs, time_el.text)
+    return article
+
+
+def scan_soup(doc: BeautifulSoup) -> PageScan:
+    scan = PageScan()
+    for tag in doc.select('meta'):
+        key = tag.get('property') or tag.get('name') or tag.get('key')
+        value = tag.get('content') or tag.get('value')
+        if key and value:
+            scan.meta[key] = value
+
+    title_el = doc.select_one('title')
+    scan.title = title_el.text if title_el else None
+
+    html = doc.select_one('html')
+    scan.lang = html.get('lang') if html else None
+
+    scan.files = [ElementData(el.attrs) for el in doc.select(FILE_SELECTOR)]
+    scan.images = [ElementData(el.attrs) for el in doc.select(IMAGE_SELECTOR)]
+    scan.articles = [scan_soup_article(el) for el in doc.select(ARTICLE_SELECTOR)]
+    scan.links = [a.get('href') for a in doc.select('a[href]')]
+    return scan
+
+
+def scan_document(doc: BeautifulSoup | PageScan | str | bytes, backend: str = 'bs4') -> PageScan:
+    if isinstance(doc, PageScan):
+        return doc
+    if isinstance(doc, BeautifulSoup):
+        return scan_soup(doc)
+    if backend == 'lxml':
+        from pycrawler.fastscan import scan_html
+        return scan_html(doc)
+    soup = BeautifulSoup(doc, 'html.parser')
+    try:
+        return scan_soup(soup)
+    finally:
+        # the tree is full of parent and sibling cycles, taken apart here
+        # it is freed right away instead of at the next full gc
+        soup.decompose()
@@ -0,0 +1,133 @@
+import typing
+import hashlib
+import struct
+import threading
+import math
+import mmap
+import os
+
+MAGIC = b'PYCBLOOM'
+HEADER = struct.Struct('<8sQQQ')
+
+
+def optimal_size(capacity: int, error_rate: float) -> typing.Tuple[int, int]:
+    capacity = max(1, capacity)
+    num_bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+    num_bits = max(64, (num_bits + 7) // 8 * 8)
+    num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+    return num_bits, num_hashes
+
+
+class BloomFilter(object):
+    num_bits: int
+    num_hashes: int
+    count: int
+    path: str | None
+
+    def __init__(self, capacity: int = 10_000_000, error_rate: float = 0.001, path: str | None = None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = None
+        self.mmap = None
+
+        if path and os.path.exists(path) and os.path.getsize(path) > HEADER.size:
+            self._open(path)
+            return
+
+        self.num_bits, self.num_hashes = optimal_size(capacity, error_rate)
+        self.count = 0
+        num_bytes = self.num_bits // 8
+
+        if path:
+            with open(path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, self.num_bits, self.num_hashes, 0))
+                f.truncate(HEADER.size + num_bytes)
+            self._open(path)
+        else:
+            self.bits = bytearray(num_bytes)
+
+    def _open(self, path: str):
+        self.file = open(path, 'r+b')
+        self.mmap = mmap.mmap(self.file.fileno(), 0)
+        magic, self.num_bits, self.num_hashes, self.count = HEADER.unpack_from(self.mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a bloom filter file')
+        if len(self.mmap) < HEADER.size + self.num_bits // 8:
+            raise ValueError(f'{path} is truncated')
+        self.bits = memoryview(self.mmap)[HEADER.size:HEADER.size + self.num_bits // 8]
+
+    def _positions(self, value: str) -> typing.List[int]:
+        digest = hashlib.blake2b(value.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        m = self.num_bits
+        return [(h1 + i * h2) % m for i in range(self.num_hashes)]
+
+    def __contains__(self, value: str) -> bool:
+        bits = self.bits
+        for pos in self._positions(value):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, value: str) -> bool:
+        # returns False when the value was (probably) already present
+        positions = self._positions(value)
+        with self.lock:
+            bits = self.bits
+            added = False
+            for pos in positions:
+                byte = pos >> 3
+                mask = 1 << (pos & 7)
+                if not bits[byte] & mask:
+                    bits[byte] |= mask
+                    added = True
+            if added:
+                self.count += 1
+            return added
+
+    def to_bytes(self) -> bytes:
+        # header and bits in the on-disk layout, a consistent copy of the filter
+        with self.lock:
+            return HEADER.pack(MAGIC, self.num_bits, self.num_hashes, self.count) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, path: str | None = None) -> 'BloomFilter':
+        magic, num_bits, num_hashes, count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or len(data) < HEADER.size + num_bits // 8:
+            raise ValueError('not a bloom filter')
+        if path:
+            with open(path, 'wb') as f:
+                f.write(data)
+            return cls(path=path)
+        bloom = cls.__new__(cls)
+        bloom.path = None
+        bloom.lock = threading.Lock()
+        bloom.file = None
+        bloom.mmap = None
+        bloom.num_bits, bloom.num_hashes, bloom.count = num_bits, num_hashes, count
+        bloom.bits = bytearray(data[HEADER.size:HEADER.size + num_bits // 8])
+        return bloom
+
+    def size_bytes(self) -> int:
+        return self.num_bits // 8
+
+    def flush(self):
+        if self.mmap is None:
+            return
+        with self.lock:
+            HEADER.pack_into(self.mmap, 0, MAGIC, self.num_bits, self.num_hashes, self.count)
+            self.mmap.flush()
+
+    def close(self):
+        if self.mmap is None:
+            return
+        self.flush()
+        self.bits.release()
+        self.mmap.close()
+        self.file.close()
+        self.mmap = None
+        self.file = None
@@ -0,0 +1,120 @@
+import typing
+import urllib.parse
+import re
+import pycrawler.utils as utils
+
+SKIPPED_KEYWORDS = ['javascript:', 'mailto:', 'tel:']
+
+SKIPPED_EXTENSIONS = frozenset([
+    *utils.FILE_EXTENSIONS,
+    '.js',
+    '.css',
+    '.map',
+    '.svg',
+    '.ico',
+    '.gif',
+    '.bmp',
+    '.png',
+    '.jpg',
+    '.jpeg'
+])
+
+TRACKING_PARAMS = frozenset([
+    'fbclid',
+    'gclid',
+    'dclid',
+    'msclkid',
+    'yclid',
+    'igshid',
+    'mc_cid',
+    'mc_eid',
+    '_ga',
+    '_hsenc',
+    '_hsmi',
+    'ref_src'
+])
+
+# (?i) and the like apply to a whole pattern and cannot be part of an alternation
+GLOBAL_FLAGS = re.compile(r'\(\?[aiLmsux]+\)')
+
+DEFAULT_PORTS = {
+    'http': ':80',
+    'https': ':443'
+}
+
+
+def url_host(url: str) -> str:
+    # host of a url produced by UrlFilter.filter, without parsing it again
+    _, _, rest = url.partition('://')
+    return rest.partition('/')[0]
+
+
+def is_tracking_param(key: str) -> bool:
+    low = key.lower()
+    return low.startswith('utm_') or low in TRACKING_PARAMS
+
+
+class UrlFilter(object):
+    pattern: typing.Pattern
+    flagged: typing.List[typing.Pattern]
+
+    def __init__(self, blacklist: typing.List[str] = []):
+        # blacklist entries keep their re.match semantics, the skipped
+        # keywords may appear anywhere in the url. Entries with global
+        # inline flags are matched on their own
+        alternatives = []
+        self.flagged = []
+        for black in blacklist:
+            try:
+                compiled = re.compile(black)
+            except re.error as e:
+                raise ValueError(f'blacklist pattern {black!r} is not a valid regular expression: {e}') from e
+            if GLOBAL_FLAGS.match(black):
+                self.flagged.append(compiled)
+            else:
+                alternatives.append(f'(?:{black})')
+        alternatives.append('(?s:.*?)(?:' + '|'.join(map(re.escape, SKIPPED_KEYWORDS)) + ')')
+        self.pattern = re.compile('|'.join(alternatives))
+
+    def blocked(self, url: str) -> bool:
+        return self.pattern.match(url) is not None or any(p.match(url) for p in self.flagged)
+
+    def canonicalize(self, parts: urllib.parse.SplitResult) -> str:
+        scheme = parts.scheme.lower()
+        netloc = parts.netloc.lower()
+        port = DEFAULT_PORTS.get(scheme)
+        if port and netloc.endswith(port):
+            netloc = netloc[:-len(port)]
+        path = parts.path or '/'
+        query = parts.query
+        if query:
+            params = [p for p in query.split('&') if p and not is_tracking_param(urllib.parse.unquote_plus(p.partition('=')[0]))]
+            params.sort()
+            query = '&'.join(params)
+        return urllib.parse.urlunsplit((scheme, netloc, path, query, ''))
+
+    def filter(self, url: str) -> str | None:
+        """
+        Returns the canonical form of url (lowercase host, no fragment,
+        sorted query without tracking parameters), or None when it
+        should not be crawled.
+        """
+        if len(url) <= 8 or self.blocked(url):
+            return None
+        # the blacklist is also matched without the query, so patterns
+        # anchored at the end of the path see it
+        if '?' in url and self.blocked(utils.url_remove_query(url)):
+            return None
+        try:
+            parts = urllib.parse.urlsplit(url.strip())
+        except ValueError:
+            return None
+        if parts.scheme.lower() not in DEFAULT_PORTS or not parts.netloc:
+            return None
+
+        _, _, filename = parts.path.rpartition('/')
+        dot = filename.rfind('.')
+        if dot > 0 and filename[dot:].lower() in SKIPPED_EXTENSIONS:
+            return None
+
+        return self.canonicalize(parts)
@@ -4,13 +4,16 @@ import uuid
 import re
 import os
 import typing
-import json
-import dateutil
+import logging
 
 from pycrawler.languages import TOP_DOMAIN_TO_LANGUAGE
+import pycrawler.keywords as keywords
+import pycrawler.dates as dates
 
-STOPWORDS_FNAME = os.path.join(os.path.realpath(os.path.dirname(__file__)), './data/stopwords.json')
-STOP_WORDS = json.loads(open(STOPWORDS_FNAME).read())
+logger = logging.getLogger(__name__)
+
+STOPWORDS_FNAME = keywords.STOPWORDS_FNAME
+STOP_WORDS = keywords.stopwords()
 
 def is_stopword(word: str) -> bool:
     lower = word.lower()
@@ -26,7 +29,7 @@ def url_get_domain(url: str) -> str:
     try:
         return urllib.parse.urlparse(url).netloc
     except Exception as e:
-        print(e)
+        logger.debug('bad url=%r error=%r', url, e)
         return url
 
 def url_get_filename(url: str) -> str | None:
@@ -63,12 +66,13 @@ def base64_encode(value: str) -> str:
     try:
         return base64.b64encode(enc).decode()
     except Exception as e:
-        print(e)
+        logger.debug('base64 failed error=%r', e)
         return value
 
 
 def unique(items):
-    return list(set(items))
+    # keeps the order of first appearance
+    return list(dict.fromkeys(items))
 
 
 def chunkify(items, chunk_size=2):
@@ -188,21 +192,13 @@ KEYWORD_SEPARATORS = [
 ]
 
 def cleanup_string(value: str) -> str:
-    return re.sub('”|·|\n|\r|\t|:|\?|~|!|@|#|\$|%|\^|\&|\*|\(|\)|/|<|>|—|–|-|_|\+|-|\{|\}|\,|\.|\'|\"', '', value)
+    return value.translate(keywords.DELETE_TABLE)
 
 def normalize_string(value: str) -> str:
-    return cleanup_string(value.lower())
+    return keywords.normalize(value)
 
-def keywordify(words: typing.List[str] | str) -> typing.List[str]:
-    if type(words) == str:
-        if words in ['', '.', ' ']:
-            return []
-        for sep in KEYWORD_SEPARATORS:
-            if sep in words:
-                parts = unique(list(filter(lambda x: len(x) > 0 and x != '', words.split(sep))))
-                return flatten(keywordify(parts)) 
-        return [normalize_string(words)]
-    return unique(list(filter(lambda x: len(x) > 0 and x != '' and x != '.' and x != ' ' and not is_stopword(x), map(normalize_string, flatten(list(map(keywordify, words)))))))
+def keywordify(words: typing.List[str] | str, language: str | None = None) -> typing.List[str]:
+    return keywords.keywordify(words, language)
 
 
 def slugify(value: str, separator: str = '-') -> str:
@@ -224,8 +220,4 @@ def find(values, fun):
     return None
 
 def is_valid_date_string(date: str) -> bool:
-    try:
-        dateutil.parser.parse(date)
-        return True
-    except:
-        return False
+    return dates.is_date(date)
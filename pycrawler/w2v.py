@@ -1,61 +1,132 @@
 import json
 import os
 import typing
+import threading
+import collections
+import argparse
+import numpy as np
 import pycrawler.utils as utils
 import uuid
 
-FNAME = os.path.join(os.path.realpath(os.path.dirname(__file__)), '../data/vectors.json')
-vectors = None 
+DATA_DIR = os.path.join(os.path.realpath(os.path.dirname(__file__)), '../data')
+# source vectors, {token: [float, ...]}
+FNAME = os.path.join(DATA_DIR, 'vectors.json')
+# float32 matrix, one row per token, memory mapped read-only so every
+# process on the machine shares the same pages
+MATRIX_FNAME = os.path.join(DATA_DIR, 'vectors.npy')
+# one token per line, line i is row i of the matrix
+VOCAB_FNAME = os.path.join(DATA_DIR, 'vectors.vocab')
 
-def average(vecs):
-    comp = len(vecs[0])
-    results = list(map(lambda x: 0, range(comp)))
-    for vec in vecs:
-        for i, x in enumerate(vec):
-            results[i] += x
-    for i, x in enumerate(results):
-        results[i] = x / len(vecs)
-    return results
 
-def get_vec(value: str) -> typing.List[float]:
-    if not vectors:
-        vectors = json.loads(open(FNAME).read()) 
-    
-    vec = vectors.get(value)
-    if vec and len(vec) > 1:
-        return vec
-    vec = vectors.get(value.lower())
-    if vec and len(vec) > 1:
-        return vec
-    vec = vectors.get(value.title())
-    if vec and len(vec) > 1:
-        return vec
-    vec = vectors.get(value.upper())
-    if vec and len(vec) > 1:
-        return vec
-    return []
+class VectorStore(object):
+    matrix: np.ndarray
+    vocab: typing.Dict[str, int]
 
-def word2vec(value: str) -> typing.List[float]:
-    vec = get_vec(value)
-    if vec and len(vec) > 0:
-        return vec
+    def __init__(self, matrix: np.ndarray, vocab: typing.Dict[str, int]):
+        self.matrix = matrix
+        self.vocab = vocab
 
-    if ' ' in value:
-        words = value.split(' ')
-        vecs = list(filter(lambda x: x is not None and len(x) > 0, list(map(lambda x: get_vec(x), words))))
-        if len(vecs) > 0:
-            return average(vecs)
+    @staticmethod
+    def load(matrix_path: str = MATRIX_FNAME, vocab_path: str = VOCAB_FNAME) -> 'VectorStore':
+        matrix = np.load(matrix_path, mmap_mode='r')
+        with open(vocab_path, encoding='utf-8', newline='\n') as f:
+            vocab = {line.rstrip('\n'): i for i, line in enumerate(f)}
+        return VectorStore(matrix, vocab)
+
+    def index(self, value: str) -> int | None:
+        vocab = self.vocab
+        for key in (value, value.lower(), value.title(), value.upper()):
+            i = vocab.get(key)
+            if i is not None:
+                return i
+        return None
+
+    def lookup(self, values: typing.Iterable[str]) -> np.ndarray:
+        # rows of the values that have a vector, in one fancy-indexing read
+        rows = [i for i in map(self.index, values) if i is not None]
+        return self.matrix[rows]
+
+    def average(self, values: typing.Iterable[str]) -> np.ndarray | None:
+        rows = self.lookup(values)
+        if len(rows) == 0:
+            return None
+        return rows.mean(axis=0, dtype=np.float64)
 
-    pairs = utils.chunkify(value)
 
-    vecs = list(filter(lambda x: x is not None and len(x) > 0, list(map(lambda x: get_vec(x), pairs))))
+_store: VectorStore | None = None
+_store_lock = threading.Lock()
 
-    if len(vecs) <= 0:
+def get_store() -> VectorStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = VectorStore.load()
+    return _store
+
+def average(vecs) -> typing.List[float]:
+    return np.asarray(vecs, dtype=np.float64).mean(axis=0).tolist()
+
+def get_vec(value: str) -> typing.List[float]:
+    store = get_store()
+    i = store.index(value)
+    if i is None:
         return []
+    return store.matrix[i].tolist()
+
+def word2vec(value: str) -> typing.List[float]:
+    store = get_store()
+    i = store.index(value)
+    if i is not None:
+        return store.matrix[i].tolist()
 
-    return average(vecs)
+    if ' ' in value:
+        vec = store.average(value.split(' '))
+        if vec is not None:
+            return vec.tolist()
+
+    vec = store.average(utils.chunkify(value))
+    if vec is None:
+        return []
+    return vec.tolist()
 
 
 def word2vec_with_id(value: str) -> typing.Tuple[uuid.UUID, typing.List[float]]:
     vec_id = utils.create_uid(value)
     return [vec_id, word2vec(value)]
+
+
+def convert(src: str = FNAME, matrix_path: str = MATRIX_FNAME, vocab_path: str = VOCAB_FNAME) -> typing.Tuple[int, int]:
+    with open(src, encoding='utf-8') as f:
+        vectors: typing.Dict[str, typing.List[float]] = json.load(f)
+
+    # get_vec never returned vectors of length 0 or 1, and the rows of a
+    # matrix need one shared dimension
+    dims = collections.Counter(len(vec) for vec in vectors.values() if vec and len(vec) > 1)
+    if not dims:
+        raise ValueError(f'{src} has no vectors')
+    dim = dims.most_common(1)[0][0]
+    tokens = [token for token, vec in vectors.items() if vec and len(vec) == dim and '\n' not in token]
+
+    matrix = np.lib.format.open_memmap(matrix_path, mode='w+', dtype=np.float32, shape=(len(tokens), dim))
+    for i, token in enumerate(tokens):
+        matrix[i] = vectors[token]
+    matrix.flush()
+    del matrix
+
+    with open(vocab_path, 'w', encoding='utf-8', newline='\n') as f:
+        for token in tokens:
+            f.write(token)
+            f.write('\n')
+    return len(tokens), dim
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert vectors.json to the memory mapped vector store')
+    parser.add_argument('src', type=str, nargs='?', help="JSON file of {token: vector}", default=FNAME)
+    parser.add_argument('--matrix', type=str, help="Output .npy file", default=MATRIX_FNAME)
+    parser.add_argument('--vocab', type=str, help="Output vocabulary file", default=VOCAB_FNAME)
+    args = parser.parse_args()
+
+    count, dim = convert(args.src, args.matrix, args.vocab)
+    print(f'{count} vectors of {dim} dimensions -> {args.matrix}, {args.vocab}')
@@ -0,0 +1,358 @@
+import typing
+import threading
+import queue
+import datetime
+import hashlib
+import base64
+import logging
+import http
+import uuid
+import zlib
+import time
+import glob
+import os
+from pycrawler.config import CrawlerConfig
+from pycrawler.fetch import FetchResult, create_result
+import pycrawler.metrics as metrics
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'gzip': '.warc.gz', 'zstd': '.warc.zst', 'none': '.warc'}
+# one index per worker process, they can share a directory
+INDEX_FILENAME = 'index-{worker_index}.cdx'
+# original url, date, status, payload digest, record length, record offset, file
+INDEX_HEADER = ' CDX a b s k S V g\n'
+# bodies are stored decoded, these headers described the bytes on the wire
+# and are kept under another name
+REWRITTEN_HEADERS = frozenset(['content-encoding', 'transfer-encoding', 'content-length'])
+REWRITTEN_PREFIX = 'X-Archive-Orig-'
+# index lines are written once the records they point at are flushed
+FLUSH_RECORDS = 256
+
+STOP = None
+
+
+class Codec(object):
+    # one compressed member per record, so a record can be read on its own
+    def compress(self, data: bytes) -> bytes:
+        return data
+
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+
+class GzipCodec(Codec):
+    def __init__(self, level: int = 6):
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompressobj(31).decompress(data)
+
+
+class ZstdCodec(Codec):
+    def __init__(self, level: int = 3):
+        import zstandard
+        self.compressor = zstandard.ZstdCompressor(level=level)
+        self.decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self.decompressor.decompress(data)
+
+
+def create_codec(compression: str) -> Codec:
+    if compression == 'gzip':
+        return GzipCodec()
+    if compression == 'zstd':
+        try:
+            return ZstdCodec()
+        except ImportError:
+            raise ValueError('zstd compression needs the zstandard package') from None
+    if compression == 'none':
+        return Codec()
+    raise ValueError(f'unknown warc compression {compression!r}, expected any of {list(EXTENSIONS)}')
+
+
+def encode_header(value: str) -> bytes:
+    # header values were decoded as latin-1 by requests and as utf-8 by aiohttp
+    try:
+        return value.encode('latin-1')
+    except UnicodeEncodeError:
+        return value.encode('utf-8', 'replace')
+
+
+def header_block(lines: typing.List[str]) -> bytes:
+    return b'\r\n'.join(map(encode_header, lines)) + b'\r\n\r\n'
+
+
+def warc_date(date: datetime.datetime) -> str:
+    return date.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def payload_digest(body: bytes) -> str:
+    return 'sha1:' + base64.b32encode(hashlib.sha1(body).digest()).decode('ascii')
+
+
+def http_block(status: int, headers: typing.Mapping[str, str], body: bytes) -> bytes:
+    try:
+        phrase = http.HTTPStatus(status).phrase
+    except ValueError:
+        phrase = ''
+    lines = [f'HTTP/1.1 {status} {phrase}'.rstrip()]
+    for name, value in headers.items():
+        if name.lower() in REWRITTEN_HEADERS:
+            name = REWRITTEN_PREFIX + name
+        lines.append(f'{name}: {value}')
+    lines.append(f'Content-Length: {len(body)}')
+    return header_block(lines) + body
+
+
+def warc_record(warc_type: str, fields: typing.List[typing.Tuple[str, str]], content_type: str, block: bytes) -> bytes:
+    lines = [
+        'WARC/1.1',
+        f'WARC-Type: {warc_type}',
+        f'WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>',
+        *(f'{name}: {value}' for name, value in fields),
+        f'Content-Type: {content_type}',
+        f'Content-Length: {len(block)}'
+    ]
+    return header_block(lines) + block + b'\r\n\r\n'
+
+
+def response_record(url: str, status: int, headers: typing.Mapping[str, str], body: bytes, date: datetime.datetime, digest: str) -> bytes:
+    return warc_record('response', [
+        ('WARC-Date', warc_date(date)),
+        ('WARC-Target-URI', url),
+        ('WARC-Payload-Digest', digest)
+    ], 'application/http;msgtype=response', http_block(status, headers, body))
+
+
+def warcinfo_record(filename: str, date: datetime.datetime) -> bytes:
+    return warc_record('warcinfo', [
+        ('WARC-Date', warc_date(date)),
+        ('WARC-Filename', filename)
+    ], 'application/warc-fields', b'software: pycrawler\r\nformat: WARC File Format 1.1\r\n')
+
+
+class IndexEntry(object):
+    url: str
+    timestamp: str
+    status: int
+    digest: str
+    length: int
+    offset: int
+    filename: str
+
+    def __init__(self, url: str, timestamp: str, status: int, digest: str, length: int, offset: int, filename: str):
+        self.url = url
+        self.timestamp = timestamp
+        self.status = status
+        self.digest = digest
+        self.length = length
+        self.offset = offset
+        self.filename = filename
+
+    def line(self) -> str:
+        # fields are space separated, a space in the url is written as %20
+        return f'{self.url.replace(" ", "%20")} {self.timestamp} {self.status} {self.digest} {self.length} {self.offset} {self.filename}\n'
+
+    @classmethod
+    def parse(cls, line: str) -> 'IndexEntry':
+        # split from the right, so lines with a space left in the url still parse
+        url, timestamp, status, digest, length, offset, filename = line.rsplit(' ', 6)
+        return cls(url, timestamp, int(status), digest, int(length), int(offset), filename.rstrip('\n'))
+
+
+class WarcWriter(threading.Thread):
+    """
+    Archives fetched responses, headers and decoded body, as WARC response
+    records. submit() only queues the result, the records are built,
+    compressed and written by this thread into files under directory that
+    are rotated at max_bytes. Every record is appended to the index with
+    the file and offset it can be read back from, see read_response.
+    Responses past queue_bytes are dropped, so a slow disk never slows
+    down fetching.
+    """
+    directory: str
+    max_bytes: int
+    queue_bytes: int
+    queued_bytes: int
+    codec: Codec
+    file: typing.BinaryIO | None
+    filename: str | None
+
+    def __init__(self, config: CrawlerConfig = CrawlerConfig()):
+        super().__init__(name='warc', daemon=True)
+        self.directory = config.warc_dir
+        self.compression = config.warc_compression
+        self.codec = create_codec(config.warc_compression)
+        self.max_bytes = config.warc_max_bytes
+        self.queue_bytes = config.warc_queue_bytes
+        self.worker_index = config.worker_index
+        self.queue = queue.Queue()
+        self.queued_bytes = 0
+        self.lock = threading.Lock()
+        self.file = None
+        self.filename = None
+        self.serial = 0
+        self.pending = []
+        os.makedirs(self.directory, exist_ok=True)
+        index_path = os.path.join(self.directory, INDEX_FILENAME.format(worker_index=self.worker_index))
+        self.index = open(index_path, 'a', encoding='utf-8')
+        if self.index.tell() == 0:
+            self.index.write(INDEX_HEADER)
+
+    def submit(self, result: FetchResult) -> bool:
+        if result.body is None or result.status is None:
+            return False
+        size = len(result.body)
+        with self.lock:
+            if self.queued_bytes + size > self.queue_bytes > 0:
+                metrics.WARC_DROPPED.inc()
+                return False
+            self.queued_bytes += size
+        self.queue.put((result.url, result.status, result.headers, result.body, datetime.datetime.now(datetime.timezone.utc)))
+        return True
+
+    def queued(self) -> int:
+        return self.queued_bytes
+
+    def open_file(self, date: datetime.datetime):
+        self.close_file()
+        self.serial += 1
+        self.filename = f'pycrawler-{date.strftime("%Y%m%d%H%M%S")}-{self.serial:05d}-{self.worker_index}{EXTENSIONS[self.compression]}'
+        self.file = open(os.path.join(self.directory, self.filename), 'xb')
+        self.file.write(self.codec.compress(warcinfo_record(self.filename, date)))
+        logger.info('warc file %s', self.filename)
+
+    def close_file(self):
+        if self.file is None:
+            return
+        self.flush()
+        self.file.close()
+        self.file = None
+
+    def flush(self):
+        # the records go to disk before the index lines pointing at them
+        if self.file is not None:
+            self.file.flush()
+        if self.pending:
+            self.index.writelines(entry.line() for entry in self.pending)
+            self.index.flush()
+            self.pending = []
+
+    def write(self, url: str, status: int, headers: typing.Mapping[str, str], body: bytes, date: datetime.datetime):
+        if self.file is None or self.file.tell() >= self.max_bytes:
+            self.open_file(date)
+        digest = payload_digest(body)
+        data = self.codec.compress(response_record(url, status, headers, body, date, digest))
+        offset = self.file.tell()
+        self.file.write(data)
+        self.pending.append(IndexEntry(url, date.strftime('%Y%m%d%H%M%S'), status, digest, len(data), offset, self.filename))
+        metrics.WARC_RECORDS.inc()
+        metrics.WARC_BYTES.inc(len(data))
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is STOP:
+                break
+            url, status, headers, body, date = item
+            try:
+                with metrics.WARC_SECONDS.time():
+                    self.write(url, status, headers, body, date)
+                if len(self.pending) >= FLUSH_RECORDS or self.queue.empty():
+                    self.flush()
+            except Exception as e:
+                logger.warning('warc write failed url=%s error=%r', url, e)
+            finally:
+                with self.lock:
+                    self.queued_bytes -= len(body)
+        self.close_file()
+        self.index.close()
+
+    def stop(self):
+        # everything submitted before is written
+        self.queue.put(STOP)
+        self.join()
+
+
+def read_index(directory: str) -> typing.Iterator[IndexEntry]:
+    for path in sorted(glob.glob(os.path.join(directory, INDEX_FILENAME.format(worker_index='*')))):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip() and not line.startswith(' CDX'):
+                    yield IndexEntry.parse(line)
+
+
+def codec_of(filename: str) -> Codec:
+    for compression, extension in EXTENSIONS.items():
+        if filename.endswith(extension):
+            return create_codec(compression)
+    raise ValueError(f'{filename} is not a warc file')
+
+
+def read_record(directory: str, entry: IndexEntry, codec: Codec | None = None) -> typing.Tuple[typing.Dict[str, str], bytes]:
+    # WARC headers and the block of the record entry points at
+    with open(os.path.join(directory, entry.filename), 'rb') as f:
+        f.seek(entry.offset)
+        data = (codec or codec_of(entry.filename)).decompress(f.read(entry.length))
+    head, _, rest = data.partition(b'\r\n\r\n')
+    lines = head.decode('utf-8', 'replace').split('\r\n')
+    fields = dict(line.split(': ', 1) for line in lines[1:] if ': ' in line)
+    return fields, rest[:int(fields.get('Content-Length', len(rest)))]
+
+
+def read_response(directory: str, entry: IndexEntry, codec: Codec | None = None) -> FetchResult:
+    """
+    The archived response as a FetchResult, as if it was fetched again,
+    to run the extraction of a crawl over its archive.
+    """
+    fields, block = read_record(directory, entry, codec)
+    head, _, body = block.partition(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    headers = dict(line.split(': ', 1) for line in lines[1:] if ': ' in line)
+    headers.pop('Content-Length', None)
+    headers = {name[len(REWRITTEN_PREFIX):] if name.startswith(REWRITTEN_PREFIX) else name: value for name, value in headers.items()}
+    return create_result(fields.get('WARC-Target-URI', entry.url), status, headers, body)
+
+
+def iter_responses(directory: str) -> typing.Iterator[FetchResult]:
+    codecs = dict()
+    for entry in read_index(directory):
+        codec = codecs.get(entry.filename)
+        if codec is None:
+            codec = codecs[entry.filename] = codec_of(entry.filename)
+        yield read_response(directory, entry, codec)
+
+
+_writer: WarcWriter | None = None
+_writer_lock = threading.Lock()
+
+def get_warc_writer(config: CrawlerConfig = CrawlerConfig()) -> WarcWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = WarcWriter(config)
+            _writer.start()
+        return _writer
+
+def warc_queue_bytes() -> int:
+    writer = _writer
+    return writer.queued() if writer is not None else 0
+
+def close_warc_writer():
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        started = time.monotonic()
+        writer.stop()
+        logger.info('warc writer stopped seconds=%.2f', time.monotonic() - started)
@@ -0,0 +1,41 @@
+import pytest
+import mongoengine
+import mongomock
+from pymongo.errors import BulkWriteError, OperationFailure
+
+
+class BulkResult(object):
+    def __init__(self, upserted_ids):
+        self.upserted_ids = upserted_ids
+
+
+def bulk_write(self, requests, ordered: bool = True, **kwargs) -> BulkResult:
+    # mongomock's bulk_write passes arguments newer pymongo versions added
+    # to their bulk builder and fails, the crawler only sends UpdateOne.
+    # Failed writes are reported in a BulkWriteError, as pymongo does
+    upserted = dict()
+    errors = []
+    for index, op in enumerate(requests):
+        try:
+            result = self.update_one(op._filter, op._doc, upsert=op._upsert)
+        except OperationFailure as e:
+            errors.append(dict(index=index, code=e.code, errmsg=str(e)))
+            if ordered:
+                break
+            continue
+        if result.upserted_id is not None:
+            upserted[index] = result.upserted_id
+    if errors:
+        raise BulkWriteError(dict(writeErrors=errors, upserted=[dict(index=k, _id=v) for k, v in upserted.items()]))
+    return BulkResult(upserted)
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    # in-process mongomock database as the default connection
+    monkeypatch.setattr(mongomock.collection.Collection, 'bulk_write', bulk_write)
+    mongoengine.disconnect()
+    mongoengine.connect('pycrawler_test', host='mongodb://localhost', mongo_client_class=mongomock.MongoClient)
+    yield mongoengine.get_db()
+    mongoengine.get_db().client.drop_database(mongoengine.get_db().name)
+    mongoengine.disconnect()
@@ -0,0 +1,37 @@
+import mongoengine
+import pytest
+from benchmarks.server import LocalWeb
+from pycrawler.config import CrawlerConfig
+from pycrawler.crawler import crawl
+from pycrawler.models import CrawlerWebsite, CrawlerArticle
+import pycrawler.crawler as crawler_module
+import pycrawler.metrics as metrics
+
+
+def test_crawl_async_writes_the_local_web(mongo, monkeypatch):
+    # crawl() would connect to config.mongo_url, the mongomock fixture is kept
+    monkeypatch.setattr(crawler_module, 'connect_db', lambda host=None: mongoengine.get_connection())
+    # stats_interval=0 turns the summary off, the reporter would spin
+    monkeypatch.setattr(metrics.Reporter, 'start', lambda self: pytest.fail('reporter started'))
+    pages = metrics.PAGES.total()
+    errors = metrics.CRAWL_ERRORS.total()
+
+    with LocalWeb(3, pages=5, latency=0, error_rate=0, reset_rate=0) as web:
+        config = CrawlerConfig(
+            mode='async',
+            max_concurrency=16,
+            host_min_interval=0,
+            fetch_timeout=2,
+            revisit_refill_interval=0,
+            stats_interval=0
+        )
+        crawl(web.seeds(3), config)
+        hosts = web.hosts
+
+    # corpus pages also link to made up paths, every host is crawled to its cap
+    written = CrawlerWebsite.objects.count()
+    assert written == len(hosts) * crawler_module.MAX_DOMAIN_VISITS
+    assert metrics.PAGES.total() - pages == written
+    assert metrics.CRAWL_ERRORS.total() == errors
+    assert {page.domain for page in CrawlerWebsite.objects} == set(hosts)
+    assert CrawlerArticle.objects.count() > 0
@@ -0,0 +1,56 @@
+import struct
+import pytest
+from pycrawler.frontier import Frontier
+from pycrawler.seen import BloomFilter
+from pycrawler.checkpoint import Checkpoint
+
+
+def test_in_flight_urls_are_checkpointed(tmp_path):
+    frontier = Frontier()
+    for url in ['https://a.com/1', 'https://a.com/2', 'https://b.com/1']:
+        frontier.push(url)
+    seen = BloomFilter(capacity=1000)
+    url = frontier.pop(timeout=0)
+    seen.add(url)
+
+    checkpoint = Checkpoint(str(tmp_path))
+    checkpoint.save(frontier, seen, {})
+    state = checkpoint.load()
+    assert url in state.urls
+    assert sorted(state.urls) == ['https://a.com/1', 'https://a.com/2', 'https://b.com/1']
+
+    frontier.task_done(url)
+    checkpoint.save(frontier, seen, {})
+    assert url not in checkpoint.load().urls
+    assert len(checkpoint.load().urls) == 2
+
+
+def test_checkpoint_round_trip(tmp_path):
+    frontier = Frontier()
+    frontier.push('https://a.com/1')
+    seen = BloomFilter(capacity=1000)
+    seen.add('https://a.com/0')
+
+    checkpoint = Checkpoint(str(tmp_path))
+    checkpoint.save(frontier, seen, {'a.com': 1})
+    state = checkpoint.load()
+    assert state.urls == ['https://a.com/1']
+    assert state.visited_domains == {'a.com': 1}
+    assert 'https://a.com/0' in BloomFilter.from_bytes(state.seen)
+
+
+def test_older_checkpoint_version_is_named(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path))
+    # a version 1 header, magic, crc32, state length and seen length
+    with open(checkpoint.path, 'wb') as f:
+        f.write(struct.pack('<8sIQQ', b'PYCCKPT1', 0, 0, 0))
+    with pytest.raises(ValueError, match='checkpoint version 1, expected version 2'):
+        checkpoint.load()
+
+
+def test_other_files_are_not_checkpoints(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path))
+    with open(checkpoint.path, 'wb') as f:
+        f.write(b'not a checkpoint at all, just text')
+    with pytest.raises(ValueError, match='not a crawl checkpoint'):
+        checkpoint.load()
@@ -0,0 +1,56 @@
+import datetime
+import re
+import pytest
+import pycrawler.dates as dates
+
+UTC = datetime.timezone.utc
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    dates.parse_date.cache_clear()
+    yield
+    dates.parse_date.cache_clear()
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('2023-11-14T10:00:00Z', datetime.datetime(2023, 11, 14, 10, tzinfo=UTC)),
+    ('2023-11-14T10:00:00.250Z', datetime.datetime(2023, 11, 14, 10, 0, 0, 250000, tzinfo=UTC)),
+    ('2023-11-14T12:00:00+0200', datetime.datetime(2023, 11, 14, 10, tzinfo=UTC)),
+    ('2023-11-14T12:00:00+02', datetime.datetime(2023, 11, 14, 10, tzinfo=UTC)),
+    ('2023-11-14T12:00:00+02:00', datetime.datetime(2023, 11, 14, 10, tzinfo=UTC)),
+    ('2023-11-14', datetime.datetime(2023, 11, 14)),
+    ('Tue, 14 Nov 2023 10:00:00 GMT', datetime.datetime(2023, 11, 14, 10, tzinfo=UTC)),
+    ('14 Nov 2023 10:00', datetime.datetime(2023, 11, 14, 10)),
+    ('1699956000', datetime.datetime(2023, 11, 14, 10, tzinfo=UTC)),
+    ('1699956000000', datetime.datetime(2023, 11, 14, 10, tzinfo=UTC)),
+    ('November 14, 2023', datetime.datetime(2023, 11, 14)),
+])
+def test_parse_date(value, expected):
+    date = dates.parse_date(value)
+    assert date == expected
+    assert (date.tzinfo is None) == (expected.tzinfo is None)
+
+
+@pytest.mark.parametrize('value', ['2023-02-30', '2023-02-30T10:00:00Z', '', 'Yesterday', '2 hours ago', 'x' * 100])
+def test_parse_date_rejects(value):
+    assert dates.parse_date(value) is None
+    assert not dates.is_date(value)
+
+
+def test_parse_date_without_fromisoformat_offsets(monkeypatch):
+    # python 3.10 fromisoformat rejects Z and offsets without a colon
+    fromisoformat = datetime.datetime.fromisoformat
+
+    class Datetime(datetime.datetime):
+        @classmethod
+        def fromisoformat(cls, value):
+            if re.search(r'T.*(Z|[+-]\d{2}|[+-]\d{4})$', value):
+                raise ValueError(f'Invalid isoformat string: {value!r}')
+            return fromisoformat(value)
+
+    monkeypatch.setattr(dates.datetime, 'datetime', Datetime)
+    assert dates.parse_date('2023-11-14T10:00:00Z') == datetime.datetime(2023, 11, 14, 10, tzinfo=UTC)
+    assert dates.parse_date('2023-11-14T12:00:00+0200') == datetime.datetime(2023, 11, 14, 10, tzinfo=UTC)
+    assert dates.parse_date('2023-11-14T12:00:00+02:00') == datetime.datetime(2023, 11, 14, 10, tzinfo=UTC)
+    assert dates.parse_date('2023-02-30') is None
@@ -0,0 +1,64 @@
+import random
+from bson import ObjectId
+from pycrawler.dedup import NearDuplicateIndex, fingerprint
+from pycrawler.page import extract_page
+from pycrawler.models import CrawlerArticle
+
+WORDS = 'river harbour council budget school station museum festival energy storm market bridge'.split()
+
+
+def article_text(seed: int, n: int = 120) -> str:
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(WORDS) + str(rng.randrange(50)) for _ in range(n))
+
+
+def page_html(title: str, text: str) -> str:
+    return f'<html><head><title>{title}</title></head><body><article><h2>{title}</h2><p>{text}</p></article></body></html>'
+
+
+def crawl(index: NearDuplicateIndex, url: str, title: str, text: str):
+    page = extract_page(url, page_html(title, text), 'bs4', True)
+    page.flush(index)
+    return page
+
+
+def test_near_duplicates_are_close():
+    text = article_text(0)
+    edited = text.replace(text.split()[10], 'edited', 1)
+    assert (fingerprint(text) ^ fingerprint(edited)).bit_count() <= 3
+    assert (fingerprint(text) ^ fingerprint(article_text(1))).bit_count() > 3
+
+
+def test_copy_on_another_page_links_the_first_article(mongo):
+    index = NearDuplicateIndex()
+    text = article_text(0)
+    first = crawl(index, 'https://a.com/news/1', 'Council budget', text)
+    copy = crawl(index, 'https://b.com/story', 'Budget of the council', text)
+    assert copy.duplicates == 1
+    assert copy.article_ids == first.article_ids
+    assert CrawlerArticle.objects.count() == 1
+
+
+def test_recrawled_edited_article_is_written(mongo):
+    index = NearDuplicateIndex()
+    text = article_text(0)
+    first = crawl(index, 'https://a.com/news/1', 'Council budget', text)
+    edited = text.replace(text.split()[10], 'edited', 1)
+    assert index.find(fingerprint(edited)) == first.article_ids[0]
+
+    again = crawl(index, 'https://a.com/news/1', 'Council budget', edited)
+    assert again.duplicates == 0
+    assert again.article_ids == first.article_ids
+    assert CrawlerArticle.objects.count() == 1
+    assert CrawlerArticle.objects.get().text == edited
+
+
+def test_index_round_trip():
+    index = NearDuplicateIndex()
+    text = article_text(0)
+    id = ObjectId()
+    index.add(fingerprint(text), id, 'uid', 'https://a.com/news/1')
+    restored = NearDuplicateIndex.from_bytes(index.to_bytes())
+    assert restored.find(fingerprint(text)) == id
+    assert restored.find(fingerprint(text), 'uid') is None
+    assert restored.find(fingerprint(text), link='https://a.com/news/1') is None
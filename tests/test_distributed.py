@@ -0,0 +1,92 @@
+import time
+from datetime import datetime, timedelta
+from pycrawler.config import CrawlerConfig
+from pycrawler.distributed import DistributedFrontier, partition_of
+from pycrawler.models import CrawlerQueueItem
+import pycrawler.utils as utils
+
+URLS = [f'https://host{i}.com/page{j}' for i in range(20) for j in range(3)]
+
+
+def create_worker(index: int, idle_timeout: float = 0) -> DistributedFrontier:
+    config = CrawlerConfig(num_workers=2, worker_index=index, queue_idle_timeout=idle_timeout)
+    return DistributedFrontier(config)
+
+
+def partitions(frontier: DistributedFrontier) -> set:
+    return {partition_of(utils.url_get_domain(url), 2) for url in frontier.snapshot()}
+
+
+def test_workers_lease_their_own_partition(mongo):
+    CrawlerQueueItem.ensure_indexes()
+    first, second = create_worker(0), create_worker(1)
+    for url in URLS:
+        first.push(url)
+    first.flush()
+    assert CrawlerQueueItem.objects.count() == len(URLS)
+
+    first.lease()
+    second.lease()
+    assert partitions(first) == {0}
+    assert partitions(second) == {1}
+    assert sorted(first.snapshot() + second.snapshot()) == sorted(URLS)
+
+
+def test_leases_are_exclusive_until_they_expire(mongo):
+    CrawlerQueueItem.ensure_indexes()
+    first = create_worker(0)
+    for url in URLS:
+        first.push(url)
+    first.flush()
+    leased = first.lease()
+    assert leased > 0
+
+    # a second process for the same partition, as after a restart
+    restarted = create_worker(0)
+    assert restarted.lease() == 0
+
+    CrawlerQueueItem._get_collection().update_many(
+        {'lease_owner': first.owner},
+        {'$set': {'leased_until': datetime.utcnow() - timedelta(seconds=1)}}
+    )
+    restarted.last_lease = 0.0
+    assert restarted.lease() == leased
+    assert sorted(restarted.snapshot()) == sorted(first.snapshot())
+
+
+def test_crawled_urls_are_acknowledged(mongo):
+    CrawlerQueueItem.ensure_indexes()
+    worker = create_worker(1)
+    for url in URLS:
+        worker.push(url)
+    worker.flush()
+    worker.lease()
+    url = worker.pop(timeout=0)
+    worker.task_done(url)
+    worker.sync(force=True)
+    assert not CrawlerQueueItem.objects(url=url).count()
+    assert CrawlerQueueItem.objects.count() == len(URLS) - 1
+
+
+def test_pop_syncs_in_the_background(mongo):
+    CrawlerQueueItem.ensure_indexes()
+    first, second = create_worker(0, idle_timeout=10), create_worker(1, idle_timeout=10)
+    for url in URLS:
+        first.push(url)
+    try:
+        # nothing was flushed or leased by hand, the sync threads do both
+        started = time.monotonic()
+        popped = [first.pop(timeout=5), second.pop(timeout=5)]
+        assert None not in popped
+        assert time.monotonic() - started < 5
+        assert partition_of(utils.url_get_domain(popped[0]), 2) == 0
+        assert partition_of(utils.url_get_domain(popped[1]), 2) == 1
+        assert first.syncer.is_alive() and second.syncer.is_alive()
+        for frontier, url in zip([first, second], popped):
+            frontier.task_done(url)
+    finally:
+        first.close()
+        second.close()
+    assert not first.syncer.is_alive() and not second.syncer.is_alive()
+    assert CrawlerQueueItem.objects(lease_owner__ne=None).count() == 0
+    assert CrawlerQueueItem.objects.count() == len(URLS) - 2
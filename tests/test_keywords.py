@@ -0,0 +1,44 @@
+import pytest
+import pycrawler.keywords as keywords
+
+# what the recursive utils.keywordify returned before pycrawler.keywords,
+# see benchmarks/keywords.py. It returned a set turned into a list, so the
+# expected keywords are sorted
+LEGACY_OUTPUTS = [
+    ('', []),
+    ('.', []),
+    (' ', []),
+    ('...', ['']),
+    ('-', []),
+    (' | ', []),
+    ('the', ['the']),
+    ('The', ['the']),
+    ('single', ['single']),
+    ('a,b,,c', []),
+    ('Council approves the new budget', ['approves', 'budget', 'council']),
+    ('Breaking: Prices rise - again!', ['breaking', 'prices', 'rise']),
+    ("Don't panic | The Guide (2nd edition)", ['2nd', 'edition', 'guide', 'panic']),
+    ('x86_64 e-mail & more', ['64', 'mail', 'x86']),
+    ('line one\nline two\r\ntab\tseparated', ['tabseparated']),
+    ('Über den Wolken: Die Stadt und der Fluss', ['den', 'der', 'die', 'fluss', 'stadt', 'und', 'wolken', 'über']),
+    ('İstanbul café, ÇAĞ şehir', ['café', 'i̇stanbul', 'çağ', 'şehir']),
+    ('Москва — столица России', ['москва', 'россии', 'столица']),
+    ('東京 タワー 観光', ['タワー', '東京', '観光']),
+    ('El niño y la niña', ['el', 'niña', 'niño']),
+    ('Mixed 日本語 and English', ['english', 'mixed', '日本語']),
+    (['Council budget', ['the', 'Vote'], 'vote'], ['budget', 'council', 'vote']),
+    (['', ' ', '.'], []),
+    ([], []),
+]
+
+
+@pytest.mark.parametrize('words,expected', LEGACY_OUTPUTS)
+def test_keywordify_matches_the_recursive_version(words, expected):
+    actual = keywords.keywordify(words)
+    assert sorted(actual) == expected
+    # the recursive version never returned a keyword twice
+    assert len(actual) == len(set(actual))
+
+
+def test_keywordify_keeps_first_appearance_order():
+    assert keywords.keywordify('Prices rise, budget prices') == ['prices', 'rise', 'budget']
@@ -0,0 +1,30 @@
+import mongoengine
+import pytest
+from pycrawler.models import CrawlerImage, UpsertBatch
+
+
+def image(url: str, name: str) -> CrawlerImage:
+    return CrawlerImage(url=url, name=name, domain='a.com')
+
+
+def test_batch_assigns_the_ids_of_upserted_documents(mongo):
+    first = UpsertBatch()
+    old = first.add(image('https://a.com/1.png', 'old'))
+    first.flush()
+
+    batch = UpsertBatch()
+    again, new = batch.add(image('https://a.com/1.png', 'again')), batch.add(image('https://a.com/2.png', 'new'))
+    batch.flush()
+    assert again.id == old.id
+    assert new.id is not None and new.id != old.id
+    assert CrawlerImage.objects.get(id=old.id).name == 'again'
+
+
+def test_documents_not_found_after_writing_fail_the_batch(mongo, monkeypatch):
+    # the upsert is lost, as if the document was deleted right after it
+    monkeypatch.setattr(CrawlerImage, '_bulk_write', classmethod(lambda cls, ops: {}))
+    batch = UpsertBatch()
+    doc = batch.add(image('https://a.com/1.png', 'lost'))
+    with pytest.raises(mongoengine.OperationError, match='not found after writing'):
+        batch.flush()
+    assert doc.id is None
@@ -0,0 +1,52 @@
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from benchmarks.corpus import generate_corpus
+from pycrawler.page import PageResult, extract_page
+from pycrawler.models import CrawlerArticle, CrawlerImage
+
+
+def news_page() -> tuple:
+    # the first page of the generated corpus has articles with images
+    return generate_corpus(1)[0]
+
+
+def summary(page: PageResult) -> dict:
+    return dict(
+        url=page.url,
+        title=page.title,
+        links=list(page.links),
+        keywords=list(page.keywords),
+        files=[x.url for x in page.files],
+        images=[x.url for x in page.images],
+        articles=[(x.uid, x.text, [image.url for image in x.images]) for x in page.articles],
+        fingerprints=page.fingerprints
+    )
+
+
+def assert_same_page(actual: PageResult, expected: PageResult):
+    assert summary(actual) == summary(expected)
+    # articles keep their unsaved images, which to_mongo would refuse
+    assert all(isinstance(image, CrawlerImage) and image.id is None for article in actual.articles for image in article.images)
+
+
+def test_page_result_pickles():
+    url, html = news_page()
+    page = extract_page(url, html, 'bs4', True)
+    assert page.images and page.articles and any(x.images for x in page.articles)
+    assert_same_page(pickle.loads(pickle.dumps(page)), page)
+
+
+def test_page_result_from_a_parser_process(mongo):
+    url, html = news_page()
+    expected = extract_page(url, html, 'bs4', True)
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        page = executor.submit(extract_page, url, html, 'bs4', True).result()
+    assert_same_page(page, expected)
+
+    # the references between the unsaved documents survive until written
+    articles = len(page.articles)
+    page.flush()
+    assert CrawlerArticle.objects.count() == len(page.article_ids) == articles
+    image_ids = set(CrawlerImage.objects.distinct('id'))
+    for article in CrawlerArticle.objects:
+        assert article.images and {x.id for x in article.images} <= image_ids
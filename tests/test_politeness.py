@@ -0,0 +1,61 @@
+import asyncio
+import threading
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from pycrawler.aio import AsyncCrawler
+from pycrawler.config import CrawlerConfig
+from pycrawler.fetch import create_async_session
+from pycrawler.politeness import MAX_ROBOTS_BYTES, RobotsCache
+
+# allowed rules up to past the limit, then a rule that must be ignored
+ROBOTS = b'User-agent: *\nDisallow: /private\n' + b'# padding\n' * (MAX_ROBOTS_BYTES // 10) + b'Disallow: /\n'
+
+
+class RobotsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(ROBOTS)))
+        self.end_headers()
+        try:
+            self.wfile.write(ROBOTS)
+        except ConnectionError:
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def host():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RobotsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def check_rules(robots: RobotsCache, host: str):
+    parser = robots.entries[host][1]
+    assert not parser.can_fetch('pycrawler', f'http://{host}/private/1')
+    assert parser.can_fetch('pycrawler', f'http://{host}/public/1')
+
+
+def test_robots_txt_is_read_up_to_the_limit(host):
+    robots = RobotsCache(CrawlerConfig())
+    robots.store(host, *robots._load('http', host))
+    check_rules(robots, host)
+
+
+def test_async_robots_txt_is_read_up_to_the_limit(host):
+    robots = RobotsCache(CrawlerConfig())
+    crawler = types.SimpleNamespace(scheduler=types.SimpleNamespace(robots=robots), robots_pending={host: None})
+
+    async def fetch():
+        async with create_async_session(CrawlerConfig(dns_cache=False)) as session:
+            await AsyncCrawler.fetch_robots(crawler, session, 'http', host)
+
+    asyncio.run(fetch())
+    check_rules(robots, host)
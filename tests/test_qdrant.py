@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+import pycrawler.w2v as w2v
+import pycrawler.metrics as metrics
+from pycrawler.config import CrawlerConfig
+
+qdrant_client = pytest.importorskip('qdrant_client')
+from pycrawler.db.qdrant import COLLECTION, VECTOR_SIZE, QdrantIndexer, setup_qdrant
+
+WORDS = ['council', 'budget', 'river', 'flood', 'football', 'league', 'election', 'vote']
+
+
+@pytest.fixture
+def vectors(monkeypatch):
+    # a small vector store in place of data/vectors.npy
+    rng = np.random.default_rng(0)
+    matrix = rng.standard_normal((len(WORDS), VECTOR_SIZE)).astype(np.float32)
+    monkeypatch.setattr(w2v, '_store', w2v.VectorStore(matrix, {word: i for i, word in enumerate(WORDS)}))
+    return matrix
+
+
+def test_index_batch_and_query(vectors):
+    client = setup_qdrant(qdrant_client.QdrantClient(':memory:'))
+    indexer = QdrantIndexer(CrawlerConfig(qdrant_batch_size=2, qdrant_flush_interval=60), client=client)
+    pages = [('council budget', 'https://a.com/1'), ('river flood', 'https://b.com/1'), ('football league', 'https://c.com/1')]
+    for text, url in pages:
+        assert indexer.add(text, {'url': url})
+    indexer.close()
+    assert (indexer.indexed, indexer.failed, indexer.skipped) == (3, 0, 0)
+
+    query = vectors[WORDS.index('river')] + vectors[WORDS.index('flood')]
+    hits = client.query_points(COLLECTION, query=query.tolist(), limit=1).points
+    assert hits[0].payload['url'] == 'https://b.com/1'
+
+
+def test_wrong_vector_size_is_counted(monkeypatch, caplog):
+    monkeypatch.setattr(w2v, '_store', w2v.VectorStore(np.ones((1, VECTOR_SIZE // 2), dtype=np.float32), {'council': 0}))
+    client = setup_qdrant(qdrant_client.QdrantClient(':memory:'))
+    indexer = QdrantIndexer(CrawlerConfig(), client=client)
+    skipped = metrics.QDRANT_SKIPPED.total()
+    indexer.add('council', {'url': 'https://a.com/1'})
+    indexer.add('unknown words', {'url': 'https://a.com/2'})
+    indexer.close()
+    assert (indexer.indexed, indexer.skipped) == (0, 2)
+    assert metrics.QDRANT_SKIPPED.total() - skipped == 2
+    assert 'vector of size 50, expected 100 url=https://a.com/1' in caplog.text
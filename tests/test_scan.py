@@ -0,0 +1,39 @@
+import pytest
+from benchmarks.corpus import generate_corpus
+from pycrawler.page import PageResult, extract_page
+
+pytest.importorskip('lxml')
+
+# pages the generated corpus does not cover
+EDGE_PAGES = [
+    ('https://a.com/empty', ''),
+    ('https://a.com/untitled', '<html><body><p>Only a paragraph</p></body></html>'),
+    ('https://a.com/nested', '''<html lang="de"><head><title> Nested </title>
+        <meta name="keywords" content="Eins, Zwei"></head><body>
+        <article><h1>Outer</h1><p>Outer text</p>
+          <article><h2>Inner</h2><p>Inner text</p><img src="/i.png" alt="Inner image"></article>
+        </article>
+        <a href="/file.pdf">file</a><a href="other">other</a></body></html>'''),
+    ('https://a.com/noise', '''<html><head><title>Caf&eacute; &amp; bar</title>
+        <script>var a = "<article><p>not text</p></article>";</script><style>p { color: red }</style></head>
+        <body><!-- <article><p>commented out</p></article> -->
+        <article>  <h1>\n Menu &nbsp;of the day </h1><p>Soup\t and   bread</p><p></p><p>Tea</p></article></body></html>'''),
+]
+
+
+def summary(result: PageResult) -> dict:
+    # benchmarks/page.py compares the backends the same way
+    return dict(
+        title=result.title,
+        language=result.language,
+        keywords=sorted(set(result.keywords)),
+        links=sorted(set(result.links)),
+        files=sorted(f.url for f in result.files),
+        images=sorted((i.url, i.name) for i in result.images),
+        articles=sorted((a.uid, a.name, a.text, a.link, tuple(sorted(a.links))) for a in result.articles)
+    )
+
+
+@pytest.mark.parametrize('url,html', [*generate_corpus(30), *EDGE_PAGES])
+def test_lxml_backend_matches_bs4(url, html):
+    assert summary(extract_page(url, html, backend='lxml')) == summary(extract_page(url, html, backend='bs4'))
@@ -0,0 +1,41 @@
+import pytest
+from pycrawler.urlfilter import UrlFilter
+
+
+def test_blacklist_patterns_keep_their_match_semantics():
+    url_filter = UrlFilter([r'https://a\.com/private', r'.*/login|.*/logout'])
+    assert url_filter.filter('https://a.com/private/1') is None
+    assert url_filter.filter('https://b.com/login') is None
+    assert url_filter.filter('https://b.com/logout') is None
+    # re.match, a pattern without .* only matches at the start
+    assert url_filter.filter('https://b.com/?next=https://a.com/private') == 'https://b.com/?next=https://a.com/private'
+
+
+def test_blacklist_matches_the_url_without_query():
+    url_filter = UrlFilter([r'.*\.php$'])
+    assert url_filter.filter('https://a.com/index.php') is None
+    assert url_filter.filter('https://a.com/index.php?page=2') is None
+
+
+def test_blacklist_patterns_with_global_flags():
+    url_filter = UrlFilter([r'(?i).*/ADMIN', r'.*/Tag/'])
+    assert url_filter.filter('https://a.com/admin') is None
+    assert url_filter.filter('https://a.com/Admin/users') is None
+    # the flag does not leak into the other patterns
+    assert url_filter.filter('https://a.com/Tag/x') is None
+    assert url_filter.filter('https://a.com/tag/x') == 'https://a.com/tag/x'
+
+
+def test_invalid_blacklist_pattern_is_named():
+    with pytest.raises(ValueError, match=r"blacklist pattern '\.\*/\(admin' is not a valid regular expression"):
+        UrlFilter([r'.*/(admin'])
+    with pytest.raises(ValueError, match='global flags'):
+        UrlFilter([r'.*/(?i)admin'])
+
+
+def test_skipped_keywords_and_extensions():
+    url_filter = UrlFilter([])
+    assert url_filter.filter('mailto:someone@a.com') is None
+    assert url_filter.filter('https://a.com/x?to=javascript:void(0)') is None
+    assert url_filter.filter('https://a.com/style.css?v=2') is None
+    assert url_filter.filter('HTTPS://A.com:443/p?b=2&utm_source=x&a=1#top') == 'https://a.com/p?a=1&b=2'